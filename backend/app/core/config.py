@@ -20,6 +20,74 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
 
+    # Submission uploads
+    upload_dir: str = "uploads"
+    max_upload_bytes: int = 500 * 1024 * 1024
+    upload_chunk_bytes: int = 1024 * 1024
+    upload_session_ttl_hours: int = 24
+    # Completed sessions answer retried finalize calls, then are deleted
+    completed_upload_retention_hours: int = 168
+
+    # Storage backend for submission files: "local" (under upload_dir) or "s3"
+    storage_backend: str = "local"
+    s3_bucket: str = "submissions"
+    s3_prefix: str = ""
+    s3_endpoint_url: Optional[str] = None
+    s3_region: Optional[str] = None
+    s3_access_key_id: Optional[str] = None
+    s3_secret_access_key: Optional[str] = None
+
+    # Storage lifecycle: orphan grace period and cold tier for finished projects.
+    # Cold copies go to cold_storage_dir when set, else under cold/ in the main backend.
+    storage_orphan_grace_hours: int = 24
+    cold_tier_after_days: int = 90
+    cold_storage_dir: Optional[str] = None
+
+    # Submission downloads: "none", "x-accel-redirect" (nginx) or "x-sendfile"
+    download_offload: str = "none"
+    download_offload_prefix: str = "/protected-uploads/"
+
+    # Signed download URLs (falls back to secret_key when unset)
+    download_signing_key: Optional[str] = None
+    download_url_ttl_seconds: int = 300
+
+    # Background jobs: "inline" (in-process thread pool) or "celery"
+    job_backend: str = "inline"
+    celery_broker_url: Optional[str] = None
+    celery_result_backend: Optional[str] = None
+    job_workers: int = 4
+
+    # Payments: "stripe", or "fake" for an in-memory stand-in (local runs, tests).
+    # Provider calls run as background jobs with exponential-backoff retries.
+    payment_provider: str = "stripe"
+    stripe_secret_key: Optional[str] = None
+    stripe_webhook_secret: Optional[str] = None
+    payment_max_attempts: int = 5
+    payment_retry_base_seconds: float = 2.0
+    payment_retry_max_seconds: float = 300.0
+    # Provider client: pooled keep-alive connections, timeouts, circuit breaker
+    payment_pool_size: int = 10
+    payment_connect_timeout: float = 3.0
+    payment_read_timeout: float = 15.0
+    payment_breaker_failures: int = 5
+    payment_breaker_reset_seconds: float = 30.0
+    # Simulated latency and failure rate for PAYMENT_PROVIDER=fake
+    payment_fake_latency_ms: int = 0
+    payment_fake_failure_rate: float = 0.0
+
+    # Opt-in fast JSON responses: orjson for dicts, one-pass pydantic-core
+    # serialization for listings (see app/core/responses.py)
+    fast_json_responses: bool = False
+
+    # Admin dashboard stats: snapshot age before a background refresh, and how
+    # long after a user/project/payment change the snapshot is recomputed
+    admin_stats_ttl_seconds: int = 60
+    admin_stats_debounce_seconds: float = 5.0
+    # Analytics rollups: catch-up interval, and how far back each run recounts
+    analytics_refresh_seconds: int = 300
+    analytics_lookback_hours: int = 48
+    analytics_max_hourly_days: int = 31
+
     model_config = SettingsConfigDict(
         env_file=str(ENV_FILE),
         env_file_encoding='utf-8'
@@ -1,5 +1,6 @@
+from contextlib import contextmanager
 from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 from ..core.config import settings
 import urllib.parse
 
@@ -21,9 +22,40 @@ Base = declarative_base()
 
 
 def get_db():
-    """Database session dependency."""
+    """Database session dependency.
+
+    The session is lazy: it checks out a pooled connection on its first query
+    and returns it when the transaction ends, so routes that never query hold
+    no connection. Use ``release_connection`` before slow work that does not
+    need the database.
+    """
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def release_connection(db: Session) -> None:
+    """Commit and hand the session's connection back to the pool.
+
+    Objects already loaded keep their attribute values (they are not expired
+    by this commit), so the handler can keep using them without a reload.
+    The next query checks out a connection again. Re-query, with a lock if
+    needed, any row that is updated after the outbound call.
+    """
+    expire_on_commit = db.expire_on_commit
+    db.expire_on_commit = False
+    try:
+        db.commit()
+    finally:
+        db.expire_on_commit = expire_on_commit
+
+
+@contextmanager
+def connection_released(db: Session):
+    """Run a block (provider calls, slow client I/O, CPU-heavy hashing)
+    without holding a pooled connection; the session reconnects on next use.
+    """
+    release_connection(db)
+    yield db
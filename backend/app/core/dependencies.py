@@ -30,6 +30,14 @@ async def get_current_user(
             detail="User not found"
         )
     
+    # Tokens outlive deactivation; the role and this flag are read fresh
+    # on every request, so admin changes apply from the next request
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive"
+        )
+    
     return user
 
 async def get_current_admin(
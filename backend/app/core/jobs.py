@@ -0,0 +1,103 @@
+"""
+Background job dispatch.
+
+Jobs run on an in-process thread pool by default (``JOB_BACKEND=inline``),
+which is enough for single-node and local runs. With ``JOB_BACKEND=celery``
+they go to the broker at ``CELERY_BROKER_URL``; start a worker with
+``celery -A app.core.jobs.celery_app worker`` (also with JOB_BACKEND=celery).
+A broker URL alone does not switch backends, so jobs are never sent to a
+worker that was not deliberately deployed.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Modules that define jobs; the Celery worker imports them at startup
+JOB_MODULES = [
+    "app.services.archives",
+    "app.services.lifecycle",
+    "app.services.payments",
+    "app.services.payment_events",
+    "app.services.payouts",
+    "app.services.stats",
+    "app.services.analytics",
+]
+
+JOB_BACKENDS = ("inline", "celery")
+if settings.job_backend not in JOB_BACKENDS:
+    raise RuntimeError(f"JOB_BACKEND must be one of: {', '.join(JOB_BACKENDS)}")
+
+celery_app = None
+if settings.job_backend == "celery":
+    if not settings.celery_broker_url:
+        raise RuntimeError("JOB_BACKEND=celery requires CELERY_BROKER_URL")
+    try:
+        from celery import Celery
+    except ImportError:
+        raise RuntimeError("JOB_BACKEND=celery requires celery (pip install celery)")
+    celery_app = Celery(
+        "marketplace",
+        broker=settings.celery_broker_url,
+        backend=settings.celery_result_backend,
+        include=JOB_MODULES,
+    )
+    celery_app.conf.task_acks_late = True
+    celery_app.conf.worker_prefetch_multiplier = 1
+
+_executor = None
+_registry: Dict[str, Callable] = {}
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.job_workers, thread_name_prefix="job")
+    return _executor
+
+
+def job(fn: Callable) -> Callable:
+    """Register a function as a background job (arguments must be JSON-serializable)."""
+    name = f"{fn.__module__}.{fn.__name__}"
+    _registry[name] = fn
+    if celery_app is not None:
+        celery_app.task(name=name)(fn)
+    fn.job_name = name
+    return fn
+
+
+def _run_logged(name: str, fn: Callable, args: tuple, kwargs: dict) -> None:
+    try:
+        fn(*args, **kwargs)
+    except Exception:
+        logger.exception("Background job %s failed", name)
+
+
+def enqueue(fn: Callable, *args, **kwargs) -> None:
+    """Run a registered job in the background."""
+    name = fn.job_name
+    if celery_app is not None:
+        celery_app.send_task(name, args=args, kwargs=kwargs)
+    else:
+        _get_executor().submit(_run_logged, name, _registry[name], args, kwargs)
+
+
+def enqueue_in(delay_seconds: float, fn: Callable, *args, **kwargs) -> None:
+    """Run a registered job in the background after ``delay_seconds``.
+
+    In-process delays live in memory and are lost on restart; callers that
+    need the run to happen must be able to re-enqueue it.
+    """
+    name = fn.job_name
+    if celery_app is not None:
+        celery_app.send_task(name, args=args, kwargs=kwargs, countdown=delay_seconds)
+    else:
+        timer = threading.Timer(
+            delay_seconds, _get_executor().submit, args=(_run_logged, name, _registry[name], args, kwargs)
+        )
+        timer.daemon = True
+        timer.start()
@@ -0,0 +1,391 @@
+"""
+Payment provider gateway.
+
+Routes and jobs talk to the provider through ``get_payment_gateway()``, which
+returns the Stripe gateway, or an in-memory fake when
+``PAYMENT_PROVIDER=fake`` (local runs, tests and benchmarks), wrapped in a
+circuit breaker that also records per-operation latency and errors.
+Provider failures surface as ``PaymentProviderError`` with a ``retryable``
+flag so callers can decide whether to back off and try again.
+"""
+import hashlib
+import hmac
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentProviderError(Exception):
+    """A provider call failed; ``retryable`` marks transient failures."""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def _pooled_stripe_client(stripe, pool_size: int, timeout: Tuple[float, float]):
+    """A Stripe HTTP client on one shared keep-alive session.
+
+    ``stripe`` reads the client's timeout on every request; here it comes from
+    a thread-local so each call can set its own.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+    call_timeout = threading.local()
+
+    class PooledRequestsClient(stripe.http_client.RequestsClient):
+        @property
+        def _timeout(self):
+            return getattr(call_timeout, "value", None) or timeout
+
+        @_timeout.setter
+        def _timeout(self, value):
+            pass
+
+    client = PooledRequestsClient(session=session)
+    client.call_timeout = call_timeout
+    return client
+
+
+class StripeGateway:
+    """Calls the Stripe API; every mutating call carries an idempotency key.
+
+    Requests share a pooled keep-alive session and use (connect, read)
+    timeouts; ``stripe``'s own network retries are off because failed
+    operations are retried by the payment jobs.
+    """
+
+    # Read timeouts per call (seconds); payouts can be slow to acknowledge
+    read_timeouts = {"create_payout": 30.0}
+
+    def __init__(self, api_key: Optional[str], pool_size: int = 10,
+                 connect_timeout: float = 3.0, read_timeout: float = 15.0):
+        import stripe
+
+        self.stripe = stripe
+        self.api_key = api_key
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        stripe.max_network_retries = 0
+        self.http_client = _pooled_stripe_client(stripe, pool_size, (connect_timeout, read_timeout))
+        stripe.default_http_client = self.http_client
+
+    def _call(self, fn, *args, operation: str = "", **kwargs) -> dict:
+        error = self.stripe.error
+        self.http_client.call_timeout.value = (
+            self.connect_timeout, self.read_timeouts.get(operation, self.read_timeout)
+        )
+        try:
+            return fn(*args, api_key=self.api_key, **kwargs)
+        except (error.APIConnectionError, error.RateLimitError) as e:
+            raise PaymentProviderError(f"Stripe error: {e}", retryable=True)
+        except error.APIError as e:
+            # 5xx from Stripe; safe to retry with the same idempotency key
+            raise PaymentProviderError(f"Stripe error: {e}", retryable=True)
+        except error.StripeError as e:
+            raise PaymentProviderError(f"Stripe error: {e}")
+        finally:
+            self.http_client.call_timeout.value = None
+
+    def create_payment_intent(self, amount_cents: int, currency: str, metadata: dict,
+                              idempotency_key: str) -> dict:
+        intent = self._call(
+            self.stripe.PaymentIntent.create,
+            operation="create_payment_intent",
+            amount=amount_cents, currency=currency, metadata=metadata,
+            idempotency_key=idempotency_key,
+        )
+        return {
+            "id": intent.id,
+            "client_secret": intent.client_secret,
+            "status": intent.status,
+            "amount": intent.amount,
+        }
+
+    def retrieve_payment_intent(self, payment_intent_id: str) -> dict:
+        intent = self._call(
+            self.stripe.PaymentIntent.retrieve, payment_intent_id, operation="retrieve_payment_intent"
+        )
+        return {"id": intent.id, "status": intent.status, "amount": intent.amount}
+
+    def create_payout(self, amount_cents: int, currency: str, destination: str,
+                      metadata: dict, idempotency_key: str) -> dict:
+        payout = self._call(
+            self.stripe.Payout.create,
+            operation="create_payout",
+            amount=amount_cents, currency=currency, method="instant",
+            destination=destination, metadata=metadata,
+            idempotency_key=idempotency_key,
+        )
+        return {
+            "id": payout.id,
+            "status": payout.status,
+            "amount": payout.amount,
+            "arrival_date": payout.arrival_date,
+        }
+
+
+class FakeGateway:
+    """In-memory stand-in for Stripe that honours idempotency keys.
+
+    Payment intents are created in ``intent_status`` ("succeeded" by default)
+    so the confirm flow can be exercised without a card. ``latency_seconds``
+    and ``failure_rate`` simulate a slow or degraded provider for benchmarks.
+    """
+
+    def __init__(self, intent_status: str = "succeeded", latency_seconds: float = 0.0,
+                 failure_rate: float = 0.0):
+        self.intent_status = intent_status
+        self.latency_seconds = latency_seconds
+        self.failure_rate = failure_rate
+        self.intents = {}
+        self.payouts = {}
+        self._by_key = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _simulate_network(self) -> None:
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise PaymentProviderError("Simulated provider outage", retryable=True)
+
+    def _idempotent(self, key: str, create):
+        self._simulate_network()
+        with self._lock:
+            if key not in self._by_key:
+                self._by_key[key] = create(next(self._ids))
+            return dict(self._by_key[key])
+
+    def create_payment_intent(self, amount_cents: int, currency: str, metadata: dict,
+                              idempotency_key: str) -> dict:
+        def create(n):
+            intent = {
+                "id": f"pi_fake_{n}",
+                "client_secret": f"pi_fake_{n}_secret",
+                "status": self.intent_status,
+                "amount": amount_cents,
+            }
+            self.intents[intent["id"]] = intent
+            return intent
+        return self._idempotent(idempotency_key, create)
+
+    def retrieve_payment_intent(self, payment_intent_id: str) -> dict:
+        self._simulate_network()
+        intent = self.intents.get(payment_intent_id)
+        if intent is None:
+            raise PaymentProviderError(f"No such payment_intent: '{payment_intent_id}'")
+        return {"id": intent["id"], "status": intent["status"], "amount": intent["amount"]}
+
+    def create_payout(self, amount_cents: int, currency: str, destination: str,
+                      metadata: dict, idempotency_key: str) -> dict:
+        def create(n):
+            payout = {
+                "id": f"po_fake_{n}",
+                "status": "paid",
+                "amount": amount_cents,
+                "arrival_date": int(time.time()),
+            }
+            self.payouts[payout["id"]] = payout
+            return payout
+        return self._idempotent(idempotency_key, create)
+
+
+def verify_webhook_signature(payload: bytes, header: str, secret: str, tolerance: int = 300) -> bool:
+    """Check a ``Stripe-Signature`` header (``t=<unix time>,v1=<hmac>,...``).
+
+    The signature is an HMAC-SHA256 of ``"<t>.<raw body>"`` keyed with the
+    endpoint secret; signatures older than ``tolerance`` seconds are rejected.
+    """
+    timestamp, signatures = None, []
+    for item in header.split(","):
+        key, _, value = item.strip().partition("=")
+        if key == "t":
+            timestamp = value
+        elif key == "v1":
+            signatures.append(value)
+    if not timestamp or not signatures:
+        return False
+
+    try:
+        if time.time() - int(timestamp) > tolerance:
+            return False
+    except ValueError:
+        return False
+
+    expected = hmac.new(
+        secret.encode(), timestamp.encode() + b"." + payload, hashlib.sha256
+    ).hexdigest()
+    return any(hmac.compare_digest(expected, signature) for signature in signatures)
+
+
+class CircuitBreaker:
+    """Fails fast while the provider is degraded.
+
+    Opens after ``failure_threshold`` consecutive transient failures, rejects
+    calls for ``reset_seconds``, then lets a single trial call through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "open" or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.state != "open":
+                    logger.warning("Payment provider circuit opened after %d failures", self.failures)
+                self.opened_at = time.monotonic()
+
+
+class ProviderMetrics:
+    """Per-operation call counts, errors and latency percentiles (this process only)."""
+
+    window = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = defaultdict(lambda: {"calls": 0, "errors": 0, "rejected": 0})
+        self._latencies = defaultdict(lambda: deque(maxlen=self.window))
+
+    def record(self, operation: str, seconds: float, error: bool) -> None:
+        with self._lock:
+            counts = self._counts[operation]
+            counts["calls"] += 1
+            counts["errors"] += int(error)
+            self._latencies[operation].append(seconds)
+
+    def reject(self, operation: str) -> None:
+        with self._lock:
+            self._counts[operation]["rejected"] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            result = {}
+            for operation, counts in self._counts.items():
+                latencies = sorted(self._latencies[operation])
+
+                def percentile(p):
+                    if not latencies:
+                        return None
+                    return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+                result[operation] = dict(
+                    counts,
+                    p50_ms=percentile(0.50),
+                    p95_ms=percentile(0.95),
+                    p99_ms=percentile(0.99),
+                )
+            return result
+
+
+class MonitoredGateway:
+    """Puts a circuit breaker and metrics in front of any gateway."""
+
+    def __init__(self, gateway, breaker: CircuitBreaker, metrics: Optional[ProviderMetrics] = None):
+        self.gateway = gateway
+        self.breaker = breaker
+        self.metrics = metrics or ProviderMetrics()
+
+    def _invoke(self, operation: str, *args, **kwargs) -> dict:
+        if not self.breaker.allow():
+            self.metrics.reject(operation)
+            raise PaymentProviderError("Payment provider unavailable (circuit open)", retryable=True)
+
+        started = time.perf_counter()
+        try:
+            result = getattr(self.gateway, operation)(*args, **kwargs)
+        except PaymentProviderError as e:
+            self.metrics.record(operation, time.perf_counter() - started, error=True)
+            # Declines and invalid requests mean the provider is answering
+            if e.retryable:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        except Exception:
+            self.metrics.record(operation, time.perf_counter() - started, error=True)
+            self.breaker.record_failure()
+            raise
+        self.metrics.record(operation, time.perf_counter() - started, error=False)
+        self.breaker.record_success()
+        return result
+
+    def create_payment_intent(self, *args, **kwargs) -> dict:
+        return self._invoke("create_payment_intent", *args, **kwargs)
+
+    def retrieve_payment_intent(self, *args, **kwargs) -> dict:
+        return self._invoke("retrieve_payment_intent", *args, **kwargs)
+
+    def create_payout(self, *args, **kwargs) -> dict:
+        return self._invoke("create_payout", *args, **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            "provider": type(self.gateway).__name__,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "operations": self.metrics.snapshot(),
+        }
+
+
+@lru_cache
+def get_payment_gateway() -> MonitoredGateway:
+    """The configured payment provider (created once per process)."""
+    if settings.payment_provider == "fake":
+        gateway = FakeGateway(
+            latency_seconds=settings.payment_fake_latency_ms / 1000,
+            failure_rate=settings.payment_fake_failure_rate,
+        )
+    else:
+        gateway = StripeGateway(
+            settings.stripe_secret_key,
+            pool_size=settings.payment_pool_size,
+            connect_timeout=settings.payment_connect_timeout,
+            read_timeout=settings.payment_read_timeout,
+        )
+    breaker = CircuitBreaker(settings.payment_breaker_failures, settings.payment_breaker_reset_seconds)
+    return MonitoredGateway(gateway, breaker)
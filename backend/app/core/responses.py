@@ -0,0 +1,100 @@
+"""
+Opt-in fast JSON path for responses (``FAST_JSON_RESPONSES=true``).
+
+By default FastAPI validates a handler's return value against its
+``response_model`` (again, if the handler already built models), dumps it
+to Python and encodes it with the standard ``json`` module. When enabled:
+
+- dict-returning routes are encoded by orjson (``json_response_class``);
+- routes that use a ``ModelResponder`` validate ORM rows once and serialize
+  them straight to JSON bytes in pydantic-core, returning a ready Response
+  so FastAPI skips its own validation and encoding.
+
+The JSON produced is the same either way.
+"""
+
+from functools import lru_cache
+from typing import Any, Iterable, List, Tuple, Type
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+
+from .config import settings
+
+
+def json_response_class() -> Type[JSONResponse]:
+    """Default response class for the app: orjson-backed when the fast path is on."""
+    if not settings.fast_json_responses:
+        return JSONResponse
+    try:
+        import orjson  # noqa: F401
+    except ImportError:
+        raise RuntimeError("FAST_JSON_RESPONSES=true requires orjson (pip install orjson)")
+    from fastapi.responses import ORJSONResponse
+    return ORJSONResponse
+
+
+class ModelResponder:
+    """Pre-built validator and serializer for one response type.
+
+    Create one per route at import time (``ModelResponder(List[Schema])``)
+    and return ``responder(rows)`` from the handler; the route keeps its
+    ``response_model`` for the OpenAPI schema. With the fast path off the
+    rows are returned as-is for FastAPI to process as usual.
+    """
+
+    def __init__(self, annotation: Any):
+        self.adapter = TypeAdapter(annotation)
+
+    def __call__(self, data: Any, status_code: int = 200) -> Any:
+        if not settings.fast_json_responses:
+            return data
+        value = self.adapter.validate_python(data, from_attributes=True)
+        return Response(
+            content=self.adapter.dump_json(value),
+            status_code=status_code,
+            media_type="application/json"
+        )
+
+
+def parse_names(value: str, allowed: Iterable[str], param: str) -> Tuple[str, ...]:
+    """Validate a comma-separated ``param=a,b,c`` value against the allowed names."""
+    allowed = list(allowed)
+    names = tuple(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if not names or unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{param} must be a comma-separated subset of: {', '.join(allowed)}"
+        )
+    return names
+
+
+def parse_fields(fields: str, schema: Type[BaseModel]) -> Tuple[str, ...]:
+    """Validate a ``fields=a,b,c`` parameter against a response schema."""
+    return parse_names(fields, schema.model_fields, "fields")
+
+
+@lru_cache(maxsize=256)
+def _sparse_adapter(schema: Type[BaseModel], fields: Tuple[str, ...]) -> TypeAdapter:
+    partial = create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (schema.model_fields[name].annotation, schema.model_fields[name]) for name in fields}
+    )
+    return TypeAdapter(List[partial])
+
+
+def sparse_response(schema: Type[BaseModel], fields: Tuple[str, ...], rows: list) -> Response:
+    """Serialize only ``fields`` of each row, typed as in ``schema``.
+
+    Only the requested attributes are read, so rows loaded with
+    ``load_only`` are never lazily completed. Always bypasses the route's
+    ``response_model`` (which requires every field).
+    """
+    adapter = _sparse_adapter(schema, fields)
+    return Response(
+        content=adapter.dump_json(adapter.validate_python(rows, from_attributes=True)),
+        media_type="application/json"
+    )
@@ -1,5 +1,8 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Any
+import hashlib
+import hmac
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from ..core.config import settings
@@ -42,3 +45,25 @@ def decode_token(token: str) -> Optional[TokenData]:
         return TokenData(user_id=user_id, email=email)
     except JWTError:
         return None
+
+
+def _download_signature(path: str, filename: str, expires: int) -> str:
+    key = (settings.download_signing_key or settings.secret_key).encode()
+    message = f"{path}\n{filename}\n{expires}".encode()
+    return hmac.new(key, message, hashlib.sha256).hexdigest()
+
+def sign_download(path: str, filename: str, ttl_seconds: Optional[int] = None) -> tuple:
+    """Sign a download of a stored file; returns (expires, signature).
+
+    Expiry is rounded up to a multiple of the TTL so repeated requests for the
+    same file get the same URL, which keeps it cacheable by a CDN.
+    """
+    ttl = ttl_seconds or settings.download_url_ttl_seconds
+    expires = (int(time.time()) // ttl + 2) * ttl
+    return expires, _download_signature(path, filename, expires)
+
+def verify_download(path: str, filename: str, expires: int, signature: str) -> bool:
+    """Check a download signature and its expiry without touching the database."""
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(_download_signature(path, filename, expires), signature)
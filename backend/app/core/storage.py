@@ -0,0 +1,213 @@
+"""
+Object storage for submission files.
+
+Files are addressed by a storage key such as ``blobs/ab/cd/<sha256>``. The
+local backend maps keys under ``UPLOAD_DIR``; the S3 backend stores them in a
+bucket (AWS or any S3-compatible server such as MinIO) and hands out presigned
+GET URLs so file bytes never pass through the API workers.
+"""
+import io
+import os
+from functools import lru_cache
+from typing import BinaryIO, Iterator, Optional, Tuple
+from urllib.parse import quote
+
+from .config import settings
+
+
+class LocalStorage:
+    """Keys are paths relative to a local root directory."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def local_path(self, key: str) -> str:
+        # Rows written before storage keys existed hold a path that already
+        # includes the upload directory (e.g. uploads/task_1_work.zip)
+        if os.path.isabs(key) or key.startswith(self.root.rstrip("/") + "/"):
+            return key
+        return os.path.join(self.root, key)
+
+    def save_file(self, source_path: str, key: str) -> None:
+        """Move a finished local file into storage."""
+        dest = self.local_path(key)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(source_path, dest)
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.local_path(key))
+
+    def size(self, key: str) -> int:
+        return os.path.getsize(self.local_path(key))
+
+    def delete(self, key: str) -> None:
+        path = self.local_path(key)
+        if os.path.exists(path):
+            os.unlink(path)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.local_path(key), "rb")
+
+    def iter_keys(self, prefix: str = "") -> Iterator[Tuple[str, int, float]]:
+        """Yield ``(key, size, mtime)`` for stored files under ``prefix``."""
+        base = os.path.join(self.root, prefix)
+        for directory, _, names in os.walk(base):
+            for name in names:
+                path = os.path.join(directory, name)
+                stat_result = os.stat(path)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                yield key, stat_result.st_size, stat_result.st_mtime
+
+    def presigned_url(self, key: str, filename: str, expires_in: int) -> Optional[str]:
+        return None
+
+
+class _S3RangeReader(io.RawIOBase):
+    """Seekable read-only view of an S3 object backed by ranged GETs."""
+
+    def __init__(self, client, bucket: str, key: str, size: int):
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.length = size
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        else:
+            self.position = self.length + offset
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        if self.position >= self.length or len(buffer) == 0:
+            return 0
+        end = min(self.position + len(buffer), self.length) - 1
+        body = self.client.get_object(
+            Bucket=self.bucket, Key=self.key, Range=f"bytes={self.position}-{end}"
+        )["Body"].read()
+        buffer[:len(body)] = body
+        self.position += len(body)
+        return len(body)
+
+
+class S3Storage:
+    """Keys live in an S3 bucket under an optional prefix."""
+
+    multipart_chunk_bytes = 8 * 1024 * 1024
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, access_key_id: Optional[str] = None,
+                 secret_access_key: Optional[str] = None):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+            from botocore.config import Config
+            from botocore.exceptions import ClientError
+        except ImportError:
+            raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            # Path-style addressing works with MinIO and other local stand-ins
+            config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=self.multipart_chunk_bytes,
+            multipart_chunksize=self.multipart_chunk_bytes,
+            max_concurrency=4,
+        )
+        self._client_error = ClientError
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def local_path(self, key: str) -> Optional[str]:
+        return None
+
+    def save_file(self, source_path: str, key: str) -> None:
+        """Upload a finished local file (multipart, streamed from disk) and remove it."""
+        self.client.upload_file(source_path, self.bucket, self._key(key), Config=self.transfer_config)
+        os.unlink(source_path)
+
+    def _head(self, key: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except self._client_error as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self._head(key) is not None
+
+    def size(self, key: str) -> int:
+        head = self._head(key)
+        if head is None:
+            raise FileNotFoundError(key)
+        return head["ContentLength"]
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def open(self, key: str) -> BinaryIO:
+        reader = _S3RangeReader(self.client, self.bucket, self._key(key), self.size(key))
+        return io.BufferedReader(reader, buffer_size=1024 * 1024)
+
+    def iter_keys(self, prefix: str = "") -> Iterator[Tuple[str, int, float]]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        strip = len(self.prefix) + 1 if self.prefix else 0
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for item in page.get("Contents", []):
+                yield item["Key"][strip:], item["Size"], item["LastModified"].timestamp()
+
+    def presigned_url(self, key: str, filename: str, expires_in: int) -> Optional[str]:
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(key),
+                "ResponseContentDisposition": f"attachment; filename*=utf-8''{quote(filename)}",
+            },
+            ExpiresIn=expires_in,
+        )
+
+
+@lru_cache
+def get_storage():
+    """The configured storage backend (created once per process)."""
+    if settings.storage_backend == "s3":
+        return S3Storage(
+            bucket=settings.s3_bucket,
+            prefix=settings.s3_prefix,
+            endpoint_url=settings.s3_endpoint_url,
+            region=settings.s3_region,
+            access_key_id=settings.s3_access_key_id,
+            secret_access_key=settings.s3_secret_access_key,
+        )
+    return LocalStorage(settings.upload_dir)
+
+
+@lru_cache
+def get_cold_storage():
+    """Backend holding cold-tier copies (a slower local path, or the main backend)."""
+    if settings.cold_storage_dir:
+        return LocalStorage(settings.cold_storage_dir)
+    return get_storage()
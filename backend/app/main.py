@@ -3,11 +3,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
 from .core.database import Base, engine
+from .core.responses import json_response_class
 from .routes import auth_router, admin_router, buyer_router, solver_router, submission_router
 from .routes.marketplace import router as marketplace_router
 from .routes.sprint import router as sprint_router
 from .routes.payment import router as payment_router
 from .routes.profile import router as profile_router
+from .routes.files import router as files_router
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
@@ -16,7 +18,8 @@ Base.metadata.create_all(bind=engine)
 app = FastAPI(
     title="Project Marketplace API",
     description="Role-based project marketplace workflow with Trello-like dashboard",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=json_response_class()
 )
 
 # Add CORS middleware
@@ -26,6 +29,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -38,6 +42,7 @@ app.include_router(marketplace_router, prefix="/api")
 app.include_router(sprint_router, prefix="/api")
 app.include_router(payment_router, prefix="/api")
 app.include_router(profile_router, prefix="/api")
+app.include_router(files_router, prefix="/api")
 
 @app.get("/")
 def root():
@@ -1,6 +1,11 @@
 from .user import User, UserRole
 from .project import Project, ProjectStatus, ProjectRequest, ProjectAssignment, Sprint, Feature, ProjectPayment, ProjectCategory
-from .task import Task, TaskStatus, Submission, SubmissionStatus
+from .task import Task, TaskStatus, Submission, SubmissionStatus, UploadSession
+from .storage import Blob, ArchiveIndex, ArchiveEntry
+from .stats import StatsSnapshot, AnalyticsRollup, SolverStats, SolverCategoryStats
+from .payment import (
+    PaymentOperation, PaymentEvent, PaymentLedgerEntry, SolverBalance, PayoutRun, PayoutRunItem, PayoutRunPayment
+)
 
 __all__ = [
     "User",
@@ -17,4 +22,19 @@ __all__ = [
     "TaskStatus",
     "Submission",
     "SubmissionStatus",
+    "UploadSession",
+    "Blob",
+    "ArchiveIndex",
+    "ArchiveEntry",
+    "PaymentOperation",
+    "PaymentEvent",
+    "PaymentLedgerEntry",
+    "SolverBalance",
+    "PayoutRun",
+    "PayoutRunItem",
+    "PayoutRunPayment",
+    "StatsSnapshot",
+    "AnalyticsRollup",
+    "SolverStats",
+    "SolverCategoryStats",
 ]
@@ -0,0 +1,137 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, JSON, Index, Numeric, UniqueConstraint, text
+from sqlalchemy.orm import relationship
+from datetime import datetime
+
+from ..core.database import Base
+
+class PaymentOperation(Base):
+    """A payment provider call queued for a background worker."""
+    __tablename__ = "payment_operations"
+    __table_args__ = (
+        UniqueConstraint("user_id", "idempotency_key", name="uq_payment_operations_user_key"),
+    )
+    
+    id = Column(String(32), primary_key=True)
+    kind = Column(String, nullable=False)  # create_payment_intent, confirm_payment, payout
+    status = Column(String, default="queued", nullable=False, index=True)  # queued, running, succeeded, failed
+    idempotency_key = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
+    payment_id = Column(Integer, ForeignKey("project_payments.id"), nullable=True)
+    params = Column(JSON, nullable=False, default=dict)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    user = relationship("User")
+    
+    def __repr__(self):
+        return f"<PaymentOperation {self.kind} {self.id} - {self.status}>"
+
+class PaymentEvent(Base):
+    """Raw provider webhook event, stored on receipt and applied in batches."""
+    __tablename__ = "payment_events"
+    __table_args__ = (
+        Index("ix_payment_events_pending", "id", postgresql_where=text("status = 'pending'")),
+    )
+    
+    id = Column(BigInteger, primary_key=True)
+    event_id = Column(String, nullable=False, index=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, default="pending", nullable=False)  # pending, processed, duplicate, ignored
+    received_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<PaymentEvent {self.event_type} {self.event_id} - {self.status}>"
+
+class PaymentLedgerEntry(Base):
+    """Append-only movement of a payment amount into or out of a status bucket.
+
+    A status change is two entries (out of the old status, into the new one);
+    summing entries per solver and status gives the solver's balances.
+    """
+    __tablename__ = "payment_ledger"
+    
+    id = Column(BigInteger, primary_key=True)
+    payment_id = Column(Integer, nullable=True, index=True)  # null for rebuild adjustments
+    solver_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String, nullable=False)
+    amount = Column(Numeric(12, 2), nullable=False)  # signed
+    count_delta = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<PaymentLedgerEntry {self.status} {self.amount:+}>"
+
+class SolverBalance(Base):
+    """Per-solver rollup of the payment ledger, kept current with every change."""
+    __tablename__ = "solver_balances"
+    
+    solver_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    earned = Column(Numeric(12, 2), nullable=False, default=0)
+    pending = Column(Numeric(12, 2), nullable=False, default=0)
+    released = Column(Numeric(12, 2), nullable=False, default=0)
+    paid = Column(Numeric(12, 2), nullable=False, default=0)
+    payment_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<SolverBalance solver={self.solver_id} earned={self.earned}>"
+
+class PayoutRun(Base):
+    """One scheduled pass that pays out released payments, grouped per solver."""
+    __tablename__ = "payout_runs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, default="running", nullable=False)  # running, completed, partial, failed
+    payout_count = Column(Integer, default=0, nullable=False)
+    payment_count = Column(Integer, default=0, nullable=False)
+    total_amount = Column(Numeric(12, 2), default=0, nullable=False)
+    failed_count = Column(Integer, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    items = relationship("PayoutRunItem", back_populates="run")
+    
+    def __repr__(self):
+        return f"<PayoutRun {self.id} - {self.status}>"
+
+class PayoutRunItem(Base):
+    """A single provider payout covering one or more payments of a solver.
+
+    Items without a run are payouts a solver requested for one payment.
+    """
+    __tablename__ = "payout_run_items"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("payout_runs.id", ondelete="CASCADE"), nullable=True, index=True)
+    solver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    destination = Column(String, nullable=False)
+    amount = Column(Numeric(12, 2), nullable=False)
+    payment_count = Column(Integer, default=0, nullable=False)
+    status = Column(String, default="pending", nullable=False, index=True)  # pending, paid, failed, needs_review
+    stripe_payout_id = Column(String, nullable=True, index=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    run = relationship("PayoutRun", back_populates="items")
+    
+    def __repr__(self):
+        return f"<PayoutRunItem {self.id} ${self.amount} - {self.status}>"
+
+class PayoutRunPayment(Base):
+    """Membership of a payment in a payout item (kept after failures for audit)."""
+    __tablename__ = "payout_run_payments"
+    
+    item_id = Column(Integer, ForeignKey("payout_run_items.id", ondelete="CASCADE"), primary_key=True)
+    payment_id = Column(Integer, ForeignKey("project_payments.id", ondelete="CASCADE"), primary_key=True, index=True)
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, Enum, DateTime, ForeignKey, Boolean, Float, Date, Numeric
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Enum, DateTime, ForeignKey, Boolean, Float, Date, Numeric, UniqueConstraint, literal, null
+from sqlalchemy.orm import query_expression, relationship
 from datetime import datetime
 import enum
 
@@ -39,6 +39,15 @@ class Project(Base):
     assigned_solver_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+    # Applications ever accepted into the queue; numbers the next queue position
+    applications_received = Column(Integer, default=0, nullable=False)
+    
+    # Listing figures filled in by the query with with_expression()
+    pending_applications = query_expression(literal(0))
+    applications_count = query_expression(literal(0))
+    buyer_name = query_expression(null())
+    description_snippet = query_expression(null())
     
     # Relationships
     buyer = relationship("User", back_populates="projects_created", foreign_keys=[buyer_id])
@@ -54,6 +63,10 @@ class Project(Base):
 class ProjectRequest(Base):
     """Problem solver request to work on a project."""
     __tablename__ = "project_requests"
+    __table_args__ = (
+        # One application per solver per project; apply relies on this for ON CONFLICT
+        UniqueConstraint("project_id", "problem_solver_id", name="uq_project_requests_project_solver"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
@@ -139,8 +152,9 @@ class ProjectPayment(Base):
     solver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     amount = Column(Numeric(10, 2), nullable=False)
     status = Column(String, default="pending")  # pending, released, paid
-    stripe_payment_intent_id = Column(String, nullable=True)
+    stripe_payment_intent_id = Column(String, nullable=True, unique=True)
     stripe_payout_id = Column(String, nullable=True)
+    payout_item_id = Column(Integer, ForeignKey("payout_run_items.id", ondelete="SET NULL"), nullable=True, index=True)  # payout in progress
     payment_method = Column(String, default="stripe")  # stripe, bank_transfer, etc
     description = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,61 @@
+from sqlalchemy import Column, Computed, Integer, String, DateTime, Enum, ForeignKey, Index, JSON, Numeric
+from datetime import datetime
+
+from ..core.database import Base
+from .project import ProjectCategory
+
+class StatsSnapshot(Base):
+    """Precomputed statistics served to dashboards instead of live aggregates."""
+    __tablename__ = "stats_snapshots"
+    
+    name = Column(String, primary_key=True)
+    payload = Column(JSON, nullable=False)
+    computed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    refresh_requested_at = Column(DateTime, nullable=True)  # set while a refresh job is queued
+
+class AnalyticsRollup(Base):
+    """Activity counts and amounts per hour or day, metric and project category."""
+    __tablename__ = "analytics_rollups"
+    
+    granularity = Column(String(4), primary_key=True)  # hour, day
+    metric = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)  # start of the hour/day (UTC)
+    category = Column(Enum(ProjectCategory), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    amount = Column(Numeric(14, 2), nullable=False, default=0)
+
+# Percentage of applications accepted, kept by PostgreSQL so it can be indexed
+_ACCEPTANCE_RATE = "CASE WHEN applications > 0 THEN round(accepted * 100.0 / applications, 1) ELSE 0 END"
+
+class SolverStats(Base):
+    """Per-solver application and project counters, kept current on every transition."""
+    __tablename__ = "solver_stats"
+    __table_args__ = (
+        Index("ix_solver_stats_completed", "completed", "solver_id"),
+        Index("ix_solver_stats_acceptance_rate", "acceptance_rate", "solver_id"),
+    )
+    
+    solver_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    applications = Column(Integer, nullable=False, default=0)
+    accepted = Column(Integer, nullable=False, default=0)
+    active = Column(Integer, nullable=False, default=0)  # assigned or in progress
+    completed = Column(Integer, nullable=False, default=0)
+    acceptance_rate = Column(Numeric(4, 1), Computed(_ACCEPTANCE_RATE, persisted=True))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class SolverCategoryStats(Base):
+    """The same counters per project category, for category leaderboards."""
+    __tablename__ = "solver_category_stats"
+    __table_args__ = (
+        Index("ix_solver_category_stats_completed", "category", "completed", "solver_id"),
+        Index("ix_solver_category_stats_acceptance_rate", "category", "acceptance_rate", "solver_id"),
+    )
+    
+    solver_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    category = Column(Enum(ProjectCategory), primary_key=True)
+    applications = Column(Integer, nullable=False, default=0)
+    accepted = Column(Integer, nullable=False, default=0)
+    active = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    acceptance_rate = Column(Numeric(4, 1), Computed(_ACCEPTANCE_RATE, persisted=True))
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
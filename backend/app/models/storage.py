@@ -0,0 +1,65 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Boolean, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+
+from ..core.database import Base
+
+class Blob(Base):
+    """Content-addressed stored file, shared by every submission with the same bytes."""
+    __tablename__ = "blobs"
+    
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    storage_path = Column(String, nullable=False)
+    ref_count = Column(Integer, default=0, nullable=False)
+    tier = Column(String, default="hot", nullable=False)  # hot, cold
+    cold_key = Column(String, nullable=True)
+    cold_size = Column(BigInteger, nullable=True)
+    tier_changed_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<Blob {self.sha256[:12]} refs={self.ref_count}>"
+
+class ArchiveIndex(Base):
+    """Indexing state of a ZIP archive, keyed by its content hash."""
+    __tablename__ = "archive_indexes"
+    
+    sha256 = Column(String(64), primary_key=True)
+    status = Column(String, default="pending", nullable=False)  # pending, ready, failed
+    entry_count = Column(Integer, default=0, nullable=False)
+    total_uncompressed = Column(BigInteger, default=0, nullable=False)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    queued_at = Column(DateTime, nullable=True)  # last time an index job was enqueued
+    indexed_at = Column(DateTime, nullable=True)
+    
+    # Relationships
+    entries = relationship("ArchiveEntry", back_populates="archive", cascade="all, delete-orphan", passive_deletes=True)
+    
+    def __repr__(self):
+        return f"<ArchiveIndex {self.sha256[:12]} - {self.status}>"
+
+class ArchiveEntry(Base):
+    """One member of an indexed ZIP, copied from its central directory."""
+    __tablename__ = "archive_entries"
+    __table_args__ = (
+        Index("ix_archive_entries_archive_path", "archive_sha256", "path"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    archive_sha256 = Column(String(64), ForeignKey("archive_indexes.sha256", ondelete="CASCADE"), nullable=False)
+    path = Column(String, nullable=False)
+    is_dir = Column(Boolean, default=False, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    compressed_size = Column(BigInteger, nullable=False)
+    crc32 = Column(BigInteger, nullable=False)
+    sha256 = Column(String(64), nullable=True)  # of the uncompressed member
+    compress_type = Column(Integer, nullable=False)
+    header_offset = Column(BigInteger, nullable=False)
+    
+    # Relationships
+    archive = relationship("ArchiveIndex", back_populates="entries")
+    
+    def __repr__(self):
+        return f"<ArchiveEntry {self.path}>"
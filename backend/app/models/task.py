@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Enum, DateTime, ForeignKey, Date
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Enum, DateTime, ForeignKey, Date, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -44,12 +44,18 @@ class SubmissionStatus(str, enum.Enum):
 class Submission(Base):
     """Work submission model."""
     __tablename__ = "submissions"
+    __table_args__ = (
+        UniqueConstraint("task_id", "version", name="uq_submissions_task_version"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False)
+    version = Column(Integer, nullable=True)  # 1, 2, ... per task, in submission order
     problem_solver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     file_path = Column(String, nullable=False)
     file_name = Column(String, nullable=False)
+    file_size = Column(BigInteger, nullable=True)
+    file_sha256 = Column(String(64), nullable=True)
     status = Column(Enum(SubmissionStatus), default=SubmissionStatus.PENDING, nullable=False)
     rejection_reason = Column(Text, nullable=True)
     submitted_at = Column(DateTime, default=datetime.utcnow)
@@ -61,3 +67,22 @@ class Submission(Base):
     
     def __repr__(self):
         return f"<Submission task={self.task_id} - {self.status}>"
+
+class UploadSession(Base):
+    """Resumable upload in progress for a task submission."""
+    __tablename__ = "upload_sessions"
+    
+    id = Column(String(32), primary_key=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False, index=True)
+    problem_solver_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    file_name = Column(String, nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    received_bytes = Column(BigInteger, default=0, nullable=False)
+    temp_path = Column(String, nullable=False)
+    status = Column(String, default="active", nullable=False)  # active, completing, completed
+    submission_id = Column(Integer, ForeignKey("submissions.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f"<UploadSession {self.id} {self.received_bytes}/{self.total_size}>"
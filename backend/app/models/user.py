@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Enum, DateTime, Boolean, DDL, Index, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -14,6 +14,12 @@ class UserRole(str, enum.Enum):
 class User(Base):
     """User model."""
     __tablename__ = "users"
+    __table_args__ = (
+        # Trigram indexes for the admin directory's substring/fuzzy search
+        Index("ix_users_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+        Index("ix_users_full_name_trgm", "full_name", postgresql_using="gin", postgresql_ops={"full_name": "gin_trgm_ops"}),
+        Index("ix_users_created_at", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -21,6 +27,7 @@ class User(Base):
     hashed_password = Column(String, nullable=False)
     role = Column(Enum(UserRole), default=UserRole.PROBLEM_SOLVER, nullable=False)
     is_active = Column(Boolean, default=True)
+    stripe_account_id = Column(String, nullable=True)  # default payout destination
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -32,3 +39,6 @@ class User(Base):
     
     def __repr__(self):
         return f"<User {self.email} - {self.role}>"
+
+# The trigram indexes need pg_trgm in place before the table is created
+event.listen(User.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
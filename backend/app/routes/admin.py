@@ -1,20 +1,124 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
+from ..core.config import settings
 from ..core.database import get_db
 from ..core.dependencies import get_current_admin
+from ..core.jobs import enqueue
+from ..core.payments import get_payment_gateway
+from ..models.payment import PayoutRun
+from ..models.project import Project, ProjectCategory, ProjectPayment, ProjectRequest, ProjectStatus
 from ..models.user import User, UserRole
-from ..schemas.user import UserResponse, UserDetailResponse, UserRoleUpdate
+from ..schemas.payment import PayoutRunResponse, PayoutRunDetailResponse
+from ..schemas.user import UserResponse, UserDetailResponse, UserRoleUpdate, UserBulkUpdate, UserBulkResponse
+from ..services import analytics, stats
+from ..services.exports import (
+    PAYMENT_COLUMNS, PROJECT_COLUMNS, REQUEST_COLUMNS, date_range, export_response
+)
+from ..services.users import BULK_MAX_IDS, EXPORT_COLUMNS, bulk_update_users, user_filters
+from ..services.payouts import run_payouts
 
 router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(get_current_admin)])
 
 @router.get("/users", response_model=List[UserDetailResponse])
-def get_all_users(db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
-    """Get all users (admin only)."""
-    users = db.query(User).offset(skip).limit(limit).all()
+def get_all_users(
+    response: Response,
+    db: Session = Depends(get_db),
+    role: Optional[UserRole] = None,
+    is_active: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    search: Optional[str] = None,
+    after_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=500)
+):
+    """List users by id, filtered and searched (admin only).
+
+    Page with ``after_id``: when more users may follow, the ``X-Next-Cursor``
+    header holds the value to pass for the next page. ``skip`` still works
+    but gets slower the deeper it goes.
+    """
+    query = db.query(User).filter(*user_filters(role, is_active, created_from, created_to, search))
+    if after_id is not None:
+        query = query.filter(User.id > after_id)
+    users = query.order_by(User.id).offset(skip).limit(limit).all()
+    
+    if len(users) == limit:
+        response.headers["X-Next-Cursor"] = str(users[-1].id)
     return users
 
+@router.get("/users/export")
+def export_users(
+    db: Session = Depends(get_db),
+    format: str = "csv",
+    role: Optional[UserRole] = None,
+    is_active: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    search: Optional[str] = None
+):
+    """Stream the filtered user directory as CSV or NDJSON (admin only).
+
+    Rows come from a server-side cursor in batches, so memory use does not
+    grow with the number of users.
+    """
+    statement = select(*EXPORT_COLUMNS).where(
+        *user_filters(role, is_active, created_from, created_to, search)
+    ).order_by(User.id)
+    return export_response(db, statement, format, "users")
+
+@router.post("/users/bulk", response_model=UserBulkResponse)
+def bulk_update(
+    data: UserBulkUpdate,
+    current_user: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """Change the role and/or activation of many users at once (admin only).
+
+    Give either ``user_ids`` (up to 10000, one result per id) or a
+    ``filter`` like the user directory's (one result per updated user).
+    Everything is applied in a single statement.
+    """
+    if (data.user_ids is None) == (data.filter is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Give either user_ids or filter"
+        )
+    
+    if data.filter is not None and not data.filter.model_dump(exclude_none=True):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="An empty filter would match every user"
+        )
+    
+    if data.role is None and data.is_active is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nothing to change: give role and/or is_active"
+        )
+    
+    if data.user_ids is not None and len(data.user_ids) > BULK_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BULK_MAX_IDS} user ids per request"
+        )
+    
+    results = bulk_update_users(
+        db, current_user.id, role=data.role, is_active=data.is_active,
+        user_ids=set(data.user_ids) if data.user_ids is not None else None,
+        conditions=user_filters(**data.filter.model_dump()) if data.filter is not None else ()
+    )
+    db.commit()
+    
+    return {
+        "updated": sum(1 for result in results if result["status"] == "updated"),
+        "results": results
+    }
+
 @router.get("/users/{user_id}", response_model=UserDetailResponse)
 def get_user(user_id: int, db: Session = Depends(get_db)):
     """Get user details (admin only)."""
@@ -80,61 +184,144 @@ def activate_user(user_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/stats")
-def get_system_stats(db: Session = Depends(get_db)):
-    """Get system statistics (admin only)."""
-    from ..models.project import Project, ProjectStatus, ProjectPayment
-    
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.is_active == True).count()
-    buyers = db.query(User).filter(User.role == UserRole.BUYER).count()
-    solvers = db.query(User).filter(User.role == UserRole.PROBLEM_SOLVER).count()
-    admins = db.query(User).filter(User.role == UserRole.ADMIN).count()
-    
-    total_projects = db.query(Project).count()
-    open_projects = db.query(Project).filter(Project.status == ProjectStatus.OPEN).count()
-    in_progress_projects = db.query(Project).filter(
-        Project.status.in_([ProjectStatus.ASSIGNED, ProjectStatus.IN_PROGRESS])
-    ).count()
-    completed_projects = db.query(Project).filter(Project.status == ProjectStatus.COMPLETED).count()
-    
-    total_payments = db.query(ProjectPayment).count()
-    pending_payments = db.query(ProjectPayment).filter(ProjectPayment.status == "pending").count()
-    released_payments = db.query(ProjectPayment).filter(ProjectPayment.status == "released").count()
-    
-    # Calculate total payment amounts
-    from sqlalchemy import func
-    total_payment_amount = db.query(func.sum(ProjectPayment.amount)).scalar() or 0
-    released_payment_amount = db.query(func.sum(ProjectPayment.amount)).filter(
-        ProjectPayment.status == "released"
-    ).scalar() or 0
+def get_system_stats(db: Session = Depends(get_db), refresh: bool = False):
+    """Get system statistics (admin only).
+
+    Served from a snapshot refreshed in the background; ``stale_after`` says
+    when it is due for a refresh. Pass ``refresh=true`` to recompute now.
+    """
+    return stats.get_system_stats(db, refresh=refresh)
+
+@router.get("/analytics")
+def get_analytics(
+    db: Session = Depends(get_db),
+    metric: Optional[List[str]] = Query(None),
+    granularity: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    category: Optional[ProjectCategory] = None
+):
+    """Activity over time per project category (admin only).
+
+    Reads the hourly/daily rollups, so a year of daily data is a few hundred
+    rows per metric and category. Defaults to every metric over the last 30
+    days (2 days hourly).
+    """
+    if granularity not in analytics.GRANULARITIES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"granularity must be one of: {', '.join(analytics.GRANULARITIES)}"
+        )
     
-    return {
-        "users": {
-            "total": total_users,
-            "active": active_users,
-            "buyers": buyers,
-            "solvers": solvers,
-            "admins": admins
-        },
-        "projects": {
-            "total": total_projects,
-            "open": open_projects,
-            "in_progress": in_progress_projects,
-            "completed": completed_projects
-        },
-        "payments": {
-            "total": total_payments,
-            "pending": pending_payments,
-            "released": released_payments,
-            "total_amount": float(total_payment_amount),
-            "released_amount": float(released_payment_amount)
-        }
-    }
+    metrics = metric or list(analytics.METRICS)
+    unknown = set(metrics) - set(analytics.METRICS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown metric(s): {', '.join(sorted(unknown))}"
+        )
+    
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=30 if granularity == "day" else 2)
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+    if granularity == "hour" and end - start > timedelta(days=settings.analytics_max_hourly_days):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Hourly series are limited to {settings.analytics_max_hourly_days} days"
+        )
+    
+    return analytics.get_series(db, metrics, granularity, start, end, category)
+
+@router.get("/payment-provider")
+def get_payment_provider_stats():
+    """Circuit state and call latency/error metrics of the payment provider client.
+
+    Figures cover this process only; with Celery, provider calls run in the workers.
+    """
+    return get_payment_gateway().stats()
+
+@router.post("/payout-runs", status_code=status.HTTP_202_ACCEPTED)
+def start_payout_run():
+    """Queue a batched payout of all released payments (admin only).
+
+    A run already in progress makes the queued one a no-op.
+    """
+    enqueue(run_payouts)
+    return {"queued": True}
+
+@router.get("/payout-runs", response_model=List[PayoutRunResponse])
+def get_payout_runs(db: Session = Depends(get_db), skip: int = 0, limit: int = 50):
+    """List payout runs, newest first (admin only)."""
+    return db.query(PayoutRun).order_by(PayoutRun.id.desc()).offset(skip).limit(limit).all()
+
+@router.get("/payout-runs/{run_id}", response_model=PayoutRunDetailResponse)
+def get_payout_run(run_id: int, db: Session = Depends(get_db)):
+    """Get a payout run with its per-solver payouts (admin only)."""
+    run = db.query(PayoutRun).filter(PayoutRun.id == run_id).first()
+    if not run:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Payout run not found"
+        )
+    return run
 
 @router.get("/projects")
 def get_all_projects(db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
-    """Get all projects (admin only)."""
-    from ..models.project import Project
-    
+    """Get all projects (admin only). For bulk pulls use ``/admin/exports/projects``."""
     projects = db.query(Project).offset(skip).limit(limit).all()
     return projects
+
+@router.get("/exports/projects")
+def export_projects(
+    db: Session = Depends(get_db),
+    format: str = "csv",
+    project_status: Optional[ProjectStatus] = Query(None, alias="status"),
+    category: Optional[ProjectCategory] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+):
+    """Stream projects as CSV, NDJSON or Parquet (admin only)."""
+    conditions = date_range(Project.created_at, created_from, created_to)
+    if project_status is not None:
+        conditions.append(Project.status == project_status)
+    if category is not None:
+        conditions.append(Project.category == category)
+    statement = select(*PROJECT_COLUMNS).where(*conditions).order_by(Project.id)
+    return export_response(db, statement, format, "projects")
+
+@router.get("/exports/project-requests")
+def export_project_requests(
+    db: Session = Depends(get_db),
+    format: str = "csv",
+    request_status: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+):
+    """Stream project applications as CSV, NDJSON or Parquet (admin only).
+
+    The date range applies to when the application was made.
+    """
+    conditions = date_range(ProjectRequest.requested_at, created_from, created_to)
+    if request_status is not None:
+        conditions.append(ProjectRequest.status == request_status)
+    statement = select(*REQUEST_COLUMNS).where(*conditions).order_by(ProjectRequest.id)
+    return export_response(db, statement, format, "project_requests")
+
+@router.get("/exports/payments")
+def export_payments(
+    db: Session = Depends(get_db),
+    format: str = "csv",
+    payment_status: Optional[str] = Query(None, alias="status"),
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None
+):
+    """Stream project payments as CSV, NDJSON or Parquet (admin only)."""
+    conditions = date_range(ProjectPayment.created_at, created_from, created_to)
+    if payment_status is not None:
+        conditions.append(ProjectPayment.status == payment_status)
+    statement = select(*PAYMENT_COLUMNS).where(*conditions).order_by(ProjectPayment.id)
+    return export_response(db, statement, format, "payments")
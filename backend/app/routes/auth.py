@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from datetime import timedelta
 from app.core.database import SessionLocal
 
-from ..core.database import get_db
+from ..core.database import get_db, release_connection
 from ..core.config import settings
 from ..core.security import verify_password, get_password_hash, create_access_token
 from ..models.user import User, UserRole
@@ -57,6 +57,9 @@ def login(credentials: LoginRequest, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == credentials.email).first()
     users = db.query(User).all()
     
+    # Password hashing is slow; don't hold a pooled connection through it
+    release_connection(db)
+    
     # print("user:", user)
     # print("password:", credentials.password)
     if not user or not verify_password(credentials.password, user.hashed_password):
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy import and_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 from ..core.database import get_db
 from ..core.dependencies import get_current_buyer
+from ..core.responses import ModelResponder, parse_fields, parse_names, sparse_response
 from ..models.user import User
 from ..models.project import Project, ProjectStatus, ProjectRequest, ProjectAssignment, ProjectPayment
 from ..schemas.project import (
@@ -13,9 +14,14 @@ from ..schemas.project import (
     ProjectRequestResponse, AssignSolverRequest, ProjectActionResponse
 )
 from ..schemas.payment import ProjectPaymentResponse
+from ..services.listings import (
+    BUYER_EXPRESSIONS, DETAIL_RELATIONS, application_count, detail_options, listing_options
+)
 
 router = APIRouter(prefix="/buyer", tags=["buyer"], dependencies=[Depends(get_current_buyer)])
 
+project_list_responder = ModelResponder(List[ProjectResponse])
+
 @router.post("/projects", response_model=ProjectResponse)
 def create_project(
     project_data: ProjectCreate,
@@ -42,56 +48,41 @@ def get_my_projects(
     current_user: User = Depends(get_current_buyer),
     db: Session = Depends(get_db),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    fields: Optional[str] = Query(None, description="Comma-separated response fields, e.g. id,title,pending_applications")
 ):
-    """Get all projects created by the buyer with application counts."""
-    from sqlalchemy import func
-    
-    # Get projects with pending application counts
-    projects = db.query(
-        Project,
-        func.count(ProjectRequest.id).label('pending_applications')
-    ).outerjoin(
-        ProjectRequest,
-        and_(
-            ProjectRequest.project_id == Project.id,
-            ProjectRequest.status == 'pending'
-        )
+    """Get all projects created by the buyer with application counts.
+
+    With ``fields`` only those columns are selected and returned.
+    """
+    selected = parse_fields(fields, ProjectResponse) if fields else None
+    projects = db.query(Project).options(
+        *listing_options(selected, BUYER_EXPRESSIONS)
     ).filter(
         Project.buyer_id == current_user.id
-    ).group_by(Project.id).order_by(
-        func.count(ProjectRequest.id).desc(),  # Projects with more pending apps first
+    ).order_by(
+        application_count("pending").desc(),  # Projects with more pending apps first
         Project.created_at.desc()
     ).offset(skip).limit(limit).all()
     
-    # Convert to response format with pending_applications count
-    result = []
-    for project, pending_count in projects:
-        project_dict = {
-            "id": project.id,
-            "title": project.title,
-            "description": project.description,
-            "category": project.category,
-            "budget": project.budget,
-            "status": project.status,
-            "buyer_id": project.buyer_id,
-            "assigned_solver_id": project.assigned_solver_id,
-            "created_at": project.created_at,
-            "updated_at": project.updated_at,
-            "pending_applications": pending_count
-        }
-        result.append(project_dict)
-    
-    return result
+    if selected is not None:
+        return sparse_response(ProjectResponse, selected, projects)
+    return project_list_responder(projects)
 
 @router.get("/projects/{project_id}", response_model=ProjectDetailResponse)
 def get_project(
     project_id: int,
     current_user: User = Depends(get_current_buyer),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    include: Optional[str] = Query(None, description="Comma-separated relations: requests,tasks,sprints,features")
 ):
-    """Get project details (buyer's projects only)."""
-    project = db.query(Project).filter(
+    """Get project details (buyer's projects only).
+
+    Only the relations named in ``include`` are loaded (one query each) and
+    returned; the rest are null.
+    """
+    included = parse_names(include, DETAIL_RELATIONS, "include") if include else ()
+    project = db.query(Project).options(*detail_options(included)).filter(
         and_(Project.id == project_id, Project.buyer_id == current_user.id)
     ).first()
     
@@ -101,7 +92,10 @@ def get_project(
             detail="Project not found"
         )
     
-    return project
+    # Read only the included relations, so the others are never lazy-loaded
+    data = ProjectResponse.model_validate(project).model_dump()
+    data.update({name: getattr(project, name) for name in included})
+    return ProjectDetailResponse.model_validate(data, from_attributes=True)
 
 @router.put("/projects/{project_id}", response_model=ProjectResponse)
 def update_project(
@@ -320,6 +314,7 @@ def approve_payment(
     project = db.query(Project).filter(Project.id == payment.project_id).first()
     if project:
         project.status = ProjectStatus.COMPLETED
+        project.completed_at = payment.released_at
     
     db.commit()
     db.refresh(payment)
@@ -0,0 +1,47 @@
+import os
+import time
+from fastapi import APIRouter, HTTPException, Request, status
+
+from ..core.security import verify_download
+from ..services.downloads import stored_file_response
+
+# No auth dependency and no DB session: the URL itself is the capability
+router = APIRouter(prefix="/files", tags=["files"])
+
+@router.get("/{path:path}", name="download_signed_file")
+def download_signed_file(
+    path: str,
+    name: str,
+    expires: int,
+    signature: str,
+    request: Request
+):
+    """Serve a stored file from a signed, expiring URL (see /submissions/{id}/download-url)."""
+    if not verify_download(path, name, expires, signature):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid or expired download link"
+        )
+    
+    if os.path.isabs(path) or ".." in path.split("/"):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    
+    max_age = max(0, expires - int(time.time()))
+    blob_name = path.rsplit("/", 1)[-1]
+    # A redirect's presigned URL lives exactly as long as this link
+    response = stored_file_response(
+        request,
+        key=path,
+        filename=name,
+        etag=blob_name if len(blob_name) == 64 else None,
+        expires_in=max(1, max_age)
+    )
+    if response.status_code in (status.HTTP_200_OK, status.HTTP_206_PARTIAL_CONTENT):
+        # Content-addressed bytes: safe to cache anywhere until the link expires
+        response.headers["Cache-Control"] = f"public, max-age={max_age}, immutable"
+    else:
+        response.headers["Cache-Control"] = f"private, max-age={max_age}"
+    return response
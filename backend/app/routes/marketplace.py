@@ -1,17 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 from ..core.database import get_db
 from ..core.dependencies import get_current_user
 from ..models.user import User, UserRole
 from ..models.project import Project, ProjectStatus, ProjectCategory, ProjectRequest
+from ..core.responses import ModelResponder, parse_fields, sparse_response
 from ..schemas.project import ProjectMarketplaceResponse, ProjectRequestCreate, ProjectRequestResponse
+from ..services.applications import apply_to_project
+from ..services.listings import MARKETPLACE_EXPRESSIONS, listing_options
 
 router = APIRouter(prefix="/marketplace", tags=["marketplace"])
 
+project_list_responder = ModelResponder(List[ProjectMarketplaceResponse])
+project_responder = ModelResponder(ProjectMarketplaceResponse)
+
 @router.get("/projects", response_model=List[ProjectMarketplaceResponse])
 def browse_projects(
     db: Session = Depends(get_db),
@@ -19,10 +25,18 @@ def browse_projects(
     limit: int = 20,
     category: str = Query(None),
     search: str = Query(None),
-    sort_by: str = Query("created_at", regex="^(created_at|budget|title)$")
+    sort_by: str = Query("created_at", regex="^(created_at|budget|title)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated response fields, e.g. id,title,description_snippet")
 ):
-    """Browse available projects in marketplace."""
-    query = db.query(Project).filter(Project.status == ProjectStatus.OPEN)
+    """Browse available projects in marketplace.
+
+    With ``fields`` only those columns are selected and returned; list views
+    should ask for ``description_snippet`` rather than ``description``.
+    """
+    selected = parse_fields(fields, ProjectMarketplaceResponse) if fields else None
+    query = db.query(Project).options(
+        *listing_options(selected, MARKETPLACE_EXPRESSIONS)
+    ).filter(Project.status == ProjectStatus.OPEN)
     
     if category and category != "all":
         query = query.filter(Project.category == category)
@@ -43,17 +57,12 @@ def browse_projects(
     else:
         query = query.order_by(Project.created_at.desc())
     
+    # Application counts and buyer names come from the same query
     projects = query.offset(skip).limit(limit).all()
     
-    # Format response with application count
-    result = []
-    for project in projects:
-        proj_data = ProjectMarketplaceResponse.from_orm(project)
-        proj_data.applications_count = len(project.requests)
-        proj_data.buyer_name = project.buyer.full_name
-        result.append(proj_data)
-    
-    return result
+    if selected is not None:
+        return sparse_response(ProjectMarketplaceResponse, selected, projects)
+    return project_list_responder(projects)
 
 @router.get("/projects/{project_id}", response_model=ProjectMarketplaceResponse)
 def get_project_details(
@@ -61,7 +70,7 @@ def get_project_details(
     db: Session = Depends(get_db)
 ):
     """Get detailed project information."""
-    project = db.query(Project).filter(
+    project = db.query(Project).options(*listing_options(None, MARKETPLACE_EXPRESSIONS)).filter(
         and_(
             Project.id == project_id,
             Project.status == ProjectStatus.OPEN
@@ -74,11 +83,7 @@ def get_project_details(
             detail="Project not found"
         )
     
-    proj_data = ProjectMarketplaceResponse.from_orm(project)
-    proj_data.applications_count = len(project.requests)
-    proj_data.buyer_name = project.buyer.full_name
-    
-    return proj_data
+    return project_responder(project)
 
 @router.get("/categories")
 def get_categories():
@@ -106,56 +111,45 @@ def apply_for_project(
     """
     Solver applies to work on a project.
     Implements race condition handling - first to apply gets to talk to buyer first.
+    The insert, duplicate check and queue position are a single statement:
+    the position comes from the project's application counter.
     """
-    # Check if project exists and is open
-    project = db.query(Project).filter(
-        and_(
-            Project.id == project_id,
-            Project.status == ProjectStatus.OPEN
-        )
-    ).first()
-    
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found or not available"
-        )
-    
     # Check if user is a problem solver
-    print(current_user.role)
     if current_user.role != UserRole.PROBLEM_SOLVER:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Only problem solvers can apply for projects"
         )
     
-    # Check if user already applied
-    existing_request = db.query(ProjectRequest).filter(
-        and_(
-            ProjectRequest.project_id == project_id,
-            ProjectRequest.problem_solver_id == current_user.id
-        )
-    ).first()
+    applied = apply_to_project(db, project_id, current_user.id)
     
-    if existing_request:
+    if applied is None:
+        # Nothing inserted: find out why (only on the failure path)
+        project = db.query(Project).filter(
+            and_(
+                Project.id == project_id,
+                Project.status == ProjectStatus.OPEN
+            )
+        ).first()
+        
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found or not available"
+            )
+        
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You have already applied for this project"
         )
     
-    # Create new application request
-    new_request = ProjectRequest(
-        project_id=project_id,
-        problem_solver_id=current_user.id,
-        status="pending",
-        requested_at=datetime.utcnow()
-    )
+    new_request, _, queue_position = applied
+    app_data = ProjectRequestResponse.from_orm(new_request)
+    app_data.queue_position = queue_position
     
-    db.add(new_request)
     db.commit()
-    db.refresh(new_request)
     
-    return new_request
+    return app_data
 
 @router.get("/my-applications", response_model=List[ProjectRequestResponse])
 def get_my_applications(
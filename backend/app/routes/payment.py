@@ -1,30 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
 from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
-import os
-
-import stripe
+from typing import List, Optional
+import json
 
+from ..core.config import settings
 from ..core.database import get_db
 from ..core.dependencies import get_current_user
+from ..core.jobs import enqueue
+from ..core.payments import verify_webhook_signature
 from ..models.user import User, UserRole
+from ..models.payment import PaymentOperation, SolverBalance
 from ..models.project import Project, ProjectPayment
-from ..schemas.payment import ProjectPaymentResponse, ProjectPaymentCreate, PayoutRequest, PayoutResponse
-
-# Initialize Stripe API
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY", "sk_test_...")
+from ..schemas.payment import ProjectPaymentResponse, PayoutRequest, PayoutAccountUpdate, PaymentOperationResponse
+from ..services.payment_events import process_payment_events, store_event
+from ..services.payments import dispatch, requeue_if_stalled, submit_operation
+from ..services.payouts import claim_payment
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
-@router.post("/projects/{project_id}/create-payment-intent")
+def _queue_operation(db: Session, user_id: int, kind: str, idempotency_key: Optional[str], **fields) -> PaymentOperationResponse:
+    """Record an operation, commit, and hand it to a worker.
+
+    Replaying an ``Idempotency-Key`` returns the operation recorded for it.
+    """
+    operation, created = submit_operation(db, user_id, kind, idempotency_key, **fields)
+    if not created and (
+        operation.kind != kind
+        or operation.project_id != fields.get("project_id")
+        or operation.payment_id != fields.get("payment_id")
+    ):
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Idempotency-Key was already used for a different request"
+        )
+    
+    response = PaymentOperationResponse.from_orm(operation)
+    db.commit()
+    if created:
+        dispatch(response.id)
+    return response
+
+@router.post(
+    "/projects/{project_id}/create-payment-intent",
+    response_model=PaymentOperationResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
 def create_payment_intent(
     project_id: int,
     amount: float,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Create a Stripe payment intent for project budget."""
+    """
+    Queue creation of a Stripe payment intent for project budget.
+    Poll the returned operation for the client secret.
+    """
     project = db.query(Project).filter(Project.id == project_id).first()
     
     if not project:
@@ -39,35 +71,34 @@ def create_payment_intent(
             detail="Only project owner can create payments"
         )
     
-    try:
-        intent = stripe.PaymentIntent.create(
-            amount=int(amount * 100),  # Convert to cents
-            currency="usd",
-            metadata={
-                "project_id": project_id,
-                "buyer_id": current_user.id
-            }
-        )
-        
-        return {
-            "client_secret": intent.client_secret,
-            "payment_intent_id": intent.id,
-            "status": intent.status
-        }
-    except stripe.error.StripeError as e:
+    if amount <= 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Stripe error: {str(e)}"
+            detail="Amount must be positive"
         )
+    
+    return _queue_operation(
+        db, current_user.id, "create_payment_intent", idempotency_key,
+        project_id=project_id,
+        params={"amount_cents": int(round(amount * 100))}  # Convert to cents
+    )
 
-@router.post("/projects/{project_id}/confirm-payment", response_model=ProjectPaymentResponse)
+@router.post(
+    "/projects/{project_id}/confirm-payment",
+    response_model=PaymentOperationResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
 def confirm_payment(
     project_id: int,
     payment_intent_id: str,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Confirm payment and create payment record."""
+    """
+    Queue confirmation of a payment intent; the payment record is created
+    once Stripe reports the intent as succeeded.
+    """
     project = db.query(Project).filter(Project.id == project_id).first()
     
     if not project:
@@ -82,36 +113,11 @@ def confirm_payment(
             detail="No solver assigned to this project"
         )
     
-    try:
-        intent = stripe.PaymentIntent.retrieve(payment_intent_id)
-        
-        if intent.status != "succeeded":
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Payment not completed"
-            )
-        
-        # Create payment record
-        payment = ProjectPayment(
-            project_id=project_id,
-            solver_id=project.assigned_solver_id,
-            amount=intent.amount / 100,  # Convert from cents
-            status="released",
-            stripe_payment_intent_id=payment_intent_id,
-            released_at=datetime.utcnow()
-        )
-        
-        db.add(payment)
-        db.commit()
-        db.refresh(payment)
-        
-        return payment
-        
-    except stripe.error.StripeError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Stripe error: {str(e)}"
-        )
+    return _queue_operation(
+        db, current_user.id, "confirm_payment", idempotency_key,
+        project_id=project_id,
+        params={"payment_intent_id": payment_intent_id, "solver_id": project.assigned_solver_id}
+    )
 
 @router.get("/my-payments", response_model=List[ProjectPaymentResponse])
 def get_my_payments(
@@ -158,14 +164,15 @@ def get_project_payments(
     
     return payments
 
-@router.post("/payout", response_model=PayoutResponse)
+@router.post("/payout", response_model=PaymentOperationResponse, status_code=status.HTTP_202_ACCEPTED)
 def create_payout(
     payout_request: PayoutRequest,
+    idempotency_key: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """
-    Create a Stripe payout for a payment.
+    Queue a Stripe payout for a payment.
     Solver can request payout for completed work.
     """
     payment = db.query(ProjectPayment).filter(
@@ -184,43 +191,91 @@ def create_payout(
             detail="You can only request payout for your own payments"
         )
     
+    if idempotency_key and db.query(PaymentOperation.id).filter(
+        PaymentOperation.user_id == current_user.id,
+        PaymentOperation.idempotency_key == idempotency_key
+    ).first():
+        # Replayed request: return the operation already recorded for the key
+        return _queue_operation(
+            db, current_user.id, "payout", idempotency_key,
+            project_id=payment.project_id,
+            payment_id=payment.id
+        )
+    
     if payment.status != "released":
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Payment must be in 'released' state to create payout"
         )
     
-    try:
-        # Create payout to Stripe connected account
-        payout = stripe.Payout.create(
-            amount=int(float(payment.amount) * 100),
-            currency="usd",
-            method="instant",
-            destination=payout_request.stripe_account_id,
-            metadata={
-                "payment_id": payment.id,
-                "project_id": payment.project_id
-            }
-        )
-        
-        # Update payment record
-        payment.status = "paid"
-        payment.stripe_payout_id = payout.id
-        payment.paid_at = datetime.utcnow()
-        db.commit()
-        
-        return PayoutResponse(
-            payout_id=payout.id,
-            status=payout.status,
-            amount=payment.amount,
-            arrival_date=datetime.fromtimestamp(payout.arrival_date)
-        )
-        
-    except stripe.error.StripeError as e:
+    if payment.payout_item_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A payout for this payment is already in progress"
+        )
+    
+    destination = payout_request.stripe_account_id or current_user.stripe_account_id
+    if not destination:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Stripe error: {str(e)}"
+            detail="No payout account given or configured"
+        )
+    
+    item = claim_payment(db, payment, destination)
+    if item is None:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A payout for this payment is already in progress"
         )
+    
+    # Payout to the Stripe connected account happens in the background; the
+    # claim commits together with the operation
+    return _queue_operation(
+        db, current_user.id, "payout", idempotency_key,
+        project_id=payment.project_id,
+        payment_id=payment.id,
+        params={"payout_item_id": item.id}
+    )
+
+@router.put("/payout-account")
+def set_payout_account(
+    data: PayoutAccountUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Set the Stripe connected account that payout runs pay into."""
+    if current_user.role != UserRole.PROBLEM_SOLVER:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only problem solvers can set a payout account"
+        )
+    
+    current_user.stripe_account_id = data.stripe_account_id
+    db.commit()
+    
+    return {"stripe_account_id": current_user.stripe_account_id}
+
+@router.get("/operations/{operation_id}", response_model=PaymentOperationResponse)
+def get_payment_operation(
+    operation_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Poll a queued payment operation."""
+    operation = db.query(PaymentOperation).filter(
+        PaymentOperation.id == operation_id,
+        PaymentOperation.user_id == current_user.id
+    ).first()
+    
+    if not operation:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Operation not found"
+        )
+    
+    requeue_if_stalled(operation)
+    return operation
 
 @router.get("/stats")
 def get_payment_stats(
@@ -234,17 +289,54 @@ def get_payment_stats(
             detail="Only problem solvers can view stats"
         )
     
-    payments = db.query(ProjectPayment).filter(
-        ProjectPayment.solver_id == current_user.id
-    ).all()
-    
-    total_earned = sum(float(p.amount) for p in payments)
-    paid_amount = sum(float(p.amount) for p in payments if p.status == "paid")
-    pending_amount = sum(float(p.amount) for p in payments if p.status in ["pending", "released"])
+    # Single-row read of the ledger rollup
+    balance = db.query(SolverBalance).filter(SolverBalance.solver_id == current_user.id).first()
+    if balance is None:
+        balance = SolverBalance(earned=0, pending=0, released=0, paid=0, payment_count=0)
     
     return {
-        "total_earned": total_earned,
-        "paid_amount": paid_amount,
-        "pending_amount": pending_amount,
-        "payment_count": len(payments)
+        "total_earned": float(balance.earned),
+        "paid_amount": float(balance.paid),
+        "pending_amount": float(balance.pending + balance.released),
+        "released_amount": float(balance.released),
+        "payment_count": balance.payment_count
     }
+
+@router.post("/webhook")
+async def stripe_webhook(
+    request: Request,
+    stripe_signature: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Receive Stripe webhook events.
+    Events are stored as received and applied in batches by a background job.
+    """
+    if not settings.stripe_webhook_secret:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Webhook secret not configured"
+        )
+    
+    payload = await request.body()
+    if not stripe_signature or not verify_webhook_signature(payload, stripe_signature, settings.stripe_webhook_secret):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid signature"
+        )
+    
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        event = None
+    if not isinstance(event, dict) or "id" not in event or "type" not in event:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid event payload"
+        )
+    
+    store_event(db, event)
+    db.commit()
+    enqueue(process_payment_events)
+    
+    return {"received": True}
@@ -1,13 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from ..core.database import get_db
 from ..core.dependencies import get_current_user
 from ..models.user import User, UserRole
-from ..models.project import Project, ProjectRequest
+from ..models.payment import SolverBalance
+from ..models.project import ProjectCategory
+from ..models.stats import SolverCategoryStats, SolverStats
 from ..schemas.user import UserResponse
 
+LEADERBOARD_ORDERS = ("completed", "acceptance_rate")
+
 router = APIRouter(prefix="/profiles", tags=["profiles"])
 
 @router.get("/solver/{solver_id}")
@@ -17,36 +21,23 @@ def get_solver_profile(
     current_user: User = Depends(get_current_user)
 ):
     """Get public profile of a problem solver."""
-    solver = db.query(User).filter(
+    # Statistics come precomputed, kept current on every application and
+    # project transition, so this is a single-row lookup
+    row = db.query(User, SolverStats, SolverBalance.earned).outerjoin(
+        SolverStats, SolverStats.solver_id == User.id
+    ).outerjoin(
+        SolverBalance, SolverBalance.solver_id == User.id
+    ).filter(
         User.id == solver_id,
         User.role == UserRole.PROBLEM_SOLVER
     ).first()
     
-    if not solver:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Solver not found"
         )
-    
-    # Get solver's statistics
-    total_applications = db.query(ProjectRequest).filter(
-        ProjectRequest.problem_solver_id == solver_id
-    ).count()
-    
-    accepted_applications = db.query(ProjectRequest).filter(
-        ProjectRequest.problem_solver_id == solver_id,
-        ProjectRequest.status == "accepted"
-    ).count()
-    
-    completed_projects = db.query(Project).filter(
-        Project.assigned_solver_id == solver_id,
-        Project.status == "completed"
-    ).count()
-    
-    active_projects = db.query(Project).filter(
-        Project.assigned_solver_id == solver_id,
-        Project.status.in_(["assigned", "in_progress"])
-    ).count()
+    solver, stats, earned = row
     
     return {
         "id": solver.id,
@@ -56,10 +47,58 @@ def get_solver_profile(
         "is_active": solver.is_active,
         "created_at": solver.created_at,
         "statistics": {
-            "total_applications": total_applications,
-            "accepted_applications": accepted_applications,
-            "completed_projects": completed_projects,
-            "active_projects": active_projects,
-            "acceptance_rate": round((accepted_applications / total_applications * 100) if total_applications > 0 else 0, 1)
+            "total_applications": stats.applications if stats else 0,
+            "accepted_applications": stats.accepted if stats else 0,
+            "completed_projects": stats.completed if stats else 0,
+            "active_projects": stats.active if stats else 0,
+            "acceptance_rate": float(stats.acceptance_rate) if stats else 0.0,
+            "total_earned": float(earned or 0)
         }
     }
+
+@router.get("/leaderboard")
+def get_leaderboard(
+    by: str = "completed",
+    category: Optional[ProjectCategory] = None,
+    min_applications: int = Query(5, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Top solvers by completed projects or acceptance rate, optionally per category.
+
+    Read in index order from the precomputed stats. Rankings by acceptance
+    rate only include solvers with at least ``min_applications`` applications.
+    """
+    if by not in LEADERBOARD_ORDERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"by must be one of: {', '.join(LEADERBOARD_ORDERS)}"
+        )
+    
+    table = SolverCategoryStats if category is not None else SolverStats
+    query = db.query(table, User.full_name).join(User, User.id == table.solver_id).filter(
+        User.is_active.is_(True)
+    )
+    if category is not None:
+        query = query.filter(SolverCategoryStats.category == category)
+    
+    if by == "acceptance_rate":
+        query = query.filter(table.applications >= max(min_applications, 1)).order_by(
+            table.acceptance_rate.desc(), table.solver_id.desc()
+        )
+    else:
+        query = query.filter(table.completed > 0).order_by(table.completed.desc(), table.solver_id.desc())
+    
+    return [
+        {
+            "rank": rank,
+            "solver_id": stats.solver_id,
+            "full_name": full_name,
+            "completed_projects": stats.completed,
+            "active_projects": stats.active,
+            "total_applications": stats.applications,
+            "acceptance_rate": float(stats.acceptance_rate)
+        }
+        for rank, (stats, full_name) in enumerate(query.limit(limit).all(), start=1)
+    ]
@@ -1,19 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request, Response
 from sqlalchemy import and_
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from typing import List
 from datetime import datetime
 import os
-import shutil
 
-from ..core.database import get_db
+from ..core.config import settings
+from ..core.database import connection_released, get_db, release_connection
 from ..core.dependencies import get_current_problem_solver
+from ..core.jobs import enqueue
 from ..models.user import User, UserRole
-from ..models.project import Project, ProjectStatus, ProjectRequest, ProjectPayment
-from ..models.task import Task, TaskStatus, Submission, SubmissionStatus
+from ..models.project import Project, ProjectStatus, ProjectPayment
+from ..models.task import Task, TaskStatus, UploadSession
 from ..schemas.project import ProjectResponse, ProjectRequestResponse, ProjectActionResponse
-from ..schemas.task import TaskCreate, TaskResponse, TaskDetailResponse, TaskUpdate
+from ..schemas.task import TaskCreate, TaskResponse, TaskDetailResponse, TaskUpdate, UploadSessionCreate, UploadSessionResponse
 from ..schemas.payment import ProjectPaymentCreate
+from ..services.applications import apply_to_project
+from ..services.archives import index_archive
+from ..services.blobs import (
+    BlobContentMissing, ingest_blob, ingest_stored_blob, staging_path, store_blob_content,
+)
+from ..services.resumable import (
+    UploadBusy, UploadClosed, UploadExpired, UploadOffsetMismatch, append_chunk, create_upload_session, finalize_upload,
+    reopen_upload, session_expires_at
+)
+from ..services.submissions import record_submission
+from ..services.uploads import InvalidUpload, UploadTooLarge, stream_multipart_file_to_disk
 
 router = APIRouter(prefix="/solver", tags=["problem-solver"], dependencies=[Depends(get_current_problem_solver)])
 
@@ -56,48 +69,39 @@ def request_project(
     db: Session = Depends(get_db)
 ):
     """Request to work on a project."""
-    project = db.query(Project).filter(Project.id == project_id).first()
-    
-    if not project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-    
-    if project.status != ProjectStatus.OPEN:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Project is not available for requests"
-        )
-    
-    # Check if already requested
-    existing_request = db.query(ProjectRequest).filter(
-        and_(
-            ProjectRequest.project_id == project_id,
-            ProjectRequest.problem_solver_id == current_user.id
-        )
-    ).first()
-    
-    if existing_request:
+    applied = apply_to_project(db, project_id, current_user.id)
+    
+    if applied is None:
+        # Nothing inserted: find out why (only on the failure path)
+        project = db.query(Project).filter(Project.id == project_id).first()
+        
+        if not project:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Project not found"
+            )
+        
+        if project.status != ProjectStatus.OPEN:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Project is not available for requests"
+            )
+        
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="You have already requested this project"
         )
     
-    # Create request
-    request = ProjectRequest(
-        project_id=project_id,
-        problem_solver_id=current_user.id,
-        status="pending"
-    )
+    _, project, queue_position = applied
+    response = {
+        "message": "Request submitted successfully",
+        "project": ProjectResponse.from_orm(project),
+        "queue_position": queue_position
+    }
     
-    db.add(request)
     db.commit()
     
-    return {
-        "message": "Request submitted successfully",
-        "project": project
-    }
+    return response
 
 @router.get("/my-assignments", response_model=List[ProjectResponse])
 def get_my_assignments(
@@ -259,14 +263,30 @@ def update_task(
     
     return task
 
-@router.post("/tasks/{task_id}/submit")
+# The body is parsed by the handler, so describe it for the OpenAPI schema
+SUBMIT_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    }
+}
+
+@router.post("/tasks/{task_id}/submit", openapi_extra=SUBMIT_REQUEST_BODY)
 async def submit_task(
     task_id: int,
-    file: UploadFile = File(...),
+    request: Request,
     current_user: User = Depends(get_current_problem_solver),
     db: Session = Depends(get_db)
 ):
-    """Submit work as ZIP file."""
+    """Submit work as ZIP file (multipart field ``file``).
+
+    The body is streamed to disk as it arrives rather than spooled by the
+    framework first, so oversized uploads are refused early.
+    """
     task = db.query(Task).filter(
         and_(Task.id == task_id, Task.problem_solver_id == current_user.id)
     ).first()
@@ -277,44 +297,245 @@ async def submit_task(
             detail="Task not found"
         )
     
-    if not file.filename.endswith('.zip'):
+    # Stream to disk in chunks (never holds the whole ZIP in memory)
+    staged = staging_path(".zip")
+    try:
+        with connection_released(db):
+            file_name, stored = await stream_multipart_file_to_disk(
+                request, "file", staged, suffix=".zip"
+            )
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except InvalidUpload as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except OSError:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to save file"
+        )
+    
+    try:
+        # Identical archives share one blob
+        stored = ingest_blob(db, stored)
+        submission = record_submission(db, task, current_user.id, file_name, stored)
+        db.commit()
+    finally:
+        # Moved into storage on success; don't leave it behind on failure
+        if os.path.exists(staged):
+            os.unlink(staged)
+    db.refresh(submission)
+    enqueue(index_archive, stored.sha256)
+    
+    return {
+        "message": "Task submitted successfully",
+        "submission_id": submission.id,
+        "file_name": submission.file_name
+    }
+
+
+def _get_upload_session(db: Session, upload_id: str, solver_id: int, lock: bool = False) -> UploadSession:
+    query = db.query(UploadSession).filter(
+        and_(UploadSession.id == upload_id, UploadSession.problem_solver_id == solver_id)
+    )
+    if lock:
+        query = query.with_for_update()
+    session = query.first()
+    
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Upload session not found"
+        )
+    
+    return session
+
+def _upload_session_response(session: UploadSession) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        id=session.id,
+        task_id=session.task_id,
+        file_name=session.file_name,
+        total_size=session.total_size,
+        offset=session.received_bytes,
+        status=session.status,
+        chunk_size=settings.upload_chunk_bytes,
+        expires_at=session_expires_at(session),
+        submission_id=session.submission_id
+    )
+
+@router.post("/tasks/{task_id}/uploads", response_model=UploadSessionResponse)
+def create_upload(
+    task_id: int,
+    data: UploadSessionCreate,
+    current_user: User = Depends(get_current_problem_solver),
+    db: Session = Depends(get_db)
+):
+    """Start a resumable ZIP upload for a task."""
+    task = db.query(Task).filter(
+        and_(Task.id == task_id, Task.problem_solver_id == current_user.id)
+    ).first()
+    
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
+    
+    file_name = os.path.basename(data.file_name)
+    if not file_name.endswith('.zip'):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="File must be a ZIP archive"
         )
     
-    # Create uploads directory
-    upload_dir = "uploads"
-    os.makedirs(upload_dir, exist_ok=True)
+    if data.total_size <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="total_size must be positive"
+        )
     
-    # Create unique file path
-    file_path = os.path.join(upload_dir, f"task_{task_id}_{file.filename}")
+    try:
+        session = create_upload_session(db, task, current_user.id, file_name, data.total_size)
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    
+    db.commit()
+    db.refresh(session)
+    
+    return _upload_session_response(session)
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+def get_upload(
+    upload_id: str,
+    response: Response,
+    current_user: User = Depends(get_current_problem_solver),
+    db: Session = Depends(get_db)
+):
+    """Query the current offset of a resumable upload."""
+    session = _get_upload_session(db, upload_id, current_user.id)
+    response.headers["Upload-Offset"] = str(session.received_bytes)
+    return _upload_session_response(session)
+
+@router.patch("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    current_user: User = Depends(get_current_problem_solver),
+    db: Session = Depends(get_db)
+):
+    """Append a chunk (raw request body) at the given offset.
+
+    No database connection is held while the chunk arrives; the offset is
+    advanced with a compare-and-set once it has been written.
+    """
+    session = _get_upload_session(db, upload_id, current_user.id)
+    
+    if session.status != "active":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload is already completed"
+        )
     
     try:
-        with open(file_path, "wb") as buffer:
-            contents = await file.read()
-            buffer.write(contents)
-    except Exception as e:
+        await append_chunk(db, session, upload_offset, request.stream())
+    except UploadOffsetMismatch as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to save file: {str(e)}"
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+            headers={"Upload-Offset": str(e.expected)}
+        )
+    except (UploadBusy, UploadClosed) as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except UploadExpired as e:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=str(e)
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
         )
     
-    # Create submission
-    submission = Submission(
-        task_id=task_id,
-        problem_solver_id=current_user.id,
-        file_path=file_path,
-        file_name=file.filename,
-        status=SubmissionStatus.PENDING
-    )
+    db.refresh(session)
+    
+    response.headers["Upload-Offset"] = str(session.received_bytes)
+    return _upload_session_response(session)
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_problem_solver),
+    db: Session = Depends(get_db)
+):
+    """Finalize a fully received upload into a submission."""
+    session = _get_upload_session(db, upload_id, current_user.id, lock=True)
+    
+    if session.status == "completed":
+        # Retried finalize: hand back the submission created the first time
+        db.rollback()
+        return {
+            "message": "Task submitted successfully",
+            "submission_id": session.submission_id,
+            "file_name": session.file_name
+        }
+    
+    if session.status == "completing":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Upload is already being finalized"
+        )
     
-    # Update task status
-    task.status = TaskStatus.SUBMITTED
+    if session.received_bytes != session.total_size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Upload incomplete: {session.received_bytes} of {session.total_size} bytes received"
+        )
+    
+    task = db.query(Task).filter(Task.id == session.task_id).first()
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Task not found"
+        )
     
-    db.add(submission)
+    # Claim the session, then hash and upload with no row lock or connection held
+    session.status = "completing"
+    release_connection(db)
+    try:
+        stored = await finalize_upload(session)
+        await run_in_threadpool(store_blob_content, stored)
+        stored = ingest_stored_blob(db, stored)
+    except (UploadExpired, BlobContentMissing) as e:
+        reopen_upload(db, upload_id)
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=str(e)
+        )
+    except Exception:
+        reopen_upload(db, upload_id)
+        raise
+    
+    session = _get_upload_session(db, upload_id, current_user.id, lock=True)
+    submission = record_submission(db, task, current_user.id, session.file_name, stored)
+    db.flush()
+    session.status = "completed"
+    session.submission_id = submission.id
     db.commit()
-    db.refresh(submission)
+    enqueue(index_archive, stored.sha256)
     
     return {
         "message": "Task submitted successfully",
@@ -322,6 +543,29 @@ async def submit_task(
         "file_name": submission.file_name
     }
 
+@router.delete("/uploads/{upload_id}", response_model=dict)
+def abort_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_problem_solver),
+    db: Session = Depends(get_db)
+):
+    """Abort a resumable upload and discard received bytes."""
+    session = _get_upload_session(db, upload_id, current_user.id, lock=True)
+    
+    if session.status != "active":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Upload is {session.status} and can no longer be aborted"
+        )
+    
+    if os.path.exists(session.temp_path):
+        os.unlink(session.temp_path)
+    
+    db.delete(session)
+    db.commit()
+    
+    return {"message": "Upload aborted"}
+
 
 @router.post("/projects/{project_id}/request-completion")
 def request_project_completion(
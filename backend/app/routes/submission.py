@@ -1,16 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import and_
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
+from urllib.parse import quote
+import mimetypes
+import os
 
-from ..core.database import get_db
+from ..core.database import get_db, release_connection
 from ..core.dependencies import get_current_buyer
+from ..core.security import sign_download
 from ..models.user import User
 from ..models.project import Project
+from ..models.storage import ArchiveEntry, Blob
 from ..models.task import Task, Submission, SubmissionStatus
-from ..schemas.task import SubmissionResponse, SubmissionReviewRequest, SubmissionActionResponse
+from ..schemas.task import (
+    SubmissionResponse, SubmissionReviewRequest, SubmissionActionResponse, SubmissionManifestResponse,
+    SubmissionDiffResponse
+)
+from ..services.archives import diff_manifests, iter_member, request_index
+from ..services.blobs import ensure_hot
+from ..services.downloads import stored_file_response
 
 router = APIRouter(prefix="/submissions", tags=["submissions"], dependencies=[Depends(get_current_buyer)])
 
@@ -102,11 +113,16 @@ def review_submission(
 @router.get("/{submission_id}/download")
 def download_submission(
     submission_id: int,
+    request: Request,
     current_user: User = Depends(get_current_buyer),
     db: Session = Depends(get_db)
 ):
-    """Download submission file."""
-    submission = db.query(Submission).join(Task).join(Project).filter(
+    """Download submission file (supports Range / If-Range for resuming)."""
+    submission = db.query(
+        Submission.file_path, Submission.file_name, Submission.file_sha256, Blob.tier
+    ).join(Task).join(Project).outerjoin(
+        Blob, Blob.sha256 == Submission.file_sha256
+    ).filter(
         and_(Submission.id == submission_id, Project.buyer_id == current_user.id)
     ).first()
     
@@ -116,8 +132,210 @@ def download_submission(
             detail="Submission not found"
         )
     
-    return FileResponse(
-        path=submission.file_path,
+    if submission.tier == "cold":
+        ensure_hot(db, submission.file_sha256)
+    
+    # The file is streamed after the handler returns; don't pin a connection to it
+    release_connection(db)
+    
+    return stored_file_response(
+        request,
+        key=submission.file_path,
         filename=submission.file_name,
-        media_type="application/zip"
+        media_type="application/zip",
+        etag=submission.file_sha256
+    )
+
+@router.post("/{submission_id}/download-url")
+def create_download_url(
+    submission_id: int,
+    request: Request,
+    current_user: User = Depends(get_current_buyer),
+    db: Session = Depends(get_db)
+):
+    """Issue a signed, short-lived URL that downloads the submission without auth or DB checks."""
+    submission = db.query(
+        Submission.file_path, Submission.file_name, Submission.file_sha256, Blob.tier
+    ).join(Task).join(Project).outerjoin(
+        Blob, Blob.sha256 == Submission.file_sha256
+    ).filter(
+        and_(Submission.id == submission_id, Project.buyer_id == current_user.id)
+    ).first()
+    
+    if not submission:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Submission not found"
+        )
+    
+    # The signed URL is served without DB access, so restore cold files now
+    if submission.tier == "cold":
+        ensure_hot(db, submission.file_sha256)
+    
+    expires, signature = sign_download(submission.file_path, submission.file_name)
+    
+    url = request.url_for("download_signed_file", path=submission.file_path).include_query_params(
+        name=submission.file_name, expires=expires, signature=signature
+    )
+    
+    return {
+        "url": str(url),
+        "expires_at": datetime.utcfromtimestamp(expires)
+    }
+
+def _get_owned_submission_file(db: Session, submission_id: int, buyer_id: int):
+    submission = db.query(
+        Submission.file_path, Submission.file_sha256, Blob.tier
+    ).join(Task).join(Project).outerjoin(
+        Blob, Blob.sha256 == Submission.file_sha256
+    ).filter(
+        and_(Submission.id == submission_id, Project.buyer_id == buyer_id)
+    ).first()
+    
+    if not submission:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Submission not found"
+        )
+    
+    return submission
+
+@router.get("/{submission_id}/manifest", response_model=SubmissionManifestResponse)
+def get_submission_manifest(
+    submission_id: int,
+    current_user: User = Depends(get_current_buyer),
+    db: Session = Depends(get_db)
+):
+    """List the files inside a submitted ZIP without downloading it."""
+    submission = _get_owned_submission_file(db, submission_id, current_user.id)
+    
+    if not submission.file_sha256:
+        return {"submission_id": submission_id, "status": "pending"}
+    
+    # Queues indexing only if it was never queued or its job was lost
+    index = request_index(db, submission.file_sha256)
+    if index.status == "pending":
+        return {"submission_id": submission_id, "status": "pending"}
+    
+    entries = []
+    if index.status == "ready":
+        entries = db.query(ArchiveEntry).filter(
+            ArchiveEntry.archive_sha256 == index.sha256
+        ).order_by(ArchiveEntry.path).all()
+    
+    return {
+        "submission_id": submission_id,
+        "status": index.status,
+        "error": index.error,
+        "entry_count": index.entry_count,
+        "total_uncompressed": index.total_uncompressed,
+        "entries": entries
+    }
+
+@router.get("/{submission_id}/files/{member_path:path}")
+def download_submission_member(
+    submission_id: int,
+    member_path: str,
+    current_user: User = Depends(get_current_buyer),
+    db: Session = Depends(get_db)
+):
+    """Stream a single file from inside a submitted ZIP (requires an indexed manifest)."""
+    submission = _get_owned_submission_file(db, submission_id, current_user.id)
+    
+    entry = None
+    if submission.file_sha256:
+        entry = db.query(ArchiveEntry).filter(
+            and_(
+                ArchiveEntry.archive_sha256 == submission.file_sha256,
+                ArchiveEntry.path == member_path
+            )
+        ).first()
+    
+    if not entry or entry.is_dir:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found in submission"
+        )
+    
+    if submission.tier == "cold":
+        ensure_hot(db, submission.file_sha256)
+    
+    media_type = mimetypes.guess_type(entry.path)[0] or "application/octet-stream"
+    release_connection(db)
+    return StreamingResponse(
+        iter_member(submission.file_path, entry),
+        media_type=media_type,
+        headers={
+            "Content-Length": str(entry.size),
+            "Content-Disposition": f"attachment; filename*=utf-8''{quote(os.path.basename(entry.path))}",
+            "X-Content-Type-Options": "nosniff"
+        }
     )
+
+@router.get("/{submission_id}/diff", response_model=SubmissionDiffResponse)
+def diff_submission(
+    submission_id: int,
+    base_submission_id: Optional[int] = None,
+    current_user: User = Depends(get_current_buyer),
+    db: Session = Depends(get_db)
+):
+    """List files added, removed and changed since another version of the same task.
+
+    Defaults to the previous version. Computed from the archive manifests only.
+    """
+    submission = db.query(Submission).join(Task).join(Project).filter(
+        and_(Submission.id == submission_id, Project.buyer_id == current_user.id)
+    ).first()
+    
+    if not submission:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Submission not found"
+        )
+    
+    base_query = db.query(Submission).filter(Submission.task_id == submission.task_id)
+    if base_submission_id is not None:
+        base = base_query.filter(Submission.id == base_submission_id).first()
+    else:
+        base = base_query.filter(
+            Submission.version < submission.version
+        ).order_by(Submission.version.desc()).first() if submission.version else None
+    
+    if not base:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No other version of this task to compare with"
+        )
+    
+    if not base.file_sha256 or not submission.file_sha256:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Submission has not been hashed yet; run the blob migration"
+        )
+    
+    indexes = {
+        sha256: request_index(db, sha256)
+        for sha256 in sorted({base.file_sha256, submission.file_sha256})
+    }
+    failed = [index for index in indexes.values() if index.status == "failed"]
+    if failed:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Submission archive could not be read, so it cannot be diffed: {failed[0].error}"
+        )
+    if any(index.status != "ready" for index in indexes.values()):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Manifests are still being indexed; retry shortly"
+        )
+    
+    diff = diff_manifests(db, base.file_sha256, submission.file_sha256)
+    
+    return {
+        "task_id": submission.task_id,
+        "base_submission_id": base.id,
+        "submission_id": submission.id,
+        "base_version": base.version,
+        "version": submission.version,
+        **diff
+    }
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from decimal import Decimal
 
 class ProjectPaymentBase(BaseModel):
@@ -36,8 +36,12 @@ class ProjectPaymentResponse(ProjectPaymentBase):
         from_attributes = True
 
 class PayoutRequest(BaseModel):
-    """Request to create a payout."""
+    """Request to create a payout; defaults to the solver's payout account."""
     payment_id: int
+    stripe_account_id: Optional[str] = None
+
+class PayoutAccountUpdate(BaseModel):
+    """Stripe connected account that payout runs pay into."""
     stripe_account_id: str
 
 class PayoutResponse(BaseModel):
@@ -49,3 +53,58 @@ class PayoutResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class PaymentOperationResponse(BaseModel):
+    """Status of a queued payment operation; poll until succeeded or failed."""
+    id: str
+    kind: str
+    status: str
+    project_id: Optional[int] = None
+    payment_id: Optional[int] = None
+    attempts: int
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    next_attempt_at: Optional[datetime] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class PayoutRunItemResponse(BaseModel):
+    """One provider payout covering a solver's released payments."""
+    id: int
+    run_id: Optional[int] = None
+    solver_id: int
+    destination: str
+    amount: Decimal
+    payment_count: int
+    status: str
+    stripe_payout_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class PayoutRunResponse(BaseModel):
+    """Summary of a batched payout run."""
+    id: int
+    status: str
+    payout_count: int
+    payment_count: int
+    total_amount: Decimal
+    failed_count: int
+    error: Optional[str] = None
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class PayoutRunDetailResponse(PayoutRunResponse):
+    items: List[PayoutRunItemResponse] = []
+    
+    class Config:
+        from_attributes = True
@@ -3,6 +3,8 @@ from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
 from ..models.project import ProjectStatus, ProjectCategory
+from .sprint import FeatureResponse, SprintResponse
+from .task import TaskResponse
 
 class ProjectBase(BaseModel):
     title: str
@@ -28,15 +30,7 @@ class ProjectResponse(ProjectBase):
     created_at: datetime
     updated_at: datetime
     pending_applications: Optional[int] = 0
-    
-    class Config:
-        from_attributes = True
-
-class ProjectDetailResponse(ProjectResponse):
-    requests: List = []
-    tasks: List = []
-    sprints: List = []
-    features: List = []
+    description_snippet: Optional[str] = None  # start of the description, cut in SQL
     
     class Config:
         from_attributes = True
@@ -65,6 +59,17 @@ class ProjectRequestResponse(BaseModel):
     status: str
     requested_at: datetime
     responded_at: Optional[datetime] = None
+    queue_position: Optional[int] = None
+    
+    class Config:
+        from_attributes = True
+
+class ProjectDetailResponse(ProjectResponse):
+    """Project with the relations asked for in ``include``; the others are null."""
+    requests: Optional[List[ProjectRequestResponse]] = None
+    tasks: Optional[List[TaskResponse]] = None
+    sprints: Optional[List[SprintResponse]] = None
+    features: Optional[List[FeatureResponse]] = None
     
     class Config:
         from_attributes = True
@@ -75,6 +80,7 @@ class AssignSolverRequest(BaseModel):
 class ProjectActionResponse(BaseModel):
     message: str
     project: Optional[ProjectResponse] = None
+    queue_position: Optional[int] = None
     
     class Config:
         from_attributes = True
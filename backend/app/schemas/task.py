@@ -40,9 +40,12 @@ class SubmissionBase(BaseModel):
 class SubmissionResponse(BaseModel):
     id: int
     task_id: int
+    version: Optional[int] = None
     problem_solver_id: int
     file_name: str
     file_path: str
+    file_size: Optional[int] = None
+    file_sha256: Optional[str] = None
     status: SubmissionStatus
     rejection_reason: Optional[str] = None
     submitted_at: datetime
@@ -62,3 +65,56 @@ class SubmissionActionResponse(BaseModel):
     
     class Config:
         from_attributes = True
+
+class UploadSessionCreate(BaseModel):
+    """Start a resumable upload."""
+    file_name: str
+    total_size: int
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    task_id: int
+    file_name: str
+    total_size: int
+    offset: int
+    status: str
+    chunk_size: int
+    expires_at: datetime
+    submission_id: Optional[int] = None
+
+class ArchiveEntryResponse(BaseModel):
+    path: str
+    is_dir: bool
+    size: int
+    compressed_size: int
+    crc32: int
+    sha256: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+class SubmissionManifestResponse(BaseModel):
+    submission_id: int
+    status: str  # pending, ready, failed
+    error: Optional[str] = None  # why indexing failed
+    entry_count: int = 0
+    total_uncompressed: int = 0
+    entries: List[ArchiveEntryResponse] = []
+
+class ArchiveEntryChange(BaseModel):
+    path: str
+    old_size: Optional[int] = None
+    new_size: Optional[int] = None
+    old_sha256: Optional[str] = None
+    new_sha256: Optional[str] = None
+
+class SubmissionDiffResponse(BaseModel):
+    task_id: int
+    base_submission_id: int
+    submission_id: int
+    base_version: Optional[int] = None
+    version: Optional[int] = None
+    added: List[ArchiveEntryChange] = []
+    removed: List[ArchiveEntryChange] = []
+    changed: List[ArchiveEntryChange] = []
+    unchanged_count: int = 0
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from ..models.user import UserRole
 
@@ -46,3 +46,27 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     user_id: int
     email: str
+
+class UserFilter(BaseModel):
+    """Selects users the same way as the admin user directory."""
+    role: Optional[UserRole] = None
+    is_active: Optional[bool] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    search: Optional[str] = None
+
+class UserBulkUpdate(BaseModel):
+    """Role and/or activation change for a list of users or every user matching a filter."""
+    user_ids: Optional[List[int]] = None
+    filter: Optional[UserFilter] = None
+    role: Optional[UserRole] = None
+    is_active: Optional[bool] = None
+
+class UserBulkResult(BaseModel):
+    id: int
+    status: str  # updated, unchanged, skipped, not_found
+    detail: Optional[str] = None
+
+class UserBulkResponse(BaseModel):
+    updated: int
+    results: List[UserBulkResult]
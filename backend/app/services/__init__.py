@@ -0,0 +1,3 @@
+"""
+Domain services shared by several routers
+"""
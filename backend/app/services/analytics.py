@@ -0,0 +1,188 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, insert, literal, select
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.jobs import enqueue, job
+from ..models.project import Project, ProjectCategory, ProjectPayment, ProjectRequest, ProjectStatus
+from ..models.stats import AnalyticsRollup, StatsSnapshot
+from .stats import request_refresh, store_snapshot
+
+GRANULARITIES = ("hour", "day")
+METRICS = (
+    "projects_posted",
+    "applications",
+    "applications_accepted",
+    "projects_completed",
+    "payments_released",
+    "payments_paid",
+)
+# Snapshot row recording how far the rollups have been brought up to date
+ROLLUP_STATE = "analytics_rollups"
+# Arbitrary constant identifying the rollup advisory lock
+ROLLUP_LOCK_KEY = 7_043_001
+
+_COLUMNS = ["granularity", "metric", "bucket", "category", "count", "amount"]
+
+_first_run_lock = threading.Lock()
+_first_run_scheduled = None
+
+
+def _hourly(metric: str, entity, timestamp, amount=None, *conditions):
+    """``INSERT ... SELECT`` of one metric's hourly buckets per project category."""
+    bucket = func.date_trunc("hour", timestamp)
+    query = select(
+        literal("hour"), literal(metric), bucket, Project.category, func.count(),
+        func.coalesce(func.sum(amount), 0) if amount is not None else literal(0)
+    )
+    if entity is not Project:
+        query = query.select_from(entity).join(Project, Project.id == entity.project_id)
+    query = query.where(timestamp.isnot(None), *conditions).group_by(bucket, Project.category)
+    return insert(AnalyticsRollup).from_select(_COLUMNS, query)
+
+
+def _sources(since: Optional[datetime]) -> list:
+    """Hourly inserts for every metric, limited to events at or after ``since``."""
+    def window(timestamp):
+        return (timestamp >= since,) if since is not None else ()
+
+    completed_at = func.coalesce(Project.completed_at, Project.updated_at)  # older rows lack completed_at
+    return [
+        _hourly("projects_posted", Project, Project.created_at, None, *window(Project.created_at)),
+        _hourly("applications", ProjectRequest, ProjectRequest.requested_at, None, *window(ProjectRequest.requested_at)),
+        _hourly(
+            "applications_accepted", ProjectRequest, ProjectRequest.responded_at, None,
+            ProjectRequest.status == "accepted", *window(ProjectRequest.responded_at)
+        ),
+        _hourly(
+            "projects_completed", Project, completed_at, None,
+            Project.status == ProjectStatus.COMPLETED, *window(completed_at)
+        ),
+        _hourly(
+            "payments_released", ProjectPayment, ProjectPayment.released_at, ProjectPayment.amount,
+            *window(ProjectPayment.released_at)
+        ),
+        _hourly(
+            "payments_paid", ProjectPayment, ProjectPayment.paid_at, ProjectPayment.amount,
+            *window(ProjectPayment.paid_at)
+        ),
+    ]
+
+
+@job
+def rollup_analytics(rebuild: bool = False) -> Optional[dict]:
+    """Bring the hourly and daily rollups up to date from the source tables.
+
+    Recomputes every bucket from midnight ``ANALYTICS_LOOKBACK_HOURS`` before
+    the previous run onwards, so rows that changed since (late responses,
+    payouts) are counted in the right bucket; ``rebuild`` recomputes all of
+    them. Each metric is one grouped ``INSERT ... SELECT``, and the daily
+    rows are summed from the hourly ones, all in one transaction. Returns
+    ``None`` when another run holds the lock.
+    """
+    db = SessionLocal()
+    try:
+        if not db.execute(select(func.pg_try_advisory_xact_lock(ROLLUP_LOCK_KEY))).scalar():
+            db.rollback()
+            return None
+
+        started = datetime.utcnow()
+        state = db.query(StatsSnapshot.payload).filter(StatsSnapshot.name == ROLLUP_STATE).scalar()
+        since = None
+        if state and not rebuild:
+            previous = datetime.fromisoformat(state["last_run_started"])
+            since = (previous - timedelta(hours=settings.analytics_lookback_hours)).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+
+        stale = delete(AnalyticsRollup)
+        if since is not None:
+            stale = stale.where(AnalyticsRollup.bucket >= since)
+        db.execute(stale)
+
+        for statement in _sources(since):
+            db.execute(statement)
+
+        day = func.date_trunc("day", AnalyticsRollup.bucket)
+        daily = select(
+            literal("day"), AnalyticsRollup.metric, day, AnalyticsRollup.category,
+            func.sum(AnalyticsRollup.count), func.sum(AnalyticsRollup.amount)
+        ).where(AnalyticsRollup.granularity == "hour")
+        if since is not None:
+            daily = daily.where(AnalyticsRollup.bucket >= since)
+        db.execute(insert(AnalyticsRollup).from_select(
+            _COLUMNS, daily.group_by(AnalyticsRollup.metric, day, AnalyticsRollup.category)
+        ))
+
+        store_snapshot(db, ROLLUP_STATE, {
+            "last_run_started": started.isoformat(),
+            "window_start": since.isoformat() if since else None,
+        }, started)
+        db.commit()
+        return {"window_start": since, "rolled_up_to": started}
+    finally:
+        db.close()
+
+
+def _schedule_first_rollup() -> None:
+    """Queue the initial rollup at most once per refresh window per process.
+
+    There is no state row to mark the run as requested until it finishes.
+    """
+    global _first_run_scheduled
+    with _first_run_lock:
+        if (_first_run_scheduled is not None
+                and time.monotonic() - _first_run_scheduled < settings.analytics_refresh_seconds):
+            return
+        _first_run_scheduled = time.monotonic()
+    enqueue(rollup_analytics)
+
+
+def get_series(db, metrics: Iterable[str], granularity: str, start: datetime, end: datetime,
+               category: Optional[ProjectCategory] = None) -> dict:
+    """Time series per metric and category over ``[start, end)``, read from the rollups.
+
+    Buckets without activity are omitted. Queues a catch-up run when the
+    rollups are older than ``ANALYTICS_REFRESH_SECONDS``.
+    """
+    metrics = list(metrics)
+    query = db.query(
+        AnalyticsRollup.metric, AnalyticsRollup.category, AnalyticsRollup.bucket,
+        AnalyticsRollup.count, AnalyticsRollup.amount
+    ).filter(
+        AnalyticsRollup.granularity == granularity,
+        AnalyticsRollup.metric.in_(metrics),
+        AnalyticsRollup.bucket >= start,
+        AnalyticsRollup.bucket < end
+    )
+    if category is not None:
+        query = query.filter(AnalyticsRollup.category == category)
+
+    series = {metric: {} for metric in metrics}
+    for row in query.order_by(AnalyticsRollup.metric, AnalyticsRollup.category, AnalyticsRollup.bucket):
+        series[row.metric].setdefault(row.category.value, []).append({
+            "bucket": row.bucket,
+            "count": row.count,
+            "amount": float(row.amount)
+        })
+
+    now = datetime.utcnow()
+    ttl = timedelta(seconds=settings.analytics_refresh_seconds)
+    rolled_up_to = db.query(StatsSnapshot.computed_at).filter(StatsSnapshot.name == ROLLUP_STATE).scalar()
+    if rolled_up_to is None:
+        db.rollback()
+        _schedule_first_rollup()
+    elif rolled_up_to + ttl <= now:
+        request_refresh(db, ROLLUP_STATE, now, ttl, rollup_analytics)
+
+    return {
+        "granularity": granularity,
+        "start": start,
+        "end": end,
+        "rolled_up_to": rolled_up_to,
+        "series": series
+    }
@@ -0,0 +1,66 @@
+from sqlalchemy import Integer, String, func, literal, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, aliased
+
+from ..models.project import Project, ProjectStatus, ProjectRequest
+from .solver_stats import record_deltas
+
+
+def apply_to_project(db: Session, project_id: int, solver_id: int):
+    """Create a pending application and return its queue position.
+
+    One statement does the work. The INSERT only selects the project while it
+    is OPEN, and the unique (project_id, problem_solver_id) constraint turns
+    concurrent double-clicks into a no-op instead of a duplicate row. Only an
+    inserted row bumps the project's ``applications_received`` counter, whose
+    new value is the position: concurrent applicants queue on the project row
+    inside the UPDATE, so positions are unique and have no gaps. Positions
+    follow arrival order; they do not shift when earlier applications are
+    answered.
+
+    Returns ``(request, project, queue_position)`` or ``None`` when nothing was
+    inserted (project missing, not open, or already applied). The caller
+    commits once the response is built, so nothing is reloaded after commit.
+    """
+    candidate = select(
+        Project.id,
+        literal(solver_id, Integer),
+        literal("pending", String),
+        func.timezone("UTC", func.clock_timestamp()),
+    ).where(
+        Project.id == project_id,
+        Project.status == ProjectStatus.OPEN,
+    )
+
+    inserted = (
+        pg_insert(ProjectRequest)
+        .from_select(["project_id", "problem_solver_id", "status", "requested_at"], candidate)
+        .on_conflict_do_nothing(index_elements=["project_id", "problem_solver_id"])
+        .returning(*ProjectRequest.__table__.c)
+        .cte("inserted")
+    )
+    request = aliased(ProjectRequest, inserted, name="request")
+
+    counted = (
+        update(Project)
+        .where(Project.id.in_(select(inserted.c.project_id)))
+        # An application is not an edit of the project
+        .values(
+            applications_received=Project.applications_received + 1,
+            updated_at=Project.updated_at
+        )
+        .returning(*Project.__table__.c)
+        .cte("counted")
+    )
+    project = aliased(Project, counted, name="project")
+
+    row = db.execute(
+        select(request, project, project.applications_received.label("queue_position"))
+        .join(project, project.id == request.project_id)
+    ).first()
+
+    if row is None:
+        return None
+    # The INSERT bypasses the ORM, so the stats listener does not see it
+    record_deltas(db, [(solver_id, row[1].category, {"applications": 1})])
+    return row[0], row[1], row[2]
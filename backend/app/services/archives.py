@@ -0,0 +1,224 @@
+import hashlib
+import struct
+import zipfile
+import zlib
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from sqlalchemy import exists, func, insert, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..core.database import SessionLocal
+from ..core.jobs import enqueue, job
+from ..core.storage import get_storage
+from ..models.storage import ArchiveIndex, ArchiveEntry
+from ..models.task import Submission
+from .blobs import ensure_hot
+
+READ_CHUNK = 256 * 1024
+_LOCAL_HEADER = struct.Struct("<4s22xHH")
+# A pending index not finished this long after queueing lost its job
+INDEX_REQUEUE_AFTER = timedelta(minutes=10)
+
+
+def request_index(db, sha256: str) -> ArchiveIndex:
+    """Return an archive's index state, queueing indexing only when needed.
+
+    The first caller records a pending index and enqueues the job; later
+    callers just read the state. A pending index whose job was lost is
+    re-queued by at most one caller per ``INDEX_REQUEUE_AFTER``. Failed
+    indexes are returned as they are, with the error, and never re-queued.
+    Commits.
+    """
+    index = db.query(ArchiveIndex).filter(ArchiveIndex.sha256 == sha256).first()
+    if index is not None and index.status != "pending":
+        return index
+
+    now = datetime.utcnow()
+    queued = db.execute(
+        pg_insert(ArchiveIndex)
+        .values(sha256=sha256, status="pending", created_at=now, queued_at=now)
+        .on_conflict_do_nothing(index_elements=[ArchiveIndex.sha256])
+        .returning(ArchiveIndex.sha256)
+    ).scalar()
+    if queued is None:
+        queued = db.execute(
+            update(ArchiveIndex)
+            .where(
+                ArchiveIndex.sha256 == sha256,
+                ArchiveIndex.status == "pending",
+                or_(ArchiveIndex.queued_at.is_(None), ArchiveIndex.queued_at < now - INDEX_REQUEUE_AFTER)
+            )
+            .values(queued_at=now)
+            .returning(ArchiveIndex.sha256)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+    db.commit()
+    if queued is not None:
+        enqueue(index_archive, sha256)
+    return db.query(ArchiveIndex).filter(ArchiveIndex.sha256 == sha256).one()
+
+
+@job
+def index_archive(sha256: str) -> None:
+    """Copy a submitted ZIP's central directory into ``archive_entries``.
+
+    Archives are indexed once per content hash, so resubmitting identical
+    bytes costs nothing. Each member is also hashed (one sequential pass, off
+    the request path) so versions can be diffed from manifests alone.
+    """
+    db = SessionLocal()
+    try:
+        ensure_hot(db, sha256)
+        db.execute(
+            pg_insert(ArchiveIndex)
+            .values(sha256=sha256, status="pending", created_at=datetime.utcnow(), queued_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=[ArchiveIndex.sha256])
+        )
+        index = db.query(ArchiveIndex).filter(ArchiveIndex.sha256 == sha256).with_for_update().one()
+        if index.status == "ready" and not _needs_member_hashes(db, sha256):
+            db.commit()
+            return
+
+        path = db.query(Submission.file_path).filter(
+            Submission.file_sha256 == sha256
+        ).limit(1).scalar()
+
+        try:
+            if path is None:
+                raise FileNotFoundError("No submission references this archive")
+            with get_storage().open(path) as source, zipfile.ZipFile(source) as archive:
+                infos = archive.infolist()
+                member_hashes = {
+                    info.filename: _hash_member(archive, info)
+                    for info in infos if not info.is_dir()
+                }
+        except (OSError, zipfile.BadZipFile, RuntimeError, zlib.error) as e:
+            index.status = "failed"
+            index.error = str(e)
+            db.commit()
+            return
+
+        db.query(ArchiveEntry).filter(ArchiveEntry.archive_sha256 == sha256).delete()
+        if infos:
+            db.execute(insert(ArchiveEntry), [
+                {
+                    "archive_sha256": sha256,
+                    "path": info.filename,
+                    "is_dir": info.is_dir(),
+                    "size": info.file_size,
+                    "compressed_size": info.compress_size,
+                    "crc32": info.CRC,
+                    "sha256": member_hashes.get(info.filename),
+                    "compress_type": info.compress_type,
+                    "header_offset": info.header_offset,
+                }
+                for info in infos
+            ])
+
+        index.status = "ready"
+        index.error = None
+        index.entry_count = len(infos)
+        index.total_uncompressed = sum(info.file_size for info in infos)
+        index.indexed_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+
+def _hash_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> str:
+    digest = hashlib.sha256()
+    with archive.open(info) as member:
+        for chunk in iter(lambda: member.read(READ_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _needs_member_hashes(db, sha256: str) -> bool:
+    """True for manifests indexed before member hashes were recorded."""
+    return db.query(
+        exists().where(
+            ArchiveEntry.archive_sha256 == sha256,
+            ArchiveEntry.is_dir.is_(False),
+            ArchiveEntry.sha256.is_(None)
+        )
+    ).scalar()
+
+
+def diff_manifests(db, base_sha256: str, sha256: str) -> dict:
+    """Compare two indexed archives by member path and content hash.
+
+    Works purely on ``archive_entries``; neither archive is opened. Only the
+    differing paths are returned from the database.
+    """
+    def files(archive_sha256):
+        return select(ArchiveEntry.path, ArchiveEntry.size, ArchiveEntry.sha256).where(
+            ArchiveEntry.archive_sha256 == archive_sha256,
+            ArchiveEntry.is_dir.is_(False)
+        ).subquery()
+
+    base, new = files(base_sha256), files(sha256)
+    joined = base.join(new, base.c.path == new.c.path, full=True)
+
+    rows = db.execute(
+        select(
+            func.coalesce(new.c.path, base.c.path).label("path"),
+            base.c.size, base.c.sha256, new.c.size, new.c.sha256
+        ).select_from(joined).where(
+            base.c.sha256.is_distinct_from(new.c.sha256)
+        ).order_by("path")
+    ).all()
+    unchanged = db.execute(
+        select(func.count()).select_from(base.join(new, base.c.path == new.c.path)).where(
+            base.c.sha256 == new.c.sha256
+        )
+    ).scalar()
+
+    result = {"added": [], "removed": [], "changed": [], "unchanged_count": unchanged}
+    for path, old_size, old_sha256, new_size, new_sha256 in rows:
+        change = {
+            "path": path,
+            "old_size": old_size,
+            "new_size": new_size,
+            "old_sha256": old_sha256,
+            "new_sha256": new_sha256,
+        }
+        if old_sha256 is None and old_size is None:
+            result["added"].append(change)
+        elif new_sha256 is None and new_size is None:
+            result["removed"].append(change)
+        else:
+            result["changed"].append(change)
+    return result
+
+
+def iter_member(key: str, entry: ArchiveEntry) -> Iterator[bytes]:
+    """Yield one member's uncompressed bytes by seeking straight to it.
+
+    Uses the offset recorded in the manifest, so only that member's local
+    header and data are read (ranged GETs on object storage). Compression
+    methods other than stored/deflate fall back to ``zipfile``.
+    """
+    with get_storage().open(key) as f:
+        if entry.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+            with zipfile.ZipFile(f) as archive, archive.open(entry.path) as member:
+                for chunk in iter(lambda: member.read(READ_CHUNK), b""):
+                    yield chunk
+            return
+
+        f.seek(entry.header_offset)
+        signature, name_length, extra_length = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+        if signature != b"PK\x03\x04":
+            raise zipfile.BadZipFile(f"Bad local header for {entry.path}")
+        f.seek(name_length + extra_length, 1)
+
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS) if entry.compress_type == zipfile.ZIP_DEFLATED else None
+        remaining = entry.compressed_size
+        while remaining > 0:
+            chunk = f.read(min(READ_CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield decompressor.decompress(chunk) if decompressor else chunk
+        if decompressor:
+            yield decompressor.flush()
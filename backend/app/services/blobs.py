@@ -0,0 +1,258 @@
+import logging
+import lzma
+import os
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, event, exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, object_session
+
+from ..core.config import settings
+from ..core.database import engine
+from ..core.storage import get_cold_storage, get_storage
+from ..models.storage import Blob, ArchiveIndex
+from ..models.task import Submission
+from .uploads import StoredUpload
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = "blobs/"
+# Advisory lock namespace serialising writers of the same blob content
+BLOB_LOCK_NAMESPACE = 7_029_001
+
+
+def blob_key(sha256: str) -> str:
+    """Storage key of a blob, fanned out so no directory gets huge."""
+    return f"{BLOB_PREFIX}{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def lock_blob(db, sha256: str) -> None:
+    """Take the transaction-level lock for one blob's content.
+
+    Held by ingesters and by deferred object deletion, so an object is never
+    deleted after a new reference to the same content has been committed.
+    """
+    db.execute(select(func.pg_advisory_xact_lock(BLOB_LOCK_NAMESPACE, func.hashtext(sha256))))
+
+
+def staging_path(suffix: str = "") -> str:
+    """Fresh node-local path for an upload that has not been hashed yet."""
+    return os.path.join(settings.upload_dir, ".staging", f"{uuid.uuid4().hex}{suffix}")
+
+
+def ingest_blob(db: Session, stored: StoredUpload, refs: int = 1) -> StoredUpload:
+    """Take ``refs`` references on the blob for a staged file.
+
+    New content is moved (or uploaded) into storage; duplicate content is
+    discarded and the existing blob is shared. The upsert keeps the blob row
+    locked until the caller commits, so a concurrent release cannot delete the
+    object under us. The returned path is the blob's storage key.
+    """
+    key, tier, cold_key = _take_refs(db, stored, refs)
+
+    storage = get_storage()
+    if tier == "cold":
+        # We already hold the bytes, so this is cheaper than a restore
+        storage.save_file(stored.path, key)
+        _mark_hot(db, stored.sha256, cold_key)
+    elif storage.exists(key):
+        os.unlink(stored.path)
+    else:
+        storage.save_file(stored.path, key)
+
+    return StoredUpload(path=key, size=stored.size, sha256=stored.sha256)
+
+
+class BlobContentMissing(Exception):
+    """Raised when pre-uploaded content was deleted before its reference was taken."""
+
+    def __init__(self):
+        super().__init__("Stored content was removed before it was recorded; upload it again")
+
+
+def store_blob_content(stored: StoredUpload) -> None:
+    """Move a hashed file to its blob key without touching the database.
+
+    For slow uploads: no transaction or pooled connection is held while the
+    bytes move. Follow with ``ingest_stored_blob``.
+    """
+    storage = get_storage()
+    if storage.exists(blob_key(stored.sha256)):
+        os.unlink(stored.path)
+    else:
+        storage.save_file(stored.path, blob_key(stored.sha256))
+
+
+def ingest_stored_blob(db: Session, stored: StoredUpload, refs: int = 1) -> StoredUpload:
+    """Take ``refs`` references on content already moved by ``store_blob_content``.
+
+    A release of the same content may have deleted the object in between, so
+    its presence is checked under the blob lock; ``BlobContentMissing`` means
+    the bytes are gone and must be uploaded again.
+    """
+    key, tier, cold_key = _take_refs(db, stored, refs)
+    if not get_storage().exists(key):
+        db.rollback()
+        raise BlobContentMissing()
+    if tier == "cold":
+        # The upload above restored the hot copy
+        _mark_hot(db, stored.sha256, cold_key)
+    return StoredUpload(path=key, size=stored.size, sha256=stored.sha256)
+
+
+def _take_refs(db: Session, stored: StoredUpload, refs: int) -> tuple:
+    """Lock the content and upsert its blob row; returns (key, tier, cold_key)."""
+    lock_blob(db, stored.sha256)
+    stmt = pg_insert(Blob).values(
+        sha256=stored.sha256,
+        size=stored.size,
+        storage_path=blob_key(stored.sha256),
+        ref_count=refs,
+        created_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Blob.sha256],
+        set_={"ref_count": Blob.ref_count + refs}
+    ).returning(Blob.storage_path, Blob.tier, Blob.cold_key)
+    return tuple(db.execute(stmt).one())
+
+
+def release_blob(connection, sha256: str, refs: int = 1) -> list:
+    """Drop ``refs`` references and delete the blob row once nothing uses it.
+
+    Storage is not touched: returns ``(sha256, storage_path, size, tier,
+    cold_key)`` for a removed row (an empty list while still referenced),
+    to be passed to ``delete_released`` after the transaction commits.
+    """
+    connection.execute(
+        update(Blob)
+        .where(Blob.sha256 == sha256)
+        .values(ref_count=Blob.ref_count - refs)
+    )
+    removed = connection.execute(
+        delete(Blob)
+        .where(Blob.sha256 == sha256, Blob.ref_count <= 0)
+        .returning(Blob.sha256, Blob.storage_path, Blob.size, Blob.tier, Blob.cold_key)
+    ).all()
+
+    if removed:
+        connection.execute(delete(ArchiveIndex).where(ArchiveIndex.sha256 == sha256))
+
+    return [tuple(row) for row in removed]
+
+
+def delete_released(released: list) -> int:
+    """Delete the stored objects of committed ``release_blob`` results.
+
+    Content re-ingested since the release keeps its object. Returns the bytes
+    freed; failures are logged and left to the lifecycle job's stray sweep.
+    """
+    freed = 0
+    for sha256, key, size, tier, cold_key in released:
+        try:
+            with engine.begin() as connection:
+                lock_blob(connection, sha256)
+                if connection.execute(select(exists().where(Blob.sha256 == sha256))).scalar():
+                    continue
+                freed += _delete_objects(key, size, tier, cold_key)
+        except Exception:
+            logger.exception("Failed to delete released blob %s", sha256)
+    return freed
+
+
+def _delete_objects(key: str, size: int, tier: str, cold_key: Optional[str]) -> int:
+    """Delete a blob's stored objects; returns the bytes freed."""
+    if tier == "cold":
+        get_cold_storage().delete(cold_key)
+    else:
+        get_storage().delete(key)
+    return size
+
+
+def _mark_hot(db: Session, sha256: str, cold_key: Optional[str]) -> None:
+    db.execute(
+        update(Blob)
+        .where(Blob.sha256 == sha256)
+        .values(tier="hot", cold_key=None, cold_size=None, tier_changed_at=datetime.utcnow())
+    )
+    if cold_key:
+        get_cold_storage().delete(cold_key)
+
+
+def _copy_stream(source, compressor_or_none, dest_path: str) -> None:
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    with open(dest_path, "wb") as out:
+        for chunk in iter(lambda: source.read(settings.upload_chunk_bytes), b""):
+            out.write(compressor_or_none.compress(chunk) if compressor_or_none else chunk)
+        if compressor_or_none:
+            out.write(compressor_or_none.flush())
+
+
+def archive_blob(db: Session, sha256: str) -> int:
+    """Move a hot blob to the cold tier as an xz-recompressed copy.
+
+    Returns the bytes removed from hot storage (0 if the blob was not hot).
+    """
+    blob = db.query(Blob).filter(Blob.sha256 == sha256).with_for_update().first()
+    if not blob or blob.tier != "hot":
+        db.rollback()
+        return 0
+
+    cold_key = f"cold/{sha256[:2]}/{sha256[2:4]}/{sha256}.xz"
+    staged = staging_path(".xz")
+    with get_storage().open(blob.storage_path) as source:
+        _copy_stream(source, lzma.LZMACompressor(preset=6), staged)
+    cold_size = os.path.getsize(staged)
+    get_cold_storage().save_file(staged, cold_key)
+
+    blob.tier = "cold"
+    blob.cold_key = cold_key
+    blob.cold_size = cold_size
+    blob.tier_changed_at = datetime.utcnow()
+    hot_key, size = blob.storage_path, blob.size
+    db.commit()
+    # Only drop the hot copy once readers are pointed at the cold one
+    get_storage().delete(hot_key)
+    return size
+
+
+def ensure_hot(db: Session, sha256: str) -> None:
+    """Restore a cold blob to hot storage before it is read (no-op when hot)."""
+    blob = db.query(Blob).filter(Blob.sha256 == sha256).with_for_update().first()
+    if not blob or blob.tier != "cold":
+        db.rollback()
+        return
+
+    staged = staging_path()
+    with get_cold_storage().open(blob.cold_key) as source:
+        _copy_stream(lzma.LZMAFile(source, "rb"), None, staged)
+    get_storage().save_file(staged, blob.storage_path)
+    _mark_hot(db, sha256, blob.cold_key)
+    db.commit()
+
+
+@event.listens_for(Submission, "after_delete")
+def _release_submission_blob(mapper, connection, target):
+    """Release the blob of any submission removed through the ORM (including cascades).
+
+    Only the ref_count changes inside the flush; objects of blobs that reach
+    zero are deleted once the session commits, so a rollback loses nothing.
+    """
+    if target.file_sha256 and target.file_path == blob_key(target.file_sha256):
+        released = release_blob(connection, target.file_sha256)
+        if released:
+            object_session(target).info.setdefault("released_blobs", []).extend(released)
+
+
+@event.listens_for(Session, "after_commit")
+def _delete_released_blobs(session):
+    released = session.info.pop("released_blobs", None)
+    if released:
+        delete_released(released)
+
+
+@event.listens_for(Session, "after_rollback")
+def _keep_released_blobs(session):
+    session.info.pop("released_blobs", None)
@@ -0,0 +1,215 @@
+import os
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import anyio
+from fastapi import HTTPException, Request, status
+from starlette.responses import RedirectResponse, Response
+
+from ..core.config import settings
+from ..core.storage import get_storage
+
+
+class RangeFileResponse(Response):
+    """Send ``length`` bytes of a file starting at ``start``.
+
+    Uses the ASGI zero-copy (sendfile) or pathsend extensions when the server
+    advertises them, and otherwise streams fixed-size chunks read off the event
+    loop.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: str, start: int, length: int, status_code: int,
+                 headers: dict, media_type: str, whole_file: bool = False):
+        self.path = path
+        self.start = start
+        self.length = length
+        self.whole_file = whole_file
+        super().__init__(content=None, status_code=status_code, headers=headers, media_type=media_type)
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+
+        if scope.get("method") == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopy" in extensions:
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+            return
+
+        if "http.response.pathsend" in extensions and self.whole_file:
+            await send({"type": "http.response.pathsend", "path": os.path.abspath(self.path)})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as f:
+            await f.seek(self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({
+                    "type": "http.response.body",
+                    "body": chunk,
+                    "more_body": remaining > 0,
+                })
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into inclusive ``(start, end)``.
+
+    Returns ``None`` when the header should be ignored (multiple ranges or bad
+    syntax) and raises 416 when the range cannot be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix <= 0:
+                raise ValueError
+            start, end = max(size - suffix, 0), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+            end = min(end, size - 1)
+    except ValueError:
+        return None
+
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+def _if_range_matches(value: str, etag: str, last_modified: float) -> bool:
+    value = value.strip()
+    if value.startswith("W/"):
+        # Weak validators never match for ranges
+        return False
+    if value.startswith('"'):
+        return value == etag
+    try:
+        # Must be exactly the Last-Modified we sent (whole seconds)
+        return int(parsedate_to_datetime(value).timestamp()) == int(last_modified)
+    except (TypeError, ValueError):
+        return False
+
+
+def _content_disposition(filename: str) -> str:
+    return f"attachment; filename*=utf-8''{quote(filename)}"
+
+
+def file_download_response(
+    request: Request,
+    path: str,
+    filename: str,
+    media_type: str = "application/zip",
+    etag: Optional[str] = None,
+) -> Response:
+    """Serve a stored file with Range/If-Range support or hand it to the web server.
+
+    With ``DOWNLOAD_OFFLOAD=x-accel-redirect`` (nginx) or ``x-sendfile``
+    (Apache/lighttpd) the API only authorizes the download and the fronting
+    server streams the bytes, including ranges.
+    """
+    try:
+        stat_result = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+
+    size = stat_result.st_size
+    etag = f'"{etag}"' if etag else f'"{int(stat_result.st_mtime):x}-{size:x}"'
+    headers = {
+        "Content-Disposition": _content_disposition(filename),
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+    }
+
+    if settings.download_offload == "x-accel-redirect":
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(settings.upload_dir))
+        headers["X-Accel-Redirect"] = settings.download_offload_prefix.rstrip("/") + "/" + quote(relative.replace(os.sep, "/"))
+        return Response(status_code=status.HTTP_200_OK, headers=headers, media_type=media_type)
+    if settings.download_offload == "x-sendfile":
+        headers["X-Sendfile"] = os.path.abspath(path)
+        return Response(status_code=status.HTTP_200_OK, headers=headers, media_type=media_type)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header:
+        if_range = request.headers.get("if-range")
+        if if_range is None or _if_range_matches(if_range, etag, stat_result.st_mtime):
+            byte_range = parse_range(range_header, size)
+
+    if byte_range is None:
+        start, length, status_code = 0, size, status.HTTP_200_OK
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    headers["Content-Length"] = str(length)
+    return RangeFileResponse(
+        path, start, length, status_code, headers, media_type,
+        whole_file=byte_range is None
+    )
+
+
+def stored_file_response(
+    request: Request,
+    key: str,
+    filename: str,
+    media_type: str = "application/zip",
+    etag: Optional[str] = None,
+    expires_in: Optional[int] = None,
+) -> Response:
+    """Serve a file from the storage backend.
+
+    Local files go through ``file_download_response``; remote backends answer
+    with a redirect to a presigned URL valid for ``expires_in`` seconds
+    (default ``DOWNLOAD_URL_TTL_SECONDS``) so the bytes bypass the API.
+    """
+    storage = get_storage()
+    local_path = storage.local_path(key)
+    if local_path is not None:
+        return file_download_response(request, local_path, filename, media_type, etag)
+
+    url = storage.presigned_url(key, filename, expires_in or settings.download_url_ttl_seconds)
+    return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
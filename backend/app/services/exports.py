@@ -0,0 +1,204 @@
+import csv
+import enum
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterator, Optional
+from urllib.parse import quote
+
+from fastapi import HTTPException, status
+from sqlalchemy import types as sqltypes
+from starlette.responses import StreamingResponse
+
+from ..models.project import Project, ProjectPayment, ProjectRequest
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+# Rows fetched from the server-side cursor, and written, per chunk
+BATCH_ROWS = 1000
+# Parquet compresses per row group; bigger groups, still bounded memory
+PARQUET_BATCH_ROWS = 10000
+
+# Columns of the bulk exports (descriptions are left out to keep rows small)
+PROJECT_COLUMNS = (
+    Project.id, Project.title, Project.category, Project.budget, Project.status,
+    Project.buyer_id, Project.assigned_solver_id, Project.created_at, Project.updated_at,
+    Project.completed_at
+)
+REQUEST_COLUMNS = (
+    ProjectRequest.id, ProjectRequest.project_id, ProjectRequest.problem_solver_id,
+    ProjectRequest.status, ProjectRequest.requested_at, ProjectRequest.responded_at
+)
+PAYMENT_COLUMNS = (
+    ProjectPayment.id, ProjectPayment.project_id, ProjectPayment.solver_id, ProjectPayment.amount,
+    ProjectPayment.status, ProjectPayment.payment_method, ProjectPayment.stripe_payment_intent_id,
+    ProjectPayment.stripe_payout_id, ProjectPayment.payout_item_id, ProjectPayment.created_at,
+    ProjectPayment.released_at, ProjectPayment.paid_at
+)
+
+
+def _plain(value):
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def iter_rows(db, statement, batch_rows: int = BATCH_ROWS) -> Iterator[tuple]:
+    """Yield ``(columns, rows)`` chunks of a Core select from a server-side cursor.
+
+    Rows are plain tuples, never ORM objects, so nothing accumulates in the
+    session and memory stays flat however many rows there are.
+    """
+    result = db.execute(statement.execution_options(yield_per=batch_rows))
+    columns = list(result.keys())
+    for rows in result.partitions():
+        yield columns, rows
+
+
+def _iter_csv(chunks) -> Iterator[bytes]:
+    header_written = False
+    for columns, rows in chunks:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not header_written:
+            writer.writerow(columns)
+            header_written = True
+        writer.writerows([[_plain(value) for value in row] for row in rows])
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _iter_ndjson(chunks) -> Iterator[bytes]:
+    for columns, rows in chunks:
+        lines = [
+            json.dumps({column: _plain(value) for column, value in zip(columns, row)}, default=str)
+            for row in rows
+        ]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _load_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="format=parquet requires pyarrow on the server (pip install pyarrow)"
+        )
+    return pyarrow
+
+
+def _arrow_type(pa, column_type):
+    if isinstance(column_type, sqltypes.Boolean):
+        return pa.bool_()
+    if isinstance(column_type, sqltypes.Integer):
+        return pa.int64()
+    if isinstance(column_type, sqltypes.Float):
+        return pa.float64()
+    if isinstance(column_type, sqltypes.Numeric):
+        return pa.decimal128(column_type.precision or 18, column_type.scale or 2)
+    if isinstance(column_type, sqltypes.DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, sqltypes.Date):
+        return pa.date32()
+    return pa.string()
+
+
+def _iter_parquet(statement, chunks) -> Iterator[bytes]:
+    """One row group per chunk, sent as soon as it is written; the footer comes last."""
+    pa = _load_pyarrow()
+    schema = pa.schema([
+        (column.key, _arrow_type(pa, column.type)) for column in statement.selected_columns
+    ])
+    sink = _ChunkSink()
+    writer = pa.parquet.ParquetWriter(sink, schema)
+    try:
+        for columns, rows in chunks:
+            writer.write_table(pa.Table.from_pylist([
+                {
+                    column: value.value if isinstance(value, enum.Enum) else value
+                    for column, value in zip(columns, row)
+                }
+                for row in rows
+            ], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+WRITERS = {
+    "csv": _iter_csv,
+    "ndjson": _iter_ndjson,
+}
+
+
+def check_format(fmt: str) -> None:
+    if fmt not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"format must be one of: {', '.join(EXPORT_MEDIA_TYPES)}"
+        )
+    if fmt == "parquet":
+        _load_pyarrow()
+
+
+def date_range(column, start: Optional[datetime], end: Optional[datetime]) -> list:
+    """Conditions for ``start <= column < end``, either bound optional."""
+    conditions = []
+    if start is not None:
+        conditions.append(column >= start)
+    if end is not None:
+        conditions.append(column < end)
+    return conditions
+
+
+def export_response(db, statement, fmt: str, filename: str) -> StreamingResponse:
+    """Stream the rows of ``statement`` as a CSV, NDJSON or Parquet download.
+
+    The query runs while the body is sent (chunked), on the request's
+    session, which is closed after the response completes.
+    """
+    check_format(fmt)
+    if fmt == "parquet":
+        body = _iter_parquet(statement, iter_rows(db, statement, PARQUET_BATCH_ROWS))
+    else:
+        body = WRITERS[fmt](iter_rows(db, statement))
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename*=utf-8''{quote(filename)}.{fmt}"}
+    )
@@ -0,0 +1,190 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterable, Optional, Tuple
+
+from sqlalchemy import event, func, insert, inspect, literal_column, or_, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..models.payment import PaymentLedgerEntry, SolverBalance
+from ..models.project import ProjectPayment
+
+# Statuses with their own balance column; every status counts towards "earned"
+BALANCE_STATUSES = ("pending", "released", "paid")
+
+# (payment_id, solver_id, amount, from_status, to_status); a None status
+# means the payment did not exist before / no longer exists after
+Transition = Tuple[Optional[int], int, Decimal, Optional[str], Optional[str]]
+
+
+def record_transitions(db, transitions: Iterable[Transition]) -> None:
+    """Append ledger entries for payment changes and apply them to solver balances.
+
+    Runs in the caller's transaction (nothing is committed), so balances move
+    together with the payment rows. Works with a Session or a Connection.
+    """
+    now = datetime.utcnow()
+    entries = []
+    for payment_id, solver_id, amount, from_status, to_status in transitions:
+        if from_status == to_status:
+            continue
+        amount = Decimal(str(amount))
+        if from_status is not None:
+            entries.append({
+                "payment_id": payment_id, "solver_id": solver_id, "status": from_status,
+                "amount": -amount, "count_delta": -1, "created_at": now,
+            })
+        if to_status is not None:
+            entries.append({
+                "payment_id": payment_id, "solver_id": solver_id, "status": to_status,
+                "amount": amount, "count_delta": 1, "created_at": now,
+            })
+    _append(db, entries, now)
+
+
+def _append(db, entries: list, now: datetime) -> None:
+    if not entries:
+        return
+    db.execute(insert(PaymentLedgerEntry), entries)
+
+    deltas = defaultdict(lambda: dict.fromkeys(("earned",) + BALANCE_STATUSES + ("payment_count",), 0))
+    for entry in entries:
+        delta = deltas[entry["solver_id"]]
+        delta["earned"] += entry["amount"]
+        delta["payment_count"] += entry["count_delta"]
+        if entry["status"] in BALANCE_STATUSES:
+            delta[entry["status"]] += entry["amount"]
+
+    # Solvers in id order so concurrent writers lock balance rows consistently
+    stmt = pg_insert(SolverBalance).values([
+        dict(delta, solver_id=solver_id, updated_at=now)
+        for solver_id, delta in sorted(deltas.items())
+    ])
+    columns = ("earned",) + BALANCE_STATUSES + ("payment_count",)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[SolverBalance.solver_id],
+        set_=dict(
+            {column: getattr(SolverBalance, column) + stmt.excluded[column] for column in columns},
+            updated_at=stmt.excluded.updated_at,
+        )
+    ))
+
+
+def _payment_state(payment: ProjectPayment, current: bool) -> tuple:
+    """``(solver_id, amount, status)`` as flushed (current) or as loaded (not current)."""
+    state = inspect(payment)
+    values = []
+    for attr in ("solver_id", "amount", "status"):
+        history = state.attrs[attr].history
+        if current:
+            value = history.added[0] if history.added else (history.unchanged or [getattr(payment, attr)])[0]
+        else:
+            value = history.deleted[0] if history.deleted else (history.unchanged or [getattr(payment, attr)])[0]
+        values.append(value)
+    return tuple(values)
+
+
+@event.listens_for(Session, "after_flush")
+def _record_orm_payment_changes(session, flush_context):
+    """Ledger every ProjectPayment inserted, updated or deleted through the ORM.
+
+    Bulk statements that bypass the ORM call ``record_transitions`` themselves.
+    """
+    transitions = []
+    for payment in session.new:
+        if isinstance(payment, ProjectPayment):
+            solver_id, amount, status = _payment_state(payment, current=True)
+            transitions.append((payment.id, solver_id, amount, None, status))
+    for payment in session.deleted:
+        if isinstance(payment, ProjectPayment):
+            solver_id, amount, status = _payment_state(payment, current=False)
+            transitions.append((payment.id, solver_id, amount, status, None))
+    for payment in session.dirty:
+        if not isinstance(payment, ProjectPayment) or not session.is_modified(payment):
+            continue
+        old = _payment_state(payment, current=False)
+        new = _payment_state(payment, current=True)
+        if old == new:
+            continue
+        if old[:2] == new[:2]:
+            transitions.append((payment.id, new[0], new[1], old[2], new[2]))
+        else:
+            # Moved to another solver or re-priced: remove and re-add
+            transitions.append((payment.id, old[0], old[1], old[2], None))
+            transitions.append((payment.id, new[0], new[1], None, new[2]))
+    if transitions:
+        record_transitions(session.connection(), transitions)
+
+
+def _expected_balances():
+    """Per-solver balances computed from project_payments."""
+    columns = [
+        ProjectPayment.solver_id.label("solver_id"),
+        func.coalesce(func.sum(ProjectPayment.amount), 0).label("earned"),
+    ]
+    for status in BALANCE_STATUSES:
+        columns.append(
+            func.coalesce(func.sum(ProjectPayment.amount).filter(ProjectPayment.status == status), 0).label(status)
+        )
+    columns.append(func.count(ProjectPayment.id).label("payment_count"))
+    return select(*columns).group_by(ProjectPayment.solver_id).subquery()
+
+
+def find_inconsistencies(db) -> list:
+    """Solvers whose rolled-up balance differs from their project_payments rows.
+
+    Returns one dict per solver with the stored and expected figures.
+    """
+    expected = _expected_balances()
+    stored = SolverBalance.__table__
+    columns = ("earned",) + BALANCE_STATUSES + ("payment_count",)
+    joined = stored.join(expected, stored.c.solver_id == expected.c.solver_id, full=True)
+    differs = [
+        func.coalesce(stored.c[column], 0) != func.coalesce(expected.c[column], 0)
+        for column in columns
+    ]
+    rows = db.execute(
+        select(
+            func.coalesce(stored.c.solver_id, expected.c.solver_id).label("solver_id"),
+            *[func.coalesce(stored.c[column], 0).label(f"stored_{column}") for column in columns],
+            *[func.coalesce(expected.c[column], 0).label(f"expected_{column}") for column in columns],
+        ).select_from(joined).where(or_(*differs)).order_by(literal_column("solver_id"))
+    ).mappings().all()
+    return [dict(row) for row in rows]
+
+
+def rebuild_balances(db) -> int:
+    """Bring every solver balance back in line with project_payments.
+
+    Differences are written to the ledger as adjustment entries (no payment
+    id), so the ledger keeps summing to the balances. Payment writes are
+    blocked for the duration. Returns the number of solvers adjusted; the
+    caller commits.
+    """
+    db.execute(text("LOCK TABLE project_payments IN SHARE MODE"))
+    db.execute(text("LOCK TABLE solver_balances IN EXCLUSIVE MODE"))
+
+    now = datetime.utcnow()
+    entries = []
+    mismatches = find_inconsistencies(db)
+    for row in mismatches:
+        for status in BALANCE_STATUSES:
+            difference = row[f"expected_{status}"] - row[f"stored_{status}"]
+            if difference:
+                entries.append({
+                    "payment_id": None, "solver_id": row["solver_id"], "status": status,
+                    "amount": difference, "count_delta": 0, "created_at": now,
+                })
+        other = (row["expected_earned"] - row["stored_earned"]) - sum(
+            row[f"expected_{status}"] - row[f"stored_{status}"] for status in BALANCE_STATUSES
+        )
+        count_difference = row["expected_payment_count"] - row["stored_payment_count"]
+        if other or count_difference:
+            # Payments in statuses without their own column, plus count drift
+            entries.append({
+                "payment_id": None, "solver_id": row["solver_id"], "status": "adjustment",
+                "amount": other, "count_delta": count_difference, "created_at": now,
+            })
+    _append(db, entries, now)
+    return len(mismatches)
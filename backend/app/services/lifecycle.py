@@ -0,0 +1,213 @@
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, exists, func, select, update
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.jobs import job
+from ..core.storage import get_storage
+from ..models.project import Project, ProjectStatus
+from ..models.storage import Blob
+from ..models.task import Task, Submission
+from .blobs import BLOB_PREFIX, _delete_objects, archive_blob
+
+logger = logging.getLogger(__name__)
+
+KEY_BATCH = 1000
+
+
+def reconcile_ref_counts(db) -> int:
+    """Reset each blob's ref_count to the number of submissions pointing at it.
+
+    Works through the blobs in batches, one transaction each. A batch's rows
+    are locked before its submissions are counted, so an ingest or release
+    of the same blob waits for the write instead of being overwritten by a
+    stale count (both take the blob row lock in their own transaction).
+    Returns the number of blobs corrected.
+    """
+    fixed = 0
+    after = ""
+    while True:
+        shas = [sha for (sha,) in db.query(Blob.sha256).filter(
+            Blob.sha256 > after
+        ).order_by(Blob.sha256).limit(KEY_BATCH).with_for_update()]
+        if not shas:
+            db.commit()
+            return fixed
+        after = shas[-1]
+
+        actual = select(
+            Blob.sha256.label("sha256"),
+            func.count(Submission.id).label("refs")
+        ).select_from(Blob).outerjoin(
+            Submission,
+            and_(Submission.file_sha256 == Blob.sha256, Submission.file_path == Blob.storage_path)
+        ).where(Blob.sha256.in_(shas)).group_by(Blob.sha256).subquery()
+
+        fixed += db.execute(
+            update(Blob)
+            .where(Blob.sha256 == actual.c.sha256, Blob.ref_count != actual.c.refs)
+            .values(ref_count=actual.c.refs)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+
+
+def _collect_unreferenced_blobs(db, cutoff, dry_run):
+    query = db.query(Blob).filter(Blob.ref_count <= 0, Blob.created_at < cutoff)
+    removed = freed = 0
+    for blob in query.with_for_update(skip_locked=True).all():
+        removed += 1
+        if dry_run:
+            freed += blob.size
+            continue
+        freed += _delete_objects(blob.storage_path, blob.size, blob.tier, blob.cold_key)
+        db.delete(blob)
+    db.commit()
+    return removed, freed
+
+
+def _collect_stray_objects(db, cutoff, dry_run):
+    """Objects under blobs/ that no blob row knows about."""
+    storage = get_storage()
+    removed = freed = 0
+    batch = []
+
+    def flush(batch):
+        nonlocal removed, freed
+        known = {
+            key for (key,) in db.query(Blob.storage_path).filter(
+                Blob.storage_path.in_([key for key, _ in batch])
+            )
+        }
+        for key, size in batch:
+            if key in known:
+                continue
+            removed += 1
+            freed += size
+            if not dry_run:
+                storage.delete(key)
+
+    for key, size, mtime in storage.iter_keys(BLOB_PREFIX):
+        if datetime.utcfromtimestamp(mtime) >= cutoff:
+            continue
+        batch.append((key, size))
+        if len(batch) >= KEY_BATCH:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return removed, freed
+
+
+def _collect_legacy_files(db, cutoff, dry_run):
+    """Files under the local upload directory outside the blob store: legacy
+    task_* uploads no submission references and abandoned staging files."""
+    root = settings.upload_dir
+    if not os.path.isdir(root):
+        return 0, 0
+
+    candidates = []
+    for directory in (root, os.path.join(root, ".staging")):
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path) and datetime.utcfromtimestamp(os.path.getmtime(path)) < cutoff:
+                candidates.append(path)
+
+    # Legacy rows hold whatever path the upload was written to, usually
+    # relative to the working directory ("uploads/task_..."), so compare file
+    # names: they are unique within the upload directory
+    names = sorted({os.path.basename(path) for path in candidates})
+    stored_name = func.regexp_replace(Submission.file_path, r"^.*[/\\]", "")
+    referenced = set()
+    for start in range(0, len(names), KEY_BATCH):
+        referenced.update(
+            name for (name,) in db.query(stored_name).filter(
+                ~Submission.file_path.startswith(BLOB_PREFIX),
+                stored_name.in_(names[start:start + KEY_BATCH])
+            )
+        )
+
+    removed = freed = 0
+    for path in candidates:
+        if os.path.basename(path) in referenced:
+            continue
+        removed += 1
+        freed += os.path.getsize(path)
+        if not dry_run:
+            os.unlink(path)
+    return removed, freed
+
+
+def _archive_finished_projects(db, now, dry_run):
+    """Move blobs used only by projects completed long ago to the cold tier."""
+    cutoff = now - timedelta(days=settings.cold_tier_after_days)
+    still_needed = exists().where(
+        Submission.file_sha256 == Blob.sha256,
+        Submission.task_id == Task.id,
+        Task.project_id == Project.id,
+        # updated_at moves on any later edit; completed_at is when it finished
+        ~and_(
+            Project.status == ProjectStatus.COMPLETED,
+            func.coalesce(Project.completed_at, Project.updated_at) < cutoff
+        )
+    )
+    candidates = db.query(Blob.sha256, Blob.size).filter(
+        Blob.tier == "hot",
+        Blob.ref_count > 0,
+        # Do not bounce blobs that were restored recently
+        (Blob.tier_changed_at.is_(None)) | (Blob.tier_changed_at < cutoff),
+        ~still_needed
+    ).all()
+
+    archived = moved = 0
+    for sha256, size in candidates:
+        if dry_run:
+            archived += 1
+            moved += size
+            continue
+        try:
+            freed = archive_blob(db, sha256)
+            if freed:
+                archived += 1
+                moved += freed
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to archive blob %s", sha256)
+    return archived, moved
+
+
+@job
+def run_storage_lifecycle(dry_run: bool = False) -> dict:
+    """Reconcile storage against the submissions table and tier old data.
+
+    Returns a report with the bytes reclaimed from hot storage.
+    """
+    now = datetime.utcnow()
+    orphan_cutoff = now - timedelta(hours=settings.storage_orphan_grace_hours)
+    db = SessionLocal()
+    try:
+        fixed_refs = 0 if dry_run else reconcile_ref_counts(db)
+
+        blobs_removed, blob_bytes = _collect_unreferenced_blobs(db, orphan_cutoff, dry_run)
+        strays_removed, stray_bytes = _collect_stray_objects(db, orphan_cutoff, dry_run)
+        legacy_removed, legacy_bytes = _collect_legacy_files(db, orphan_cutoff, dry_run)
+        archived, archived_bytes = _archive_finished_projects(db, now, dry_run)
+    finally:
+        db.close()
+
+    report = {
+        "dry_run": dry_run,
+        "ref_counts_fixed": fixed_refs,
+        "unreferenced_blobs_removed": blobs_removed,
+        "stray_objects_removed": strays_removed,
+        "legacy_files_removed": legacy_removed,
+        "blobs_archived": archived,
+        "reclaimed_bytes": blob_bytes + stray_bytes + legacy_bytes + archived_bytes,
+    }
+    logger.info("Storage lifecycle run: %s", report)
+    return report
@@ -0,0 +1,74 @@
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import load_only, selectinload, with_expression
+
+from ..models.project import Project, ProjectRequest, Sprint
+from ..models.user import User
+
+# Length of the description excerpt computed for list views
+SNIPPET_CHARS = 200
+
+
+def application_count(status: Optional[str] = None):
+    """Correlated count of a project's applications, optionally in one status."""
+    query = select(func.count(ProjectRequest.id)).where(ProjectRequest.project_id == Project.id)
+    if status is not None:
+        query = query.where(ProjectRequest.status == status)
+    return query.correlate(Project).scalar_subquery()
+
+
+def buyer_name():
+    return select(User.full_name).where(User.id == Project.buyer_id).correlate(Project).scalar_subquery()
+
+
+def description_snippet():
+    """The description cut to ``SNIPPET_CHARS`` in the database, with an ellipsis when cut."""
+    return case(
+        (func.length(Project.description) > SNIPPET_CHARS,
+         func.left(Project.description, SNIPPET_CHARS - 1) + "…"),
+        else_=Project.description
+    )
+
+
+# Computed listing attributes each route can serve, by response field name
+MARKETPLACE_EXPRESSIONS: Dict[str, Callable] = {
+    "applications_count": application_count,
+    "buyer_name": buyer_name,
+    "description_snippet": description_snippet,
+}
+BUYER_EXPRESSIONS: Dict[str, Callable] = {
+    "pending_applications": lambda: application_count("pending"),
+    "description_snippet": description_snippet,
+}
+
+
+def listing_options(fields: Optional[Tuple[str, ...]], expressions: Dict[str, Callable]) -> list:
+    """Loader options selecting only what ``fields`` needs (everything when ``None``).
+
+    Requested columns go through ``load_only``, so unrequested ones such as
+    ``description`` are never read from the database; requested computed
+    attributes are added with ``with_expression``.
+    """
+    options = []
+    if fields is not None:
+        columns = [getattr(Project, name) for name in fields if name in Project.__table__.columns]
+        options.append(load_only(Project.id, *columns))
+    for name, expression in expressions.items():
+        if fields is None or name in fields:
+            options.append(with_expression(getattr(Project, name), expression()))
+    return options
+
+
+# Relations project detail can include, each loaded with one extra query
+DETAIL_RELATIONS: Dict[str, Callable] = {
+    "requests": lambda: selectinload(Project.requests),
+    "tasks": lambda: selectinload(Project.tasks),
+    "sprints": lambda: selectinload(Project.sprints).selectinload(Sprint.features),
+    "features": lambda: selectinload(Project.features),
+}
+
+
+def detail_options(include: Tuple[str, ...]) -> list:
+    """``selectinload`` options for the included detail relations."""
+    return [DETAIL_RELATIONS[name]() for name in include]
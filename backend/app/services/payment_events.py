@@ -0,0 +1,171 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..core.database import SessionLocal
+from ..core.jobs import job
+from ..models.payment import PaymentEvent, PayoutRunItem
+from ..models.project import Project, ProjectPayment
+from .ledger import record_transitions
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def store_event(db, event: dict) -> None:
+    """Append a raw webhook event to the inbox (one INSERT, no lookups)."""
+    db.execute(insert(PaymentEvent).values(
+        event_id=event["id"],
+        event_type=event["type"],
+        payload=event,
+        status="pending",
+        received_at=datetime.utcnow(),
+    ))
+
+
+def _apply_intents_succeeded(db, intents: list, now: datetime) -> None:
+    """Record a released payment for each succeeded intent not seen before."""
+    def project_id(intent):
+        value = (intent.get("metadata") or {}).get("project_id")
+        return int(value) if value else None
+
+    project_ids = {project_id(intent) for intent in intents} - {None}
+    solvers = dict(
+        db.query(Project.id, Project.assigned_solver_id).filter(Project.id.in_(project_ids))
+    ) if project_ids else {}
+
+    rows = []
+    for intent in intents:
+        solver_id = solvers.get(project_id(intent))
+        if solver_id is None:
+            logger.warning("Payment intent %s has no project with an assigned solver", intent["id"])
+            continue
+        rows.append({
+            "project_id": project_id(intent),
+            "solver_id": solver_id,
+            "amount": Decimal(intent.get("amount_received") or intent["amount"]) / 100,
+            "status": "released",
+            "stripe_payment_intent_id": intent["id"],
+            "payment_method": "stripe",
+            "created_at": now,
+            "released_at": now,
+        })
+    if rows:
+        inserted = db.execute(
+            pg_insert(ProjectPayment).values(rows).on_conflict_do_nothing(
+                index_elements=[ProjectPayment.stripe_payment_intent_id]
+            ).returning(ProjectPayment.id, ProjectPayment.solver_id, ProjectPayment.amount)
+        ).all()
+        record_transitions(db, [(row.id, row.solver_id, row.amount, None, "released") for row in inserted])
+
+
+def _apply_payouts_paid(db, payouts: list, now: datetime) -> None:
+    paid = db.execute(
+        update(ProjectPayment)
+        .where(
+            ProjectPayment.stripe_payout_id.in_([payout["id"] for payout in payouts]),
+            ProjectPayment.status == "released"
+        )
+        .values(status="paid", paid_at=now)
+        .returning(ProjectPayment.id, ProjectPayment.solver_id, ProjectPayment.amount)
+    ).all()
+    record_transitions(db, [(row.id, row.solver_id, row.amount, "released", "paid") for row in paid])
+
+
+def _apply_payouts_failed(db, payouts: list, now: datetime) -> None:
+    # Back to released and unclaimed so the next payout run picks them up again
+    payout_ids = [payout["id"] for payout in payouts]
+    db.execute(
+        update(PayoutRunItem)
+        .where(PayoutRunItem.stripe_payout_id.in_(payout_ids))
+        .values(status="failed", error="Payout failed at the provider", updated_at=now)
+    )
+    reverted = db.execute(
+        update(ProjectPayment)
+        .where(
+            ProjectPayment.stripe_payout_id.in_(payout_ids),
+            ProjectPayment.status == "paid"
+        )
+        .values(status="released", stripe_payout_id=None, paid_at=None, payout_item_id=None)
+        .returning(ProjectPayment.id, ProjectPayment.solver_id, ProjectPayment.amount)
+    ).all()
+    record_transitions(db, [(row.id, row.solver_id, row.amount, "paid", "released") for row in reverted])
+
+
+HANDLERS = {
+    "payment_intent.succeeded": _apply_intents_succeeded,
+    "payout.paid": _apply_payouts_paid,
+    "payout.failed": _apply_payouts_failed,
+    "payout.canceled": _apply_payouts_failed,
+}
+
+
+def _process_batch(db, batch_size: int) -> int:
+    events = db.query(
+        PaymentEvent.id, PaymentEvent.event_id, PaymentEvent.event_type, PaymentEvent.payload
+    ).filter(
+        PaymentEvent.status == "pending"
+    ).order_by(PaymentEvent.id).limit(batch_size).with_for_update(skip_locked=True).all()
+    if not events:
+        db.commit()
+        return 0
+
+    # Stripe delivers at least once; keep the first copy of each event id
+    seen = {
+        event_id for (event_id,) in db.query(PaymentEvent.event_id).filter(
+            PaymentEvent.event_id.in_({event.event_id for event in events}),
+            PaymentEvent.status.in_(("processed", "ignored"))
+        ).distinct()
+    }
+    outcome = defaultdict(list)
+    objects = defaultdict(list)
+    for event in events:
+        if event.event_id in seen:
+            outcome["duplicate"].append(event.id)
+            continue
+        seen.add(event.event_id)
+        if event.event_type in HANDLERS:
+            objects[event.event_type].append(event.payload["data"]["object"])
+            outcome["processed"].append(event.id)
+        else:
+            outcome["ignored"].append(event.id)
+
+    now = datetime.utcnow()
+    for event_type, items in objects.items():
+        HANDLERS[event_type](db, items, now)
+
+    for event_status, ids in outcome.items():
+        db.execute(
+            update(PaymentEvent)
+            .where(PaymentEvent.id.in_(ids))
+            .values(status=event_status, processed_at=now)
+        )
+    db.commit()
+    return len(events)
+
+
+@job
+def process_payment_events(batch_size: int = BATCH_SIZE) -> int:
+    """Apply pending webhook events until the inbox is drained.
+
+    Each batch applies its transitions with one statement per event type and
+    commits together with the events' status. Batches are claimed with SKIP
+    LOCKED so several workers can drain a burst; every transition is also
+    idempotent, so an event id that slips past deduplication is harmless.
+    Returns the number of events consumed.
+    """
+    db = SessionLocal()
+    total = 0
+    try:
+        while True:
+            count = _process_batch(db, batch_size)
+            total += count
+            if count < batch_size:
+                return total
+    finally:
+        db.close()
@@ -0,0 +1,240 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.jobs import enqueue, enqueue_in, job
+from ..core.payments import PaymentProviderError, get_payment_gateway
+from ..models.payment import PaymentOperation
+from ..models.project import ProjectPayment
+from .ledger import record_transitions
+from .payouts import pay_out_item
+
+# A "running" operation not updated for this long belongs to a dead worker
+RUNNING_TIMEOUT = timedelta(minutes=5)
+# A queued operation this far past its due time lost its in-process timer
+QUEUED_GRACE = timedelta(minutes=1)
+
+
+def submit_operation(db, user_id: int, kind: str, idempotency_key: Optional[str] = None,
+                     project_id: Optional[int] = None, payment_id: Optional[int] = None,
+                     params: Optional[dict] = None):
+    """Record a payment operation, or find the one already recorded under the key.
+
+    Returns ``(operation, created)``. The caller commits and then calls
+    ``dispatch`` for new operations.
+    """
+    now = datetime.utcnow()
+    operation_id = uuid.uuid4().hex
+    key = idempotency_key or operation_id
+    inserted = db.execute(
+        pg_insert(PaymentOperation).values(
+            id=operation_id,
+            kind=kind,
+            status="queued",
+            idempotency_key=key,
+            user_id=user_id,
+            project_id=project_id,
+            payment_id=payment_id,
+            params=params or {},
+            attempts=0,
+            created_at=now,
+            updated_at=now,
+        ).on_conflict_do_nothing(
+            constraint="uq_payment_operations_user_key"
+        ).returning(PaymentOperation.id)
+    ).scalar()
+
+    operation = db.query(PaymentOperation).filter(
+        PaymentOperation.user_id == user_id,
+        PaymentOperation.idempotency_key == key
+    ).one()
+    return operation, inserted is not None
+
+
+def dispatch(operation_id: str) -> None:
+    enqueue(run_payment_operation, operation_id)
+
+
+def requeue_if_stalled(operation: PaymentOperation) -> bool:
+    """Re-dispatch an operation whose worker or in-process timer was lost.
+
+    Running an operation twice is safe: claiming is atomic and provider calls
+    carry idempotency keys.
+    """
+    now = datetime.utcnow()
+    if operation.status == "queued":
+        due = operation.next_attempt_at or operation.updated_at
+        stalled = due < now - QUEUED_GRACE
+    elif operation.status == "running":
+        stalled = operation.updated_at < now - RUNNING_TIMEOUT
+    else:
+        stalled = False
+    if stalled:
+        dispatch(operation.id)
+    return stalled
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter for the given number of failed attempts."""
+    ceiling = min(
+        settings.payment_retry_max_seconds,
+        settings.payment_retry_base_seconds * 2 ** (attempts - 1)
+    )
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def _create_payment_intent(db, gateway, operation) -> dict:
+    intent = gateway.create_payment_intent(
+        amount_cents=operation.params["amount_cents"],
+        currency="usd",
+        metadata={"project_id": operation.project_id, "buyer_id": operation.user_id},
+        idempotency_key=f"intent-{operation.id}",
+    )
+    return {
+        "client_secret": intent["client_secret"],
+        "payment_intent_id": intent["id"],
+        "status": intent["status"],
+    }
+
+
+def _confirm_payment(db, gateway, operation) -> dict:
+    payment_intent_id = operation.params["payment_intent_id"]
+    # Usually the payment_intent.succeeded webhook has recorded it already
+    recorded = db.query(ProjectPayment.id, ProjectPayment.amount).filter(
+        ProjectPayment.stripe_payment_intent_id == payment_intent_id
+    ).first()
+    db.rollback()
+    if recorded:
+        return {"payment_id": recorded.id, "payment_intent_id": payment_intent_id, "amount": str(recorded.amount)}
+
+    intent = gateway.retrieve_payment_intent(payment_intent_id)
+    if intent["status"] == "processing":
+        raise PaymentProviderError("Payment is still processing", retryable=True)
+    if intent["status"] != "succeeded":
+        raise PaymentProviderError("Payment not completed")
+
+    now = datetime.utcnow()
+    amount = Decimal(intent["amount"]) / 100  # Convert from cents
+    # The unique intent id makes re-running a confirmation record one payment
+    inserted = db.execute(
+        pg_insert(ProjectPayment).values(
+            project_id=operation.project_id,
+            solver_id=operation.params["solver_id"],
+            amount=amount,
+            status="released",
+            stripe_payment_intent_id=payment_intent_id,
+            payment_method="stripe",
+            created_at=now,
+            released_at=now,
+        ).on_conflict_do_nothing(
+            index_elements=[ProjectPayment.stripe_payment_intent_id]
+        ).returning(ProjectPayment.id, ProjectPayment.solver_id, ProjectPayment.amount)
+    ).first()
+    if inserted is not None:
+        payment_id = inserted.id
+        record_transitions(db, [(inserted.id, inserted.solver_id, inserted.amount, None, "released")])
+    else:
+        payment_id = db.query(ProjectPayment.id).filter(
+            ProjectPayment.stripe_payment_intent_id == payment_intent_id
+        ).scalar()
+
+    return {"payment_id": payment_id, "payment_intent_id": payment_intent_id, "amount": str(amount)}
+
+
+def _create_payout(db, gateway, operation) -> dict:
+    # Keyed by the payout item, so retries of this operation pay out once
+    return pay_out_item(db, gateway, operation.params["payout_item_id"])
+
+
+HANDLERS = {
+    "create_payment_intent": _create_payment_intent,
+    "confirm_payment": _confirm_payment,
+    "payout": _create_payout,
+}
+
+
+@job
+def run_payment_operation(operation_id: str) -> None:
+    """Execute one payment operation against the provider.
+
+    The operation is claimed and committed before the provider call so no
+    database connection is held while waiting on the network. Transient
+    provider failures are retried with exponential backoff up to
+    ``PAYMENT_MAX_ATTEMPTS``.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        operation = db.execute(
+            update(PaymentOperation)
+            .where(
+                PaymentOperation.id == operation_id,
+                or_(
+                    and_(
+                        PaymentOperation.status == "queued",
+                        or_(PaymentOperation.next_attempt_at.is_(None), PaymentOperation.next_attempt_at <= now)
+                    ),
+                    and_(
+                        PaymentOperation.status == "running",
+                        PaymentOperation.updated_at < now - RUNNING_TIMEOUT
+                    )
+                )
+            )
+            .values(status="running", attempts=PaymentOperation.attempts + 1, updated_at=now)
+            .returning(
+                PaymentOperation.id, PaymentOperation.kind, PaymentOperation.user_id,
+                PaymentOperation.project_id, PaymentOperation.payment_id,
+                PaymentOperation.params, PaymentOperation.attempts
+            )
+        ).first()
+        db.commit()
+        if operation is None:
+            return
+
+        try:
+            result = HANDLERS[operation.kind](db, get_payment_gateway(), operation)
+        except PaymentProviderError as e:
+            db.rollback()
+            _record_failure(db, operation, e)
+            return
+
+        db.execute(
+            update(PaymentOperation)
+            .where(PaymentOperation.id == operation_id)
+            .values(
+                status="succeeded", result=result, error=None,
+                next_attempt_at=None, updated_at=datetime.utcnow()
+            )
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def _record_failure(db, operation, error: PaymentProviderError) -> None:
+    now = datetime.utcnow()
+    delay = None
+    if error.retryable and operation.attempts < settings.payment_max_attempts:
+        delay = retry_delay(operation.attempts)
+
+    db.execute(
+        update(PaymentOperation)
+        .where(PaymentOperation.id == operation.id)
+        .values(
+            status="queued" if delay is not None else "failed",
+            error=str(error),
+            next_attempt_at=now + timedelta(seconds=delay) if delay is not None else None,
+            updated_at=now,
+        )
+    )
+    db.commit()
+
+    if delay is not None:
+        enqueue_in(delay, run_payment_operation, operation.id)
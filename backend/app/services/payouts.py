@@ -0,0 +1,329 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, literal, or_, select, update
+
+from ..core.database import SessionLocal
+from ..core.jobs import job
+from ..core.payments import PaymentProviderError, get_payment_gateway
+from ..models.payment import PayoutRun, PayoutRunItem, PayoutRunPayment
+from ..models.project import ProjectPayment
+from ..models.user import User
+from .ledger import record_transitions
+
+logger = logging.getLogger(__name__)
+
+# Pending items untouched this long are retried by the next run
+STALE_ITEM_AGE = timedelta(hours=1)
+# Stripe may forget idempotency keys after 24 hours; past this age a resend
+# could pay twice, so the item is left for manual reconciliation instead
+RETRY_WINDOW = timedelta(hours=23)
+# Arbitrary constant identifying the payout run advisory lock
+RUN_LOCK_KEY = 7_041_001
+
+
+def claim_payment(db, payment: ProjectPayment, destination: str) -> Optional[PayoutRunItem]:
+    """Create a single-payment payout item and claim the payment for it.
+
+    Returns ``None`` when the payment is no longer released or is already
+    being paid out. The caller commits.
+    """
+    item = PayoutRunItem(
+        solver_id=payment.solver_id,
+        destination=destination,
+        amount=payment.amount,
+        payment_count=1,
+        status="pending",
+    )
+    db.add(item)
+    db.flush()
+
+    claimed = db.execute(
+        update(ProjectPayment)
+        .where(
+            ProjectPayment.id == payment.id,
+            ProjectPayment.status == "released",
+            ProjectPayment.payout_item_id.is_(None)
+        )
+        .values(payout_item_id=item.id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not claimed:
+        return None
+    db.execute(insert(PayoutRunPayment).values(item_id=item.id, payment_id=payment.id))
+    return item
+
+
+def pay_out_item(db, gateway, item_id: int) -> dict:
+    """Issue the provider payout for one item and settle its payments.
+
+    The provider call is keyed by the item, so retrying after a timeout or a
+    crash can never pay twice while the key is remembered (``RETRY_WINDOW``).
+    A definitive rejection marks the item failed and releases its payments
+    for a later run; transient errors leave it pending with its claim and are
+    re-raised for the caller to retry. Items older than the window are marked
+    ``needs_review`` with their payments still claimed and are not sent.
+    """
+    item = db.query(
+        PayoutRunItem.id, PayoutRunItem.run_id, PayoutRunItem.solver_id, PayoutRunItem.destination,
+        PayoutRunItem.amount, PayoutRunItem.status, PayoutRunItem.stripe_payout_id, PayoutRunItem.created_at
+    ).filter(PayoutRunItem.id == item_id).first()
+    db.commit()
+    if item is None:
+        raise PaymentProviderError(f"Payout item {item_id} not found")
+    if item.status == "paid":
+        return _item_result(item.stripe_payout_id, "paid", item.amount, None)
+    if item.status != "pending":
+        raise PaymentProviderError(f"Payout item {item.id} is {item.status}")
+    if item.created_at < datetime.utcnow() - RETRY_WINDOW:
+        _expire_items(db, [item.id])
+        db.commit()
+        raise PaymentProviderError(f"Payout item {item.id} is no longer retryable; reconcile it with the provider")
+
+    try:
+        payout = gateway.create_payout(
+            amount_cents=int(item.amount * 100),
+            currency="usd",
+            destination=item.destination,
+            metadata={"payout_item_id": item.id, "payout_run_id": item.run_id, "solver_id": item.solver_id},
+            idempotency_key=f"payout-item-{item.id}",
+        )
+    except PaymentProviderError as e:
+        if not e.retryable:
+            _fail_item(db, item.id, str(e))
+            db.commit()
+        raise
+
+    now = datetime.utcnow()
+    db.execute(
+        update(PayoutRunItem)
+        .where(PayoutRunItem.id == item.id)
+        .values(status="paid", stripe_payout_id=payout["id"], error=None, updated_at=now)
+    )
+    paid = db.execute(
+        update(ProjectPayment)
+        .where(ProjectPayment.payout_item_id == item.id, ProjectPayment.status == "released")
+        .values(status="paid", stripe_payout_id=payout["id"], paid_at=now)
+        .returning(ProjectPayment.id, ProjectPayment.solver_id, ProjectPayment.amount)
+    ).all()
+    record_transitions(db, [(row.id, row.solver_id, row.amount, "released", "paid") for row in paid])
+    db.commit()
+    return _item_result(payout["id"], payout["status"], item.amount, payout["arrival_date"])
+
+
+def _item_result(payout_id, payout_status, amount, arrival_date) -> dict:
+    return {
+        "payout_id": payout_id,
+        "status": payout_status,
+        "amount": str(amount),
+        "arrival_date": datetime.utcfromtimestamp(arrival_date).isoformat() if arrival_date else None,
+    }
+
+
+def _fail_item(db, item_id: int, error: str) -> None:
+    """Mark an item failed and hand its payments back to the pool of released ones."""
+    db.execute(
+        update(PayoutRunItem)
+        .where(PayoutRunItem.id == item_id)
+        .values(status="failed", error=error, updated_at=datetime.utcnow())
+    )
+    db.execute(
+        update(ProjectPayment)
+        .where(ProjectPayment.payout_item_id == item_id)
+        .values(payout_item_id=None)
+    )
+
+
+def _expire_items(db, item_ids) -> int:
+    """Flag pending items past the idempotency window for manual reconciliation.
+
+    Their payments stay claimed: whether the provider paid them is unknown.
+    """
+    return db.execute(
+        update(PayoutRunItem)
+        .where(
+            PayoutRunItem.id.in_(item_ids),
+            PayoutRunItem.status == "pending",
+            PayoutRunItem.created_at < datetime.utcnow() - RETRY_WINDOW
+        )
+        .values(
+            status="needs_review",
+            error="Idempotency window expired; check the provider before paying again",
+            updated_at=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def _group_released_payments(db, run_id: int) -> None:
+    """Claim every unclaimed released payment into one item per solver and destination."""
+    now = datetime.utcnow()
+    db.execute(
+        insert(PayoutRunItem).from_select(
+            ["run_id", "solver_id", "destination", "amount", "payment_count", "status", "created_at", "updated_at"],
+            select(
+                literal(run_id), ProjectPayment.solver_id, User.stripe_account_id,
+                literal(0), literal(0), literal("pending"), literal(now), literal(now)
+            ).join(
+                User, User.id == ProjectPayment.solver_id
+            ).where(
+                ProjectPayment.status == "released",
+                ProjectPayment.payout_item_id.is_(None),
+                User.stripe_account_id.isnot(None)
+            ).group_by(ProjectPayment.solver_id, User.stripe_account_id)
+        )
+    )
+
+    # Claim in one statement; payments released since the insert are picked up
+    # too, which is why totals are computed from the claimed rows afterwards
+    db.execute(
+        update(ProjectPayment)
+        .where(
+            ProjectPayment.solver_id == PayoutRunItem.solver_id,
+            PayoutRunItem.run_id == run_id,
+            User.id == ProjectPayment.solver_id,
+            User.stripe_account_id == PayoutRunItem.destination,
+            ProjectPayment.status == "released",
+            ProjectPayment.payout_item_id.is_(None)
+        )
+        .values(payout_item_id=PayoutRunItem.id)
+        .execution_options(synchronize_session=False)
+    )
+
+    totals = select(
+        ProjectPayment.payout_item_id.label("item_id"),
+        func.sum(ProjectPayment.amount).label("amount"),
+        func.count().label("payment_count")
+    ).join(
+        PayoutRunItem, PayoutRunItem.id == ProjectPayment.payout_item_id
+    ).where(PayoutRunItem.run_id == run_id).group_by(ProjectPayment.payout_item_id).subquery()
+    db.execute(
+        update(PayoutRunItem)
+        .where(PayoutRunItem.id == totals.c.item_id)
+        .values(amount=totals.c.amount, payment_count=totals.c.payment_count)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        delete(PayoutRunItem)
+        .where(PayoutRunItem.run_id == run_id, PayoutRunItem.payment_count == 0)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        insert(PayoutRunPayment).from_select(
+            ["item_id", "payment_id"],
+            select(ProjectPayment.payout_item_id, ProjectPayment.id).join(
+                PayoutRunItem, PayoutRunItem.id == ProjectPayment.payout_item_id
+            ).where(PayoutRunItem.run_id == run_id)
+        )
+    )
+
+
+@job
+def run_payouts() -> Optional[dict]:
+    """Pay out all released payments, one provider payout per solver and destination.
+
+    Grouping and claiming are a handful of set-based statements regardless of
+    how many payments are released. Pending items left by earlier runs (or by
+    single-payment payouts whose retries ran out) are retried with their
+    original idempotency keys while the provider still remembers them, and
+    flagged ``needs_review`` after that. Stops early, leaving the remaining
+    items pending, if the provider's circuit opens. An unexpected error marks
+    the run failed. Returns the run summary, or ``None`` when another run
+    holds the lock.
+    """
+    db = SessionLocal()
+    try:
+        # Session-level lock: held across the run's many transactions
+        if not db.execute(select(func.pg_try_advisory_lock(RUN_LOCK_KEY))).scalar():
+            db.rollback()
+            return None
+        try:
+            return _run_payouts(db)
+        except Exception as e:
+            db.rollback()
+            # Only one run holds the lock, so any run still "running" is ours
+            # (or was left by a crashed process)
+            db.execute(
+                update(PayoutRun)
+                .where(PayoutRun.status == "running")
+                .values(status="failed", error=f"Aborted: {e}", finished_at=datetime.utcnow())
+            )
+            db.commit()
+            raise
+        finally:
+            db.rollback()
+            db.execute(select(func.pg_advisory_unlock(RUN_LOCK_KEY)))
+            db.commit()
+    finally:
+        db.close()
+
+
+def _run_payouts(db) -> dict:
+    run = PayoutRun(status="running", started_at=datetime.utcnow())
+    db.add(run)
+    db.flush()
+    run_id = run.id
+    _group_released_payments(db, run_id)
+    db.commit()
+
+    now = datetime.utcnow()
+    expired = [item_id for (item_id,) in db.query(PayoutRunItem.id).filter(
+        PayoutRunItem.status == "pending",
+        PayoutRunItem.created_at < now - RETRY_WINDOW
+    )]
+    if expired:
+        logger.warning("Payout items %s need manual reconciliation", expired)
+        _expire_items(db, expired)
+    item_ids = [item_id for (item_id,) in db.query(PayoutRunItem.id).filter(
+        PayoutRunItem.status == "pending",
+        PayoutRunItem.created_at >= now - RETRY_WINDOW,
+        or_(PayoutRunItem.run_id == run_id, PayoutRunItem.updated_at < now - STALE_ITEM_AGE)
+    ).order_by(PayoutRunItem.id)]
+    db.commit()
+
+    gateway = get_payment_gateway()
+    paid = failed = 0
+    error = None
+    for item_id in item_ids:
+        try:
+            pay_out_item(db, gateway, item_id)
+            paid += 1
+        except PaymentProviderError as e:
+            db.rollback()
+            failed += 1
+            logger.warning("Payout item %s failed: %s", item_id, e)
+            if e.retryable:
+                # Leave it pending; touch it so it is not picked up as stale at once
+                db.execute(
+                    update(PayoutRunItem)
+                    .where(PayoutRunItem.id == item_id)
+                    .values(error=str(e), updated_at=datetime.utcnow())
+                )
+                db.commit()
+            if gateway.breaker.state != "closed":
+                error = "Stopped early: payment provider circuit open"
+                break
+
+    summary = db.query(
+        func.count(PayoutRunItem.id),
+        func.coalesce(func.sum(PayoutRunItem.payment_count), 0),
+        func.coalesce(func.sum(PayoutRunItem.amount), 0)
+    ).filter(PayoutRunItem.run_id == run_id, PayoutRunItem.status == "paid").one()
+
+    run = db.query(PayoutRun).filter(PayoutRun.id == run_id).one()
+    run.payout_count, run.payment_count, run.total_amount = summary
+    run.failed_count = failed
+    run.error = error
+    run.status = "completed" if not failed and error is None else ("failed" if not paid else "partial")
+    run.finished_at = datetime.utcnow()
+    db.commit()
+
+    return {
+        "run_id": run_id,
+        "status": run.status,
+        "payouts": paid,
+        "failed": failed,
+        "payments_paid": run.payment_count,
+        "total_amount": str(run.total_amount),
+    }
@@ -0,0 +1,270 @@
+import fcntl
+import hashlib
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator
+
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from ..core.config import settings
+from ..core.database import release_connection
+from ..models.task import Task, UploadSession
+from .uploads import StoredUpload, UploadTooLarge
+
+
+class UploadOffsetMismatch(Exception):
+    """Raised when a chunk does not start at the session's current offset."""
+
+    def __init__(self, expected: int):
+        super().__init__(f"Chunk must start at offset {expected}")
+        self.expected = expected
+
+
+class UploadBusy(Exception):
+    """Raised when another chunk of the same session is still being written."""
+
+    def __init__(self):
+        super().__init__("Another chunk of this upload is still being written")
+
+
+class UploadExpired(Exception):
+    """Raised when the session's partial file is not on this node (purged, or
+    the request reached another node)."""
+
+    def __init__(self):
+        super().__init__("Upload session expired; start a new upload")
+
+
+class UploadClosed(Exception):
+    """Raised when the session was completed or aborted while a chunk arrived."""
+
+    def __init__(self):
+        super().__init__("Upload is no longer active")
+
+
+def sessions_dir() -> str:
+    return os.path.join(settings.upload_dir, ".sessions")
+
+
+def session_expires_at(session: UploadSession) -> datetime:
+    return session.updated_at + timedelta(hours=settings.upload_session_ttl_hours)
+
+
+def create_upload_session(
+    db: Session,
+    task: Task,
+    problem_solver_id: int,
+    file_name: str,
+    total_size: int,
+) -> UploadSession:
+    """Persist a new upload session and create its empty partial file."""
+    if total_size > settings.max_upload_bytes:
+        raise UploadTooLarge(settings.max_upload_bytes)
+
+    upload_id = uuid.uuid4().hex
+    os.makedirs(sessions_dir(), exist_ok=True)
+    temp_path = os.path.join(sessions_dir(), f"{upload_id}.part")
+    open(temp_path, "wb").close()
+
+    session = UploadSession(
+        id=upload_id,
+        task_id=task.id,
+        problem_solver_id=problem_solver_id,
+        file_name=file_name,
+        total_size=total_size,
+        received_bytes=0,
+        temp_path=temp_path,
+        status="active"
+    )
+    db.add(session)
+    return session
+
+
+def _open_locked(path: str):
+    """Open the partial file holding its exclusive lock (released on close)."""
+    try:
+        out = open(path, "r+b")
+    except FileNotFoundError:
+        raise UploadExpired()
+    try:
+        fcntl.flock(out.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        out.close()
+        raise UploadBusy()
+    return out
+
+
+def _seek_to(out, offset: int) -> None:
+    # Drop bytes from a chunk that was written but never acknowledged
+    out.truncate(offset)
+    out.seek(offset)
+
+
+def _write_chunk(out, chunk: bytes) -> None:
+    out.write(chunk)
+
+
+def _sync(out) -> None:
+    out.flush()
+    os.fsync(out.fileno())
+
+
+def _current_offset(db: Session, upload_id: str) -> int:
+    row = db.query(UploadSession.received_bytes, UploadSession.status).filter(
+        UploadSession.id == upload_id
+    ).first()
+    if row is None or row.status != "active":
+        raise UploadClosed()
+    return row.received_bytes
+
+
+async def append_chunk(
+    db: Session,
+    session: UploadSession,
+    offset: int,
+    chunks: AsyncIterator[bytes],
+) -> int:
+    """Append a PATCH body to the session's partial file and return the new offset.
+
+    No transaction or row lock is held while the body arrives. Writers of one
+    session are serialised by an exclusive lock on the partial file, which is
+    truncated to the committed offset before writing, so a chunk interrupted
+    by a crash is simply resent. The offset is then advanced with a
+    compare-and-set and committed; a stale or duplicate chunk gets
+    ``UploadOffsetMismatch`` instead of overwriting acknowledged bytes.
+    """
+    if offset != session.received_bytes:
+        raise UploadOffsetMismatch(session.received_bytes)
+
+    upload_id, total_size = session.id, session.total_size
+    out = await run_in_threadpool(_open_locked, session.temp_path)
+    try:
+        # Re-read under the file lock: another chunk may have landed since
+        current = _current_offset(db, upload_id)
+        release_connection(db)
+        if current != offset:
+            raise UploadOffsetMismatch(current)
+
+        await run_in_threadpool(_seek_to, out, offset)
+        received = offset
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            received += len(chunk)
+            if received > total_size:
+                raise UploadTooLarge(total_size)
+            await run_in_threadpool(_write_chunk, out, chunk)
+        await run_in_threadpool(_sync, out)
+
+        advanced = db.execute(
+            update(UploadSession)
+            .where(
+                UploadSession.id == upload_id,
+                UploadSession.received_bytes == offset,
+                UploadSession.status == "active"
+            )
+            .values(received_bytes=received)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not advanced:
+            db.rollback()
+            raise UploadOffsetMismatch(_current_offset(db, upload_id))
+        db.commit()
+    finally:
+        await run_in_threadpool(out.close)
+
+    return received
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        raise UploadExpired()
+    with f:
+        for chunk in iter(lambda: f.read(settings.upload_chunk_bytes), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def finalize_upload(session: UploadSession) -> StoredUpload:
+    """Hash a fully received partial file; the caller ingests it into the blob store."""
+    sha256 = await run_in_threadpool(_hash_file, session.temp_path)
+    return StoredUpload(path=session.temp_path, size=session.received_bytes, sha256=sha256)
+
+
+def reopen_upload(db: Session, upload_id: str) -> None:
+    """Return a session whose finalize failed to ``active`` so it can be retried."""
+    db.rollback()
+    db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == upload_id, UploadSession.status == "completing")
+        .values(status="active")
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def purge_abandoned_sessions(db: Session, now: datetime = None) -> dict:
+    """Delete expired active (or stuck completing) sessions, completed sessions
+    past their retention and partial files with no session row.
+
+    Returns counts and the number of bytes reclaimed.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(hours=settings.upload_session_ttl_hours)
+
+    expired = db.query(UploadSession).filter(
+        UploadSession.status.in_(["active", "completing"]),
+        UploadSession.updated_at < cutoff
+    ).all()
+
+    reclaimed = 0
+    for session in expired:
+        if os.path.exists(session.temp_path):
+            reclaimed += os.path.getsize(session.temp_path)
+            os.unlink(session.temp_path)
+        db.delete(session)
+    db.commit()
+
+    # A completed session's file already lives in the blob store
+    completed = db.execute(
+        delete(UploadSession)
+        .where(
+            UploadSession.status == "completed",
+            UploadSession.updated_at < now - timedelta(hours=settings.completed_upload_retention_hours)
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+
+    # Partial files left behind by a crash between file creation and commit
+    stray = 0
+    directory = sessions_dir()
+    if os.path.isdir(directory):
+        known = {
+            os.path.basename(path)
+            for (path,) in db.query(UploadSession.temp_path).filter(
+                UploadSession.status.in_(["active", "completing"])
+            )
+        }
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name in known or not os.path.isfile(path):
+                continue
+            if datetime.utcfromtimestamp(os.path.getmtime(path)) >= cutoff:
+                continue
+            reclaimed += os.path.getsize(path)
+            os.unlink(path)
+            stray += 1
+
+    return {
+        "expired_sessions": len(expired),
+        "completed_sessions": completed,
+        "stray_files": stray,
+        "reclaimed_bytes": reclaimed,
+    }
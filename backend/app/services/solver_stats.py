@@ -0,0 +1,215 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Tuple
+
+from sqlalchemy import delete, event, func, insert, inspect, literal, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..models.project import Project, ProjectCategory, ProjectRequest, ProjectStatus
+from ..models.stats import SolverCategoryStats, SolverStats
+
+COUNTERS = ("applications", "accepted", "active", "completed")
+ACTIVE_STATUSES = (ProjectStatus.ASSIGNED, ProjectStatus.IN_PROGRESS)
+
+# (solver_id, category, {counter: delta})
+Delta = Tuple[int, ProjectCategory, dict]
+
+
+def record_deltas(db, deltas: Iterable[Delta]) -> None:
+    """Apply counter changes to the per-category and overall solver stats.
+
+    Runs in the caller's transaction, with a Session or a Connection.
+    """
+    by_category = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for solver_id, category, changes in deltas:
+        if solver_id is None:
+            continue
+        counters = by_category[(solver_id, ProjectCategory(category))]
+        for counter, change in changes.items():
+            counters[counter] += change
+    by_category = {key: counters for key, counters in by_category.items() if any(counters.values())}
+    if not by_category:
+        return
+
+    by_solver = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for (solver_id, _), counters in by_category.items():
+        for counter, change in counters.items():
+            by_solver[solver_id][counter] += change
+
+    # Keys in a fixed order so concurrent writers lock stats rows consistently
+    now = datetime.utcnow()
+    _upsert(db, SolverCategoryStats, [SolverCategoryStats.solver_id, SolverCategoryStats.category], [
+        dict(counters, solver_id=solver_id, category=category, updated_at=now)
+        for (solver_id, category), counters in sorted(by_category.items(), key=lambda item: (item[0][0], item[0][1].value))
+    ])
+    _upsert(db, SolverStats, [SolverStats.solver_id], [
+        dict(counters, solver_id=solver_id, updated_at=now)
+        for solver_id, counters in sorted(by_solver.items())
+    ])
+
+
+def _upsert(db, model, keys: list, rows: list) -> None:
+    stmt = pg_insert(model).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_=dict(
+            {counter: getattr(model, counter) + stmt.excluded[counter] for counter in COUNTERS},
+            updated_at=stmt.excluded.updated_at,
+        )
+    ))
+
+
+def _state(instance, attrs: tuple, current: bool) -> tuple:
+    """Attribute values as flushed (current) or as loaded (not current)."""
+    state = inspect(instance)
+    values = []
+    for attr in attrs:
+        history = state.attrs[attr].history
+        if current:
+            value = history.added[0] if history.added else (history.unchanged or [getattr(instance, attr)])[0]
+        else:
+            value = history.deleted[0] if history.deleted else (history.unchanged or [getattr(instance, attr)])[0]
+        values.append(value)
+    return tuple(values)
+
+
+def _project_counters(status) -> dict:
+    status = ProjectStatus(status)
+    return {"active": int(status in ACTIVE_STATUSES), "completed": int(status == ProjectStatus.COMPLETED)}
+
+
+def _request_counters(status) -> dict:
+    return {"applications": 1, "accepted": int(status == "accepted")}
+
+
+def _negate(counters: dict) -> dict:
+    return {counter: -change for counter, change in counters.items()}
+
+
+@event.listens_for(Session, "after_flush")
+def _record_orm_changes(session, flush_context):
+    """Turn flushed project and application changes into solver stats deltas.
+
+    Each row's contribution before the flush is subtracted and its
+    contribution after is added. Bulk statements that bypass the ORM call
+    ``record_deltas`` themselves.
+    """
+    deltas = []
+    categories = {}
+    request_changes = []  # (sign, solver_id, project_id, status)
+
+    for instance in session.new:
+        if isinstance(instance, Project):
+            solver_id, status, category = _state(instance, ("assigned_solver_id", "status", "category"), True)
+            categories[instance.id] = category
+            deltas.append((solver_id, category, _project_counters(status)))
+        elif isinstance(instance, ProjectRequest):
+            request_changes.append((1,) + _state(instance, ("problem_solver_id", "project_id", "status"), True))
+
+    for instance in session.deleted:
+        if isinstance(instance, Project):
+            solver_id, status, category = _state(instance, ("assigned_solver_id", "status", "category"), False)
+            categories[instance.id] = category
+            deltas.append((solver_id, category, _negate(_project_counters(status))))
+        elif isinstance(instance, ProjectRequest):
+            request_changes.append((-1,) + _state(instance, ("problem_solver_id", "project_id", "status"), False))
+
+    for instance in session.dirty:
+        if isinstance(instance, Project) and session.is_modified(instance):
+            old = _state(instance, ("assigned_solver_id", "status", "category"), False)
+            new = _state(instance, ("assigned_solver_id", "status", "category"), True)
+            categories[instance.id] = new[2]
+            if old != new:
+                deltas.append((old[0], old[2], _negate(_project_counters(old[1]))))
+                deltas.append((new[0], new[2], _project_counters(new[1])))
+            if old[2] != new[2]:
+                deltas.extend(_move_requests(session.connection(), instance.id, old[2], new[2]))
+        elif isinstance(instance, ProjectRequest) and session.is_modified(instance):
+            old = _state(instance, ("problem_solver_id", "project_id", "status"), False)
+            new = _state(instance, ("problem_solver_id", "project_id", "status"), True)
+            if old != new:
+                request_changes.append((-1,) + old)
+                request_changes.append((1,) + new)
+
+    if request_changes:
+        missing = {project_id for _, _, project_id, _ in request_changes} - set(categories)
+        if missing:
+            categories.update(session.connection().execute(
+                select(Project.id, Project.category).where(Project.id.in_(missing))
+            ).all())
+        for sign, solver_id, project_id, status in request_changes:
+            if project_id in categories:
+                counters = _request_counters(status)
+                deltas.append((solver_id, categories[project_id], counters if sign > 0 else _negate(counters)))
+
+    if deltas:
+        record_deltas(session.connection(), deltas)
+
+
+def _move_requests(connection, project_id: int, old_category, new_category) -> list:
+    """Deltas moving a recategorised project's applications to its new category."""
+    deltas = []
+    rows = connection.execute(
+        select(
+            ProjectRequest.problem_solver_id,
+            func.count(),
+            func.count().filter(ProjectRequest.status == "accepted")
+        ).where(ProjectRequest.project_id == project_id).group_by(ProjectRequest.problem_solver_id)
+    ).all()
+    for solver_id, applications, accepted in rows:
+        counters = {"applications": applications, "accepted": accepted}
+        deltas.append((solver_id, old_category, _negate(counters)))
+        deltas.append((solver_id, new_category, counters))
+    return deltas
+
+
+def rebuild_solver_stats(db) -> int:
+    """Recompute every solver's stats from project_requests and projects.
+
+    Application and project writes are blocked for the duration. Returns the
+    number of solvers with stats; the caller commits.
+    """
+    db.execute(text("LOCK TABLE project_requests, projects IN SHARE MODE"))
+    db.execute(text("LOCK TABLE solver_stats, solver_category_stats IN EXCLUSIVE MODE"))
+
+    requests = select(
+        ProjectRequest.problem_solver_id.label("solver_id"),
+        Project.category.label("category"),
+        func.count().label("applications"),
+        func.count().filter(ProjectRequest.status == "accepted").label("accepted"),
+        literal(0).label("active"),
+        literal(0).label("completed"),
+    ).join(Project, Project.id == ProjectRequest.project_id).group_by(
+        ProjectRequest.problem_solver_id, Project.category
+    )
+    projects = select(
+        Project.assigned_solver_id.label("solver_id"),
+        Project.category.label("category"),
+        literal(0).label("applications"),
+        literal(0).label("accepted"),
+        func.count().filter(Project.status.in_(ACTIVE_STATUSES)).label("active"),
+        func.count().filter(Project.status == ProjectStatus.COMPLETED).label("completed"),
+    ).where(Project.assigned_solver_id.isnot(None)).group_by(Project.assigned_solver_id, Project.category)
+    combined = union_all(requests, projects).subquery()
+
+    now = datetime.utcnow()
+    db.execute(delete(SolverCategoryStats))
+    db.execute(delete(SolverStats))
+    db.execute(insert(SolverCategoryStats).from_select(
+        ["solver_id", "category"] + list(COUNTERS) + ["updated_at"],
+        select(
+            combined.c.solver_id, combined.c.category,
+            *[func.sum(combined.c[counter]) for counter in COUNTERS],
+            literal(now)
+        ).group_by(combined.c.solver_id, combined.c.category)
+    ))
+    return db.execute(insert(SolverStats).from_select(
+        ["solver_id"] + list(COUNTERS) + ["updated_at"],
+        select(
+            SolverCategoryStats.solver_id,
+            *[func.sum(getattr(SolverCategoryStats, counter)) for counter in COUNTERS],
+            literal(now)
+        ).group_by(SolverCategoryStats.solver_id)
+    )).rowcount
+
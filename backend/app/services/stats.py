@@ -0,0 +1,171 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core.jobs import enqueue, enqueue_in, job
+from ..models.project import Project, ProjectPayment, ProjectStatus
+from ..models.stats import StatsSnapshot
+from ..models.user import User, UserRole
+
+SYSTEM_STATS = "system"
+
+# Changes to these invalidate the system stats snapshot
+_TRACKED = (User, Project, ProjectPayment)
+
+_schedule_lock = threading.Lock()
+_last_scheduled = None
+
+
+def compute_system_stats(db) -> dict:
+    """Dashboard figures with one aggregate query per table."""
+    users = db.execute(select(
+        func.count(),
+        func.count().filter(User.is_active.is_(True)),
+        func.count().filter(User.role == UserRole.BUYER),
+        func.count().filter(User.role == UserRole.PROBLEM_SOLVER),
+        func.count().filter(User.role == UserRole.ADMIN),
+    ).select_from(User)).one()
+
+    projects = db.execute(select(
+        func.count(),
+        func.count().filter(Project.status == ProjectStatus.OPEN),
+        func.count().filter(Project.status.in_([ProjectStatus.ASSIGNED, ProjectStatus.IN_PROGRESS])),
+        func.count().filter(Project.status == ProjectStatus.COMPLETED),
+    ).select_from(Project)).one()
+
+    payments = db.execute(select(
+        func.count(),
+        func.count().filter(ProjectPayment.status == "pending"),
+        func.count().filter(ProjectPayment.status == "released"),
+        func.coalesce(func.sum(ProjectPayment.amount), 0),
+        func.coalesce(func.sum(ProjectPayment.amount).filter(ProjectPayment.status == "released"), 0),
+    ).select_from(ProjectPayment)).one()
+
+    return {
+        "users": {
+            "total": users[0],
+            "active": users[1],
+            "buyers": users[2],
+            "solvers": users[3],
+            "admins": users[4]
+        },
+        "projects": {
+            "total": projects[0],
+            "open": projects[1],
+            "in_progress": projects[2],
+            "completed": projects[3]
+        },
+        "payments": {
+            "total": payments[0],
+            "pending": payments[1],
+            "released": payments[2],
+            "total_amount": float(payments[3]),
+            "released_amount": float(payments[4])
+        }
+    }
+
+
+def store_snapshot(db, name: str, payload: dict, computed_at: datetime) -> None:
+    """Insert or replace the snapshot ``name``; the caller commits."""
+    stmt = pg_insert(StatsSnapshot).values(name=name, payload=payload, computed_at=computed_at)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[StatsSnapshot.name],
+        set_={"payload": stmt.excluded.payload, "computed_at": stmt.excluded.computed_at, "refresh_requested_at": None}
+    ))
+
+
+@job
+def refresh_system_stats() -> None:
+    """Recompute the system stats snapshot."""
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        store_snapshot(db, SYSTEM_STATS, compute_system_stats(db), now)
+        db.commit()
+    finally:
+        db.close()
+
+
+def get_system_stats(db, refresh: bool = False) -> dict:
+    """System stats from the snapshot, with ``generated_at`` and ``stale_after``.
+
+    A snapshot past ``stale_after`` is still served while one background
+    refresh is queued for it (stale-while-revalidate). Only a missing
+    snapshot or ``refresh=True`` computes the figures in the request.
+    """
+    now = datetime.utcnow()
+    ttl = timedelta(seconds=settings.admin_stats_ttl_seconds)
+    snapshot = None if refresh else db.query(
+        StatsSnapshot.payload, StatsSnapshot.computed_at
+    ).filter(StatsSnapshot.name == SYSTEM_STATS).first()
+
+    if snapshot is None:
+        payload, computed_at = compute_system_stats(db), now
+        store_snapshot(db, SYSTEM_STATS, payload, computed_at)
+        db.commit()
+    else:
+        payload, computed_at = snapshot
+        if computed_at + ttl <= now:
+            request_refresh(db, SYSTEM_STATS, now, ttl, refresh_system_stats)
+
+    return dict(payload, generated_at=computed_at, stale_after=computed_at + ttl)
+
+
+def request_refresh(db, name: str, now: datetime, ttl: timedelta, refresh_job) -> bool:
+    """Queue ``refresh_job`` for the stale snapshot ``name`` unless one is queued.
+
+    Only the first request to see the snapshot stale queues a refresh; a lost
+    job is retried once its request is itself older than ``ttl``. Commits.
+    """
+    requested = db.execute(
+        update(StatsSnapshot)
+        .where(
+            StatsSnapshot.name == name,
+            (StatsSnapshot.refresh_requested_at.is_(None)) | (StatsSnapshot.refresh_requested_at < now - ttl)
+        )
+        .values(refresh_requested_at=now)
+        .returning(StatsSnapshot.name)
+    ).first()
+    db.commit()
+    if requested is not None:
+        enqueue(refresh_job)
+    return requested is not None
+
+
+def schedule_refresh() -> None:
+    """Refresh soon after a change, at most once per debounce window per process."""
+    global _last_scheduled
+    delay = settings.admin_stats_debounce_seconds
+    with _schedule_lock:
+        if _last_scheduled is not None and time.monotonic() - _last_scheduled < delay:
+            return
+        _last_scheduled = time.monotonic()
+    enqueue_in(delay, refresh_system_stats)
+
+
+@event.listens_for(Session, "after_flush")
+def _note_tracked_changes(session, flush_context):
+    if session.info.get("stats_changed"):
+        return
+    for instances in (session.new, session.dirty, session.deleted):
+        if any(isinstance(instance, _TRACKED) for instance in instances):
+            session.info["stats_changed"] = True
+            return
+
+
+@event.listens_for(Session, "after_commit")
+def _refresh_after_change(session):
+    # Bulk statements bypass the ORM; the TTL bounds how stale those leave it
+    if session.info.pop("stats_changed", False):
+        schedule_refresh()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("stats_changed", None)
@@ -0,0 +1,65 @@
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from ..models.task import Task, TaskStatus, Submission, SubmissionStatus
+from .uploads import StoredUpload
+
+
+def record_submission(
+    db: Session,
+    task: Task,
+    problem_solver_id: int,
+    file_name: str,
+    stored: StoredUpload,
+) -> Submission:
+    """Add a pending submission for a stored file and mark the task submitted.
+
+    The version is assigned by the INSERT itself (next after the task's latest)
+    and guarded by a unique (task_id, version) constraint. The task row is
+    locked first, so concurrent submits for one task take turns instead of
+    computing the same version. The caller commits.
+    """
+    db.execute(select(Task.id).where(Task.id == task.id).with_for_update())
+    next_version = select(
+        func.coalesce(func.max(Submission.version), 0) + 1
+    ).where(Submission.task_id == task.id).scalar_subquery()
+
+    submission = Submission(
+        task_id=task.id,
+        version=next_version,
+        problem_solver_id=problem_solver_id,
+        file_path=stored.path,
+        file_name=file_name,
+        file_size=stored.size,
+        file_sha256=stored.sha256,
+        status=SubmissionStatus.PENDING
+    )
+
+    task.status = TaskStatus.SUBMITTED
+
+    db.add(submission)
+    return submission
+
+
+def backfill_versions(db: Session) -> int:
+    """Number pre-versioning submissions per task by submission time.
+
+    Only tasks with no versioned submissions are touched. Returns the number of
+    rows updated; the caller commits.
+    """
+    versioned_tasks = select(Submission.task_id).where(Submission.version.isnot(None))
+    numbered = select(
+        Submission.id,
+        func.row_number().over(
+            partition_by=Submission.task_id,
+            order_by=(Submission.submitted_at, Submission.id)
+        ).label("version")
+    ).where(Submission.task_id.notin_(versioned_tasks)).subquery()
+
+    result = db.execute(
+        update(Submission)
+        .where(Submission.id == numbered.c.id)
+        .values(version=numbered.c.version)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
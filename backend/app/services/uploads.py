@@ -0,0 +1,193 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional, Tuple
+
+from fastapi import Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+from ..core.config import settings
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured maximum size."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File exceeds the maximum upload size of {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+class InvalidUpload(Exception):
+    """Raised when an upload body is not the expected multipart file."""
+
+
+@dataclass
+class StoredUpload:
+    """Result of streaming an upload to disk."""
+    path: str
+    size: int
+    sha256: str
+
+
+def _write_chunk(out, chunk: bytes) -> None:
+    out.write(chunk)
+
+
+def _finish(out) -> None:
+    out.flush()
+    os.fsync(out.fileno())
+
+
+async def stream_to_disk(
+    chunks: AsyncIterator[bytes],
+    dest_path: str,
+    max_bytes: int = None,
+) -> StoredUpload:
+    """Write an async stream of bytes to ``dest_path``, hashing as it goes.
+
+    Only one chunk is held in memory at a time. Writes run in the threadpool
+    so the event loop is never blocked on disk I/O. Data goes to a temp file in
+    the destination directory that is atomically renamed once complete, so a
+    failed or oversized upload never leaves a partial file behind. Reading
+    stops as soon as ``max_bytes`` is exceeded.
+    """
+    max_bytes = max_bytes or settings.max_upload_bytes
+
+    directory = os.path.dirname(dest_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                await run_in_threadpool(_write_chunk, out, chunk)
+            await run_in_threadpool(_finish, out)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    return StoredUpload(path=dest_path, size=size, sha256=digest.hexdigest())
+
+
+# Allowance for multipart boundaries and part headers around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class _FilePart:
+    """python-multipart callbacks that pick one file field out of the body."""
+
+    def __init__(self, field: str):
+        self.field = field
+        self.filename: Optional[str] = None
+        self.data = []
+        self._in_file = False
+        self._disposition = b""
+        self._header_name = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        self._in_file = (
+            self.filename is None
+            and options.get(b"name") == self.field.encode()
+            and b"filename" in options
+        )
+        if self._in_file:
+            self.filename = os.path.basename(options[b"filename"].decode("utf-8", "replace"))
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._in_file:
+            self.data.append(data[start:end])
+
+    def on_part_end(self) -> None:
+        self._in_file = False
+
+    def take(self) -> list:
+        data, self.data = self.data, []
+        return data
+
+
+async def stream_multipart_file_to_disk(
+    request: Request,
+    field: str,
+    dest_path: str,
+    max_bytes: int = None,
+    suffix: Optional[str] = None,
+) -> Tuple[str, StoredUpload]:
+    """Stream one file field of a multipart request body straight to disk.
+
+    Replaces an ``UploadFile`` parameter, which Starlette spools in full
+    before the handler runs. A ``Content-Length`` over the limit is rejected
+    before any of the body is read; otherwise the body is parsed as it
+    arrives and reading stops at the limit, so neither memory nor disk use
+    exceeds ``max_bytes``. ``suffix`` is checked as soon as the part headers
+    arrive. Returns the client's file name and the stored file.
+    """
+    max_bytes = max_bytes or settings.max_upload_bytes
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD:
+        raise UploadTooLarge(max_bytes)
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise InvalidUpload("Expected a multipart/form-data body")
+
+    part = _FilePart(field)
+    parser = MultipartParser(params[b"boundary"], part.callbacks())
+
+    async def file_chunks():
+        async for chunk in request.stream():
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise InvalidUpload(f"Malformed multipart body: {e}")
+            if part.filename is not None and suffix and not part.filename.lower().endswith(suffix):
+                raise InvalidUpload(f"File must be a {suffix} file")
+            for data in part.take():
+                yield data
+        try:
+            parser.finalize()
+        except MultipartParseError as e:
+            raise InvalidUpload(f"Malformed multipart body: {e}")
+
+    stored = await stream_to_disk(file_chunks(), dest_path, max_bytes)
+    if part.filename is None:
+        os.unlink(stored.path)
+        raise InvalidUpload(f"Missing file field '{field}'")
+    return part.filename, stored
@@ -0,0 +1,98 @@
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import or_, update
+
+from ..models.user import User, UserRole
+from .stats import schedule_refresh
+
+# Largest id list a single bulk update accepts
+BULK_MAX_IDS = 10000
+
+
+def _like_pattern(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def user_filters(role: Optional[UserRole] = None, is_active: Optional[bool] = None,
+                 created_from: Optional[datetime] = None, created_to: Optional[datetime] = None,
+                 search: Optional[str] = None) -> List:
+    """WHERE conditions for the admin user directory and its export.
+
+    ``search`` matches a substring of the email or full name, or a name that
+    is merely similar (typos); all three are served by the trigram indexes.
+    """
+    conditions = []
+    if role is not None:
+        conditions.append(User.role == role)
+    if is_active is not None:
+        conditions.append(User.is_active.is_(is_active))
+    if created_from is not None:
+        conditions.append(User.created_at >= created_from)
+    if created_to is not None:
+        conditions.append(User.created_at < created_to)
+    if search:
+        pattern = _like_pattern(search)
+        conditions.append(or_(
+            User.email.ilike(pattern, escape="\\"),
+            User.full_name.ilike(pattern, escape="\\"),
+            User.full_name.op("%")(search)
+        ))
+    return conditions
+
+
+# Columns included in user exports (never the password hash)
+EXPORT_COLUMNS = (
+    User.id, User.email, User.full_name, User.role, User.is_active, User.created_at, User.updated_at
+)
+
+
+def bulk_update_users(db, actor_id: int, role: Optional[UserRole] = None, is_active: Optional[bool] = None,
+                      user_ids: Optional[Iterable[int]] = None, conditions: Iterable = ()) -> List[dict]:
+    """Apply a role and/or activation change with one ``UPDATE ... RETURNING``.
+
+    Targets ``user_ids`` when given, else every user matching ``conditions``.
+    Rows already in the requested state are left alone, the acting admin's
+    own account is never changed, and admins are never deactivated (as with
+    the single-user endpoints). Returns one result per id (for an id list)
+    or per updated user (for a filter); the caller commits.
+    """
+    changes = {}
+    differs = []
+    if role is not None:
+        changes["role"] = role
+        differs.append(User.role != role)
+    if is_active is not None:
+        changes["is_active"] = is_active
+        differs.append(User.is_active.isnot(is_active))
+
+    guards = [User.id != actor_id]
+    if is_active is False:
+        guards.append(User.role != UserRole.ADMIN)
+    scope = [User.id.in_(user_ids)] if user_ids is not None else list(conditions)
+
+    updated = db.execute(
+        update(User)
+        .where(*scope, *guards, or_(*differs))
+        .values(**changes, updated_at=datetime.utcnow())
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    if updated:
+        # Core statements skip the ORM change tracking behind the stats snapshot
+        schedule_refresh()
+
+    results = {user_id: {"id": user_id, "status": "updated"} for user_id in updated}
+    if user_ids is not None:
+        remaining = set(user_ids) - set(updated)
+        for user_id, user_role in db.query(User.id, User.role).filter(User.id.in_(remaining)):
+            if user_id == actor_id:
+                results[user_id] = {"id": user_id, "status": "skipped", "detail": "Cannot change your own account"}
+            elif is_active is False and user_role == UserRole.ADMIN:
+                results[user_id] = {"id": user_id, "status": "skipped", "detail": "Cannot deactivate admin users"}
+            else:
+                results[user_id] = {"id": user_id, "status": "unchanged"}
+        for user_id in remaining - set(results):
+            results[user_id] = {"id": user_id, "status": "not_found", "detail": "User not found"}
+    return [results[user_id] for user_id in sorted(results)]
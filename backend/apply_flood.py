@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Load scenario: a flood of solvers applying to a freshly posted project.
+
+Creates (or reuses) N solver accounts and one new OPEN project, then fires all
+applications at once from a thread pool - every solver applies twice to mimic
+double-clicks - and reports how many rows landed, how many duplicates were
+absorbed by ON CONFLICT, whether queue positions are unique, and latencies.
+
+Usage: python apply_flood.py [solvers] [workers]
+"""
+
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from app.core.database import SessionLocal
+from app.core.security import get_password_hash
+from app.models import User, UserRole, Project, ProjectStatus, ProjectCategory, ProjectRequest
+from app.services.applications import apply_to_project
+
+
+def ensure_solvers(db, count):
+    """Create flood solver accounts that do not exist yet."""
+    emails = [f"flood_solver{i}@test.com" for i in range(count)]
+    existing = {
+        email for (email,) in db.query(User.email).filter(User.email.in_(emails))
+    }
+    hashed = get_password_hash("solver123")
+    db.add_all([
+        User(
+            email=email,
+            full_name=f"Flood Solver {i}",
+            hashed_password=hashed,
+            role=UserRole.PROBLEM_SOLVER,
+            is_active=True
+        )
+        for i, email in enumerate(emails) if email not in existing
+    ])
+    db.commit()
+    return [user_id for (user_id,) in db.query(User.id).filter(User.email.in_(emails))]
+
+
+def post_project(db):
+    """Post a new OPEN project owned by the first buyer."""
+    buyer = db.query(User).filter(User.role == UserRole.BUYER).first()
+    if not buyer:
+        print("No buyer found - run init_db.py first")
+        sys.exit(1)
+
+    project = Project(
+        title=f"Flood target {int(time.time())}",
+        description="Project used by the apply flood load scenario",
+        category=ProjectCategory.OTHER,
+        budget=Decimal("100.00"),
+        status=ProjectStatus.OPEN,
+        buyer_id=buyer.id
+    )
+    db.add(project)
+    db.commit()
+    return project.id
+
+
+def run(solver_count=300, workers=30):
+    db = SessionLocal()
+    try:
+        solver_ids = ensure_solvers(db, solver_count)
+        project_id = post_project(db)
+    finally:
+        db.close()
+
+    # Every solver clicks twice
+    attempts = solver_ids * 2
+    start_gate = threading.Barrier(min(workers, len(attempts)))
+
+    def apply(solver_id):
+        try:
+            start_gate.wait(timeout=5)
+        except threading.BrokenBarrierError:
+            pass
+        session = SessionLocal()
+        started = time.perf_counter()
+        try:
+            applied = apply_to_project(session, project_id, solver_id)
+            queue_position = applied[2] if applied else None
+            session.commit()
+        finally:
+            session.close()
+        return queue_position, time.perf_counter() - started
+
+    print(f"Flooding project {project_id} with {len(attempts)} applications "
+          f"from {len(solver_ids)} solvers ({workers} workers)...")
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(apply, attempts))
+    wall = time.perf_counter() - wall_start
+
+    positions = [pos for pos, _ in results if pos is not None]
+    latencies = sorted(elapsed for _, elapsed in results)
+
+    db = SessionLocal()
+    try:
+        stored = db.query(ProjectRequest).filter(ProjectRequest.project_id == project_id).count()
+    finally:
+        db.close()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"  wall time:          {wall:.3f}s ({len(attempts) / wall:.0f} applies/s)")
+    print(f"  accepted inserts:   {len(positions)}")
+    print(f"  duplicates ignored: {len(attempts) - len(positions)}")
+    print(f"  rows stored:        {stored} (expected {len(solver_ids)})")
+    print(f"  unique positions:   {len(set(positions))}")
+    print(f"  latency p50/p95/p99: {percentile(0.5):.1f} / {percentile(0.95):.1f} / {percentile(0.99):.1f} ms")
+
+    if stored != len(solver_ids):
+        print("✗ Row count mismatch")
+        sys.exit(1)
+    print("✓ Exactly one application per solver")
+
+    if sorted(positions) != list(range(1, len(positions) + 1)):
+        print("✗ Queue positions are duplicated or have gaps")
+        sys.exit(1)
+    print("✓ Queue positions are unique and consecutive")
+
+
+if __name__ == "__main__":
+    solvers = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+    run(solvers, workers)
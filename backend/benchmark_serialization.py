@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+Measure JSON serialization cost of a 100-project marketplace page.
+
+Compares the standard FastAPI path (a model built per row and mutated, then
+re-validated against response_model, dumped to Python and encoded with
+json) with the fast path enabled by FAST_JSON_RESPONSES (one validation
+from the rows and a single pydantic-core dump_json), and json with orjson
+for plain dict responses. No database is needed: rows are in-memory stand-ins
+for ORM objects.
+
+Usage: python benchmark_serialization.py [--rows 100] [--repeat 2000]
+"""
+
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.models.project import ProjectCategory, ProjectStatus
+from app.schemas.project import ProjectMarketplaceResponse
+
+
+def make_rows(count):
+    now = datetime.utcnow()
+    categories = list(ProjectCategory)
+    return [
+        SimpleNamespace(
+            id=i,
+            title=f"Project {i}",
+            description="Build a data pipeline and dashboard for weekly sales reporting. " * 4,
+            budget=Decimal("1500.00") + i,
+            category=categories[i % len(categories)].value,
+            status=ProjectStatus.OPEN,
+            buyer_id=1000 + i % 37,
+            assigned_solver_id=None,
+            created_at=now - timedelta(hours=i),
+            updated_at=now - timedelta(minutes=i),
+            pending_applications=0,
+            applications_count=i % 9,
+            buyer_name=f"Buyer {i % 37}",
+            completed_percentage=0.0,
+        )
+        for i in range(count)
+    ]
+
+
+def standard_path(rows, adapter):
+    # What browse_projects used to do, then what FastAPI does with the result
+    models = []
+    for row in rows:
+        model = ProjectMarketplaceResponse.model_validate(row, from_attributes=True)
+        model.applications_count = row.applications_count
+        model.buyer_name = row.buyer_name
+        models.append(model)
+    dumped = [model.model_dump() for model in models]
+    validated = adapter.validate_python(dumped)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(rows, adapter):
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def report(name, seconds, repeat, baseline=None):
+    per_page = seconds / repeat * 1e6
+    speedup = f"  ({baseline / per_page:.1f}x)" if baseline else ""
+    print(f"  {name:<38} {per_page:9.1f} µs/page{speedup}")
+    return per_page
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100, help="Projects per page")
+    parser.add_argument("--repeat", type=int, default=2000, help="Pages serialized per measurement")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    adapter = TypeAdapter(List[ProjectMarketplaceResponse])
+
+    standard = standard_path(rows, adapter)
+    fast = fast_path(rows, adapter)
+    if json.loads(standard) != json.loads(fast):
+        print("✗ Fast path output differs from the standard path")
+        raise SystemExit(1)
+    print(f"✓ Both paths produce the same {len(fast)}-byte page of {args.rows} projects\n")
+
+    print("Response model routes:")
+    baseline = report("standard (per-row model + revalidate)",
+                      timeit.timeit(lambda: standard_path(rows, adapter), number=args.repeat), args.repeat)
+    report("fast (validate once + dump_json)",
+           timeit.timeit(lambda: fast_path(rows, adapter), number=args.repeat), args.repeat, baseline)
+
+    print("\nDict routes (default response class):")
+    content = json.loads(fast)
+    baseline = report("json.dumps",
+                      timeit.timeit(lambda: json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+                                    number=args.repeat), args.repeat)
+    try:
+        import orjson
+    except ImportError:
+        print("  orjson not installed; skipped")
+    else:
+        report("orjson.dumps",
+               timeit.timeit(lambda: orjson.dumps(content), number=args.repeat), args.repeat, baseline)
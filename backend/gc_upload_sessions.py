@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+"""
+Garbage-collect abandoned resumable uploads.
+
+Removes active upload sessions that have not received a chunk within
+UPLOAD_SESSION_TTL_HOURS, together with their partial files, completed
+sessions older than COMPLETED_UPLOAD_RETENTION_HOURS, and any stray
+partial files without a session. Safe to run from cron on any node.
+"""
+
+from app.core.database import SessionLocal
+from app.services.resumable import purge_abandoned_sessions
+
+
+if __name__ == '__main__':
+    db = SessionLocal()
+    try:
+        result = purge_abandoned_sessions(db)
+    finally:
+        db.close()
+    print(f"Expired sessions removed: {result['expired_sessions']}")
+    print(f"Completed sessions removed: {result['completed_sessions']}")
+    print(f"Stray partial files removed: {result['stray_files']}")
+    print(f"Bytes reclaimed: {result['reclaimed_bytes']}")
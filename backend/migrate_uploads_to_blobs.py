@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Move legacy submission files into the content-addressed blob store.
+
+Hashes every file under UPLOAD_DIR that a submission still points at directly
+(uploads/task_{task_id}_{filename}), moves it into the blob store of the
+configured storage backend - or drops it when identical content is already
+stored - takes one blob reference per submission and repoints the submissions
+at the blob. Also numbers pre-existing submissions as versions per task.
+
+Usage: python migrate_uploads_to_blobs.py [--dry-run]
+"""
+
+import hashlib
+import os
+import sys
+from collections import defaultdict
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models import Submission
+from app.services.blobs import blob_key, ingest_blob
+from app.services.submissions import backfill_versions
+from app.services.uploads import StoredUpload
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(settings.upload_chunk_bytes), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def migrate(dry_run=False):
+    db = SessionLocal()
+
+    try:
+        legacy = defaultdict(list)
+        for submission in db.query(Submission).all():
+            is_blob = submission.file_sha256 and submission.file_path == blob_key(submission.file_sha256)
+            if not is_blob:
+                legacy[submission.file_path].append(submission)
+
+        print(f"{sum(len(s) for s in legacy.values())} submissions reference "
+              f"{len(legacy)} legacy files")
+
+        seen = {}
+        missing = 0
+        saved_bytes = 0
+
+        for path, submissions in legacy.items():
+            if not os.path.isfile(path):
+                print(f"  ✗ missing: {path} (submissions {[s.id for s in submissions]})")
+                missing += 1
+                continue
+
+            size = os.path.getsize(path)
+            sha256 = hash_file(path)
+            if sha256 in seen:
+                saved_bytes += size
+                print(f"  = duplicate of {seen[sha256]}: {path}")
+            else:
+                seen[sha256] = path
+
+            if dry_run:
+                continue
+
+            stored = ingest_blob(db, StoredUpload(path=path, size=size, sha256=sha256), refs=len(submissions))
+            for submission in submissions:
+                submission.file_path = stored.path
+                submission.file_sha256 = sha256
+                submission.file_size = size
+            db.commit()
+
+        # Files no submission points at are left for the lifecycle job
+        referenced = {os.path.abspath(p) for p in legacy}
+        orphans = [
+            name for name in os.listdir(settings.upload_dir)
+            if os.path.isfile(os.path.join(settings.upload_dir, name))
+            and os.path.abspath(os.path.join(settings.upload_dir, name)) not in referenced
+        ] if os.path.isdir(settings.upload_dir) else []
+
+        if not dry_run:
+            versioned = backfill_versions(db)
+            db.commit()
+            print(f"Submissions given a version number: {versioned}")
+
+        print(f"\n{'Would migrate' if dry_run else 'Migrated'}: {len(legacy) - missing} files")
+        print(f"Duplicate bytes {'reclaimable' if dry_run else 'reclaimed'}: {saved_bytes}")
+        print(f"Missing files: {missing}")
+        print(f"Unreferenced files left in {settings.upload_dir}: {len(orphans)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    migrate(dry_run="--dry-run" in sys.argv)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Check or rebuild solver balances against project_payments.
+
+solver_balances is kept current by the payment ledger on every payment
+change. This compares it with totals computed from project_payments and,
+unless --check is given, corrects any drift by appending adjustment entries
+to the ledger (payment writes are blocked while it runs). Run it once after
+upgrading to seed balances for existing payments.
+
+Usage: python rebuild_ledger.py [--check]
+Exits with status 1 when --check finds inconsistencies.
+"""
+
+import sys
+
+from app.core.database import SessionLocal
+from app.services.ledger import find_inconsistencies, rebuild_balances
+
+
+def report(rows):
+    for row in rows:
+        print(
+            f"  solver {row['solver_id']}: "
+            f"earned {row['stored_earned']} (expected {row['expected_earned']}), "
+            f"pending {row['stored_pending']} ({row['expected_pending']}), "
+            f"released {row['stored_released']} ({row['expected_released']}), "
+            f"paid {row['stored_paid']} ({row['expected_paid']}), "
+            f"payments {row['stored_payment_count']} ({row['expected_payment_count']})"
+        )
+
+
+if __name__ == "__main__":
+    check_only = "--check" in sys.argv
+    db = SessionLocal()
+    try:
+        if check_only:
+            mismatches = find_inconsistencies(db)
+            if mismatches:
+                print(f"✗ {len(mismatches)} solver balance(s) differ from project_payments:")
+                report(mismatches)
+                sys.exit(1)
+            print("✓ Solver balances match project_payments")
+        else:
+            adjusted = rebuild_balances(db)
+            db.commit()
+            print(f"✓ Solver balances rebuilt ({adjusted} adjusted)")
+    finally:
+        db.close()
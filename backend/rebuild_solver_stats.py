@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+"""
+Recompute solver statistics from project_requests and projects.
+
+solver_stats and solver_category_stats are kept current on every
+application and project change; run this once after upgrading to seed them
+for existing data, or to correct drift after editing rows by hand.
+Application and project writes are blocked while it runs.
+
+Usage: python rebuild_solver_stats.py
+"""
+
+from app.core.database import SessionLocal
+from app.services.solver_stats import rebuild_solver_stats
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        solvers = rebuild_solver_stats(db)
+        db.commit()
+        print(f"✓ Solver statistics rebuilt ({solvers} solvers)")
+    finally:
+        db.close()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+"""
+Bring the admin analytics rollups up to date.
+
+Counts projects posted, applications, accepted applications, completions
+and released/paid payment volume per hour and per day for each project
+category. Normally only the last couple of days are recounted; --rebuild
+recounts everything (run it once after upgrading, or after editing old
+rows by hand). The analytics endpoint also queues this in the background
+when the rollups are older than ANALYTICS_REFRESH_SECONDS.
+
+Usage: python rollup_analytics.py [--rebuild]
+"""
+
+import sys
+
+from app.services.analytics import rollup_analytics
+
+
+if __name__ == "__main__":
+    result = rollup_analytics(rebuild="--rebuild" in sys.argv)
+    if result is None:
+        print("✗ Another rollup is in progress")
+        sys.exit(1)
+    window = result["window_start"].isoformat() if result["window_start"] else "the beginning"
+    print(f"✓ Analytics rolled up from {window} to {result['rolled_up_to'].isoformat()}")
@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+"""
+Pay out every released payment, batched into one payout per solver.
+
+Payments are grouped by solver and payout account (users.stripe_account_id;
+solvers without one are skipped) and claimed in a few set-based statements,
+then each group is paid with a single provider payout. Pending payouts left
+by earlier runs are retried with their original idempotency keys, so
+re-running after a crash or a provider outage never pays twice.
+
+Usage: python run_payouts.py
+Schedule it (cron, Celery beat) as often as payouts should go out.
+"""
+
+import sys
+
+from app.services.payouts import run_payouts
+
+
+if __name__ == "__main__":
+    summary = run_payouts()
+    if summary is None:
+        print("✗ Another payout run is in progress")
+        sys.exit(1)
+    mark = "✓" if summary["status"] == "completed" else "✗"
+    print(
+        f"{mark} Payout run {summary['run_id']} {summary['status']}: "
+        f"{summary['payouts']} payout(s), {summary['payments_paid']} payment(s), "
+        f"{summary['total_amount']} paid, {summary['failed']} failed"
+    )
+    if summary["status"] != "completed":
+        sys.exit(1)
@@ -0,0 +1,115 @@
+import os
+import re
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.storage import Blob
+from app.models.task import Submission
+from app.services import lifecycle
+from app.services.blobs import blob_key
+
+
+@pytest.fixture
+def db():
+    """SQLite session with the tables the lifecycle queries touch.
+
+    ``regexp_replace`` is registered with PostgreSQL's semantics (first
+    match only), so the real predicates run against real rows.
+    """
+    engine = create_engine("sqlite://")
+
+    @event.listens_for(engine, "connect")
+    def _register(connection, record):
+        connection.create_function(
+            "regexp_replace", 3, lambda value, pattern, repl: re.sub(pattern, repl, value, count=1)
+        )
+
+    Blob.__table__.create(engine)
+    Submission.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _submission(file_path, sha256=None):
+    return Submission(
+        task_id=1,
+        problem_solver_id=1,
+        file_path=file_path,
+        file_name=os.path.basename(file_path),
+        file_sha256=sha256
+    )
+
+
+def test_legacy_files_referenced_by_relative_path_survive_custom_upload_dir(db, tmp_path, monkeypatch):
+    upload_dir = tmp_path / "srv" / "uploads"
+    upload_dir.mkdir(parents=True)
+    (upload_dir / "task_1_report.zip").write_bytes(b"kept")
+    (upload_dir / "task_2_orphan.zip").write_bytes(b"gone")
+    (upload_dir / "task_3_windows.zip").write_bytes(b"kept")
+    monkeypatch.setattr(settings, "upload_dir", str(upload_dir))
+    monkeypatch.chdir(tmp_path)
+    db.add_all([
+        _submission("uploads/task_1_report.zip"),
+        _submission("C:\\data\\uploads\\task_3_windows.zip"),
+        # Blob keys never protect a legacy file, whatever their name
+        _submission(blob_key("ab" * 32)[:-64] + "task_2_orphan.zip", "ab" * 32),
+    ])
+    db.commit()
+
+    removed, freed = lifecycle._collect_legacy_files(
+        db,
+        datetime.utcnow() + timedelta(hours=1),
+        dry_run=False
+    )
+
+    assert (removed, freed) == (1, 4)
+    assert os.path.exists(upload_dir / "task_1_report.zip")
+    assert os.path.exists(upload_dir / "task_3_windows.zip")
+    assert not os.path.exists(upload_dir / "task_2_orphan.zip")
+
+
+def test_legacy_file_names_are_matched_in_sql_on_postgresql(db, tmp_path, monkeypatch):
+    upload_dir = tmp_path / "uploads"
+    upload_dir.mkdir()
+    (upload_dir / "task_1_report.zip").write_bytes(b"kept")
+    monkeypatch.setattr(settings, "upload_dir", str(upload_dir))
+
+    statements = []
+
+    @event.listens_for(db.get_bind(), "before_cursor_execute")
+    def _capture(connection, cursor, statement, parameters, context, executemany):
+        statements.append(context.compiled.statement)
+
+    lifecycle._collect_legacy_files(db, datetime.utcnow() + timedelta(hours=1), dry_run=True)
+
+    sql = str(statements[0].compile(dialect=postgresql.dialect()))
+    assert "regexp_replace(submissions.file_path" in sql
+    assert "submissions.file_path NOT LIKE" in sql
+
+
+def test_reconcile_counts_only_submissions_stored_at_the_blob_key(db):
+    shas = {name: name * 64 for name in "abc"}
+    db.add_all([
+        # Over-counted, under-counted, and referenced only by a legacy path
+        Blob(sha256=shas["a"], size=1, storage_path=blob_key(shas["a"]), ref_count=5),
+        Blob(sha256=shas["b"], size=1, storage_path=blob_key(shas["b"]), ref_count=0),
+        Blob(sha256=shas["c"], size=1, storage_path=blob_key(shas["c"]), ref_count=1),
+        _submission(blob_key(shas["a"]), shas["a"]),
+        _submission(blob_key(shas["a"]), shas["a"]),
+        _submission(blob_key(shas["b"]), shas["b"]),
+        _submission("uploads/task_1_c.zip", shas["c"]),
+    ])
+    db.commit()
+
+    assert lifecycle.reconcile_ref_counts(db) == 3
+    assert dict(db.query(Blob.sha256, Blob.ref_count)) == {shas["a"]: 2, shas["b"]: 1, shas["c"]: 0}
+    assert lifecycle.reconcile_ref_counts(db) == 0